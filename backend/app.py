@@ -1,39 +1,110 @@
 # backend/app.py
 
-from flask import Flask, jsonify
-from orchestrator.mcp_client import jira_client, github_client, maven_client, filesystem_client, sonar_client
+import json
+import os
+import time
+
+from flask import Flask, Response, jsonify, request, stream_with_context
+from orchestrator.logger import render_metrics
+from orchestrator.state_store import get_store
 
 app = Flask(__name__)
 
-# Example endpoint to get all issues
+MAX_PAGE_SIZE = 500
+# How often a stream checks the store for changes made by other processes,
+# and how long it may stay silent before sending a keep-alive comment
+STREAM_POLL_INTERVAL = float(os.getenv("STREAM_POLL_INTERVAL", "1.0"))
+STREAM_HEARTBEAT = float(os.getenv("STREAM_HEARTBEAT", "15"))
+
+
+def _float_arg(name):
+    value = request.args.get(name)
+    return float(value) if value is not None else None
+
+
+# List issues from the state store, newest update first.
+# Query params: state, since/until (epoch seconds), limit, cursor.
+# The body stays a plain list; the next page's cursor is in X-Next-Cursor.
 @app.route("/api/issues")
 def get_issues():
-    # Replace with actual MCP calls to fetch issue status
-    issues = [
-        {
-            "issue_id": "ISSUE-1",
-            "fsm_state": "planned",
-            "plan": "Implement login feature",
-            "fsm_logs": {"planned": "Planning completed"},
-            "auto_fix_rounds": 0,
-            "pr_url": None,
-            "tests_passed": 0,
-            "tests_total": 0,
-            "sonar_quality": 0
-        },
-        {
-            "issue_id": "ISSUE-2",
-            "fsm_state": "coded",
-            "plan": "Create payment API",
-            "fsm_logs": {"planned": "Planning done", "coded": "Code completed"},
-            "auto_fix_rounds": 1,
-            "pr_url": "http://github.com/example/pr/2",
-            "tests_passed": 5,
-            "tests_total": 5,
-            "sonar_quality": 95
-        }
-    ]
-    return jsonify(issues)
+    try:
+        limit = min(int(request.args.get("limit", 100)), MAX_PAGE_SIZE)
+        since, until = _float_arg("since"), _float_arg("until")
+        issues, next_cursor = get_store().list_issues(
+            state=request.args.get("state"), since=since, until=until,
+            limit=max(limit, 1), cursor=request.args.get("cursor"),
+        )
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {e}"}), 400
+
+    response = jsonify(issues)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+
+@app.route("/api/issues/<issue_id>")
+def get_issue(issue_id):
+    store = get_store()
+    issue = store.get_issue(issue_id)
+    if issue is None:
+        return jsonify({"error": f"Unknown issue: {issue_id}"}), 404
+    issue["transitions"] = store.history(issue_id)
+    return jsonify(issue)
+
+
+def _sse(event, data, seq):
+    return f"id: {seq}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def _snapshot(store):
+    issues, seq = [], 0
+    while True:
+        page, seq = store.changes_since(seq, limit=MAX_PAGE_SIZE)
+        issues += page
+        if len(page) < MAX_PAGE_SIZE:
+            return issues, seq
+
+
+# Server-sent events: a `snapshot` event with every issue, then an `issues`
+# event carrying only the issues that changed. Each event id is the change
+# seq; reconnecting with Last-Event-ID (or ?since=) skips the snapshot and
+# resumes with whatever was missed.
+@app.route("/api/issues/stream")
+def stream_issues():
+    resume = request.headers.get("Last-Event-ID") or request.args.get("since")
+    try:
+        resume = int(resume) if resume else None
+    except ValueError as e:
+        return jsonify({"error": f"Invalid resume token: {e}"}), 400
+    store = get_store()
+
+    def events():
+        seq = resume
+        if seq is None:
+            issues, seq = _snapshot(store)
+            yield _sse("snapshot", issues, seq)
+        yield f"retry: {int(STREAM_POLL_INTERVAL * 1000)}\n\n"
+        idle_since = time.monotonic()
+        while True:
+            store.wait_for_change(seq, STREAM_POLL_INTERVAL)
+            issues, seq = store.changes_since(seq, limit=MAX_PAGE_SIZE)
+            if issues:
+                yield _sse("issues", issues, seq)
+                idle_since = time.monotonic()
+            elif time.monotonic() - idle_since >= STREAM_HEARTBEAT:
+                yield ": keep-alive\n\n"
+                idle_since = time.monotonic()
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream_with_context(events()), mimetype="text/event-stream", headers=headers)
+
+
+# Prometheus metrics: span latencies, resource and build queue waits, LLM
+# tokens and cache outcomes, summed over every process that reported recently
+@app.route("/metrics")
+def get_metrics():
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
 
 
 if __name__ == "__main__":
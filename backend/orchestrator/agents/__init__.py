@@ -1,4 +1,4 @@
-from orchestrator.agents.planner import planner
-from orchestrator.agents.coder import coder
-from orchestrator.agents.reviewer import reviewer
-from orchestrator.agents.auto_fix import auto_fix
+from orchestrator.agents.planner import planner, planner_async
+from orchestrator.agents.coder import coder, coder_async
+from orchestrator.agents.reviewer import reviewer, reviewer_async
+from orchestrator.agents.auto_fix import auto_fix, auto_fix_async
@@ -1,34 +1,198 @@
-from orchestrator.agents.reviewer import reviewer
-from orchestrator.gemini_client import gemini_model
-from orchestrator.mcp_client import filesystem_client, maven_client
+from orchestrator.agents.reviewer import reviewer_async
+from orchestrator.gemini_client import agenerate_text
+from orchestrator.mcp_client import filesystem_session, github_session, maven_session, sonar_session, run_sync
+from orchestrator.scheduler import aresource
+from orchestrator.state_store import get_store
+from orchestrator.logger import span, traced_agent
+from orchestrator.prompt_budget import PROMPT_TOKEN_BUDGET, PromptBuilder, rank_failures, related_code, source_snippets
+import asyncio
+import logging
 import os
 
-MAX_FIX_ROUNDS = 3
+MAX_FIX_ROUNDS = int(os.getenv("MAX_FIX_ROUNDS", "3"))
+# Fix candidates generated and evaluated in parallel per round; 1 keeps the sequential loop
+AUTO_FIX_CANDIDATES = int(os.getenv("AUTO_FIX_CANDIDATES", "1"))
+# Candidate builds allowed per issue across all rounds (default: candidates x rounds)
+AUTO_FIX_BUILD_BUDGET = int(os.getenv("AUTO_FIX_BUILD_BUDGET", "0")) or AUTO_FIX_CANDIDATES * MAX_FIX_ROUNDS
+# Response tokens allowed for a fix, which is the whole rewritten file
+FIX_MAX_OUTPUT_TOKENS = int(os.getenv("FIX_MAX_OUTPUT_TOKENS", "4096"))
+# The file the coder generates and the model's fixes edit
+FIX_FILE = "Example.java"
 
-def auto_fix(coded_task):
+async def _fix_context(target_dir, result):
+    """
+    Ranked failures of a review (or failed candidate), the source lines they
+    point at, the file to fix, and indexed code related to the top failures
+    """
+    failures = rank_failures(result["test_result"], result.get("sonar_result"))
+    # A failed candidate's worktree is already gone; only a reviewed worktree has its source
+    snippets = await source_snippets(filesystem_session.read_files, result["target_dir"], failures) \
+        if result.get("target_dir") else []
+    current = (await filesystem_session.read_files(files=[os.path.join(target_dir, FIX_FILE)]))["files"][0]
+    related = await related_code(github_session.search_code, "\n".join(text for text, _ in failures[:3]), limit=3)
+    return failures, snippets, current.get("content"), related
+
+def _fix_prompt(plan, context, candidate=0, candidates=1):
+    failures, snippets, current, related = context
+    instructions = (f"Reply with a unified diff against {FIX_FILE} (--- a/{FIX_FILE}, +++ b/{FIX_FILE}) "
+                    "containing only the changed hunks, or with the complete corrected file.")
+    if candidates > 1:
+        instructions += f"\nThis is candidate {candidate + 1} of {candidates}; other candidates are tried in parallel."
+    prompt, _ = (PromptBuilder("auto_fix")
+                 .add("task", "The following code failed tests or Sonar scan. Suggest fixes.", heading=False)
+                 .add("Plan", plan, priority=2, limit=PROMPT_TOKEN_BUDGET // 4)
+                 .add("Failures", [text for text, _ in failures], priority=1, limit=PROMPT_TOKEN_BUDGET // 2)
+                 .add("Relevant source", snippets, priority=3)
+                 .add(f"Current {FIX_FILE}", current, priority=2, limit=PROMPT_TOKEN_BUDGET // 3)
+                 .add("Related code", related, priority=4, limit=PROMPT_TOKEN_BUDGET // 4)
+                 .add("instructions", instructions, heading=False)
+                 .build())
+    return prompt
+
+async def _apply_fix(repo_path, fix):
+    """
+    Apply a model reply to `repo_path`: a unified diff is applied in-process
+    (all hunks or none), anything else replaces FIX_FILE as a whole
+    """
+    if "\n@@ " in f"\n{fix}" and "+++ " in fix:
+        result = await filesystem_session.apply_patch(patch_content=fix, repo_path=repo_path)
+        if result["status"] != "applied":
+            # The file is left as it was; the next build reports the same failures
+            logging.warning(f"Fix diff rejected in {repo_path}: {result['errors'][:3]}")
+        return result
+    return await filesystem_session.write_file(path=os.path.join(repo_path, FIX_FILE), content=fix)
+
+async def _review_and_fix(coded_task):
     fsm = coded_task.get("fsm")
-    round_num = 1
+    # A resumed task continues from the round its checkpoint recorded
+    round_num = coded_task.get("fix_round", 1)
     while round_num <= MAX_FIX_ROUNDS:
-        result = reviewer(coded_task)
+        result = await reviewer_async(coded_task)
         if result["workflow_status"] == "success":
             return result
 
         # Generate fix using Gemini
-        fix_prompt = f"""The following code failed tests or Sonar scan. Suggest fixes.
-        Plan:\n{coded_task['plan']}
-        Test logs:\n{result['test_result']['stdout']}
-        Sonar logs:\n{result['sonar_result'].get('logs')}
-        Provide only corrected code."""
-        fixed_code = gemini_model.generate_text(fix_prompt)
-        filesystem_client.write_file(
-            path=os.path.join(coded_task["target_dir"], "Example.java"),
-            content=fixed_code
-        )
-
-        coded_task["test_result"] = maven_client.run_tests(repo_path=coded_task["target_dir"])
+        fix_prompt = _fix_prompt(coded_task["plan"], await _fix_context(coded_task["target_dir"], result))
+        # Later rounds ask for a fresh sample rather than a cached fix
+        fixed_code = await agenerate_text(fix_prompt, max_output_tokens=FIX_MAX_OUTPUT_TOKENS,
+                                          use_cache=round_num == 1)
+        await _apply_fix(coded_task["target_dir"], fixed_code)
+
+        async with aresource("maven"):
+            coded_task["test_result"] = await maven_session.run_tests(repo_path=coded_task["target_dir"], incremental=True)
         round_num += 1
 
         if fsm:
             fsm.transition("auto_fix")
+        coded_task["fix_round"] = round_num
+        get_store().save_checkpoint(coded_task["issue_id"], coded_task)
 
-    return reviewer(coded_task)
+    return await reviewer_async(coded_task)
+
+async def _evaluate(coded_task, prompt, candidate_dir, round_num, index):
+    """Generate one fix candidate and run the tests, then the scan, on it in its own worktree"""
+    with span("auto_fix.candidate", round=round_num, candidate=index):
+        code = await agenerate_text(prompt, max_output_tokens=FIX_MAX_OUTPUT_TOKENS, use_cache=False)
+        try:
+            async with aresource("git"):
+                # The server creates the worktree even if this candidate is cancelled mid-call;
+                # wait for it to exist so the finally below releases it
+                fork = asyncio.ensure_future(
+                    github_session.fork_repo(source_dir=coded_task["target_dir"], target_dir=candidate_dir))
+                try:
+                    await asyncio.shield(fork)
+                except asyncio.CancelledError:
+                    await asyncio.gather(fork, return_exceptions=True)
+                    raise
+            await _apply_fix(candidate_dir, code)
+            async with aresource("maven"):
+                test_result = await maven_session.run_tests(repo_path=candidate_dir, incremental=True)
+            sonar_result = None
+            if test_result["success"]:
+                async with aresource("sonar"):
+                    sonar_result = await sonar_session.scan_project(repo_path=candidate_dir, incremental=True,
+                                                                 branch_name=coded_task["branch_name"])
+            return {"code": code, "test_result": test_result, "sonar_result": sonar_result,
+                    "pass": bool(sonar_result and sonar_result["pass"])}
+        except asyncio.CancelledError:
+            # A losing candidate's build is killed, not left to finish
+            await asyncio.gather(maven_session.cancel(repo_path=candidate_dir),
+                                 sonar_session.cancel(repo_path=candidate_dir), return_exceptions=True)
+            raise
+        finally:
+            await github_session.release_repo(target_dir=candidate_dir)
+
+async def _first_passing(tasks):
+    """(first passing candidate, None), or (None, first failing one); the other tasks are cancelled"""
+    failed = None
+    try:
+        for done in asyncio.as_completed(tasks):
+            try:
+                candidate = await done
+            except Exception as e:
+                logging.warning(f"Fix candidate failed to run: {e}")
+                continue
+            if candidate["pass"]:
+                return candidate, None
+            failed = failed or candidate
+        return None, failed
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def _speculate(coded_task):
+    """
+    Each round asks for up to AUTO_FIX_CANDIDATES fixes at once and
+    evaluates each in a fork of the issue's worktree. The first candidate
+    to pass is applied to the issue's worktree and reviewed there (its test
+    and scan results are memoized, so that review costs no build); the
+    rest are cancelled. Rounds stop at MAX_FIX_ROUNDS or when the issue's
+    AUTO_FIX_BUILD_BUDGET of candidate builds is spent.
+    """
+    fsm = coded_task.get("fsm")
+    target_dir = coded_task["target_dir"]
+    round_num = coded_task.get("fix_round", 1)
+    budget = coded_task.get("build_budget", AUTO_FIX_BUILD_BUDGET)
+    result = await reviewer_async(coded_task)
+    feedback = result
+    while result["workflow_status"] != "success" and round_num <= MAX_FIX_ROUNDS and budget > 0:
+        count = min(AUTO_FIX_CANDIDATES, budget)
+        context = await _fix_context(target_dir, feedback)
+        tasks = [asyncio.ensure_future(_evaluate(coded_task, _fix_prompt(coded_task["plan"], context, i, count),
+                                                 f"{target_dir}-fix{round_num}.{i}", round_num, i))
+                 for i in range(count)]
+        winner, failed = await _first_passing(tasks)
+        budget -= count
+        round_num += 1
+        coded_task.update(fix_round=round_num, build_budget=budget)
+
+        if winner:
+            # Candidates fork the issue's worktree, so the winning diff applies to it unchanged
+            await _apply_fix(target_dir, winner["code"])
+            coded_task["test_result"] = winner["test_result"]
+            get_store().save_checkpoint(coded_task["issue_id"], coded_task)
+            result = await reviewer_async(coded_task)
+            feedback = result
+            continue
+
+        feedback = failed or feedback
+        if fsm:
+            # Count the round like a sequential one: reviewed, then back to auto_fix
+            fsm.transition("reviewed", detail=f"{count} fix candidates failed")
+            fsm.transition("auto_fix")
+        get_store().save_checkpoint(coded_task["issue_id"], coded_task)
+    return result
+
+@traced_agent("auto_fix")
+async def auto_fix_async(coded_task):
+    # The issue's worktree is reclaimed once it finishes or fails
+    try:
+        if AUTO_FIX_CANDIDATES > 1:
+            return await _speculate(coded_task)
+        return await _review_and_fix(coded_task)
+    finally:
+        await github_session.release_repo(target_dir=coded_task["target_dir"])
+
+def auto_fix(coded_task):
+    return run_sync(auto_fix_async(coded_task))
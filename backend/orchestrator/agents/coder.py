@@ -1,7 +1,10 @@
 import os, uuid
-from orchestrator.mcp_client import github_client, filesystem_client, maven_client
+from orchestrator.mcp_client import github_session, filesystem_session, maven_session, run_sync
+from orchestrator.scheduler import aresource
+from orchestrator.logger import traced_agent
 
-def coder(planned_task):
+@traced_agent("coder")
+async def coder_async(planned_task):
     issue_id = planned_task["issue_id"]
     plan = planned_task["plan"]
     fsm = planned_task.get("fsm")
@@ -9,17 +12,26 @@ def coder(planned_task):
     branch_name = f"feature/{issue_id}-{uuid.uuid4().hex[:6]}"
     target_dir = f"/tmp/{branch_name}"
 
-    github_client.clone_repo(branch_name=branch_name, target_dir=target_dir)
+    async with aresource("git"):
+        await github_session.clone_repo(branch_name=branch_name, target_dir=target_dir)
 
-    filesystem_client.write_file(
-        path=os.path.join(target_dir, "Example.java"),
-        content=f"// Generated code for issue {issue_id}\n// Plan:\n{plan}"
-    )
+    try:
+        await filesystem_session.write_file(
+            path=os.path.join(target_dir, "Example.java"),
+            content=f"// Generated code for issue {issue_id}\n// Plan:\n{plan}"
+        )
 
-    test_result = maven_client.run_tests(repo_path=target_dir)
+        async with aresource("maven"):
+            test_result = await maven_session.run_tests(repo_path=target_dir)
+    except Exception:
+        await github_session.release_repo(target_dir=target_dir)
+        raise
 
     if fsm:
         fsm.transition("coded")
 
     return {"issue_id": issue_id, "branch_name": branch_name, "target_dir": target_dir,
             "test_result": test_result, "plan": plan, "fsm": fsm}
+
+def coder(planned_task):
+    return run_sync(coder_async(planned_task))
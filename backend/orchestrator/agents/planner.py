@@ -1,13 +1,32 @@
-from orchestrator.gemini_client import gemini_model
+from orchestrator.gemini_client import agenerate_text
+from orchestrator.mcp_client import github_session, run_sync
+from orchestrator.logger import traced_agent
+from orchestrator.prompt_budget import PROMPT_TOKEN_BUDGET, PromptBuilder, related_code
+import os
 
-def planner(issue, fsm=None):
+# Response tokens allowed for a plan; a short budget cuts plans off mid-step
+PLAN_MAX_OUTPUT_TOKENS = int(os.getenv("PLAN_MAX_OUTPUT_TOKENS", "2048"))
+
+@traced_agent("planner")
+async def planner_async(issue, fsm=None):
     issue_id = issue["id"]
     issue_summary = issue["fields"]["summary"]
 
-    plan_prompt = f"Create a coding plan for Jira issue: {issue_summary}"
-    plan = gemini_model.generate_text(plan_prompt)
+    description = issue["fields"].get("description")
+    description = description if isinstance(description, str) else None
+    # Grounds the plan in the code it will touch, from the repository index rather than the tree
+    code = await related_code(github_session.search_code, f"{issue_summary}\n{description or ''}")
+    plan_prompt, _ = (PromptBuilder("plan")
+                      .add("task", f"Create a coding plan for Jira issue: {issue_summary}", heading=False)
+                      .add("Description", description, priority=1)
+                      .add("Relevant code", code, priority=2, limit=PROMPT_TOKEN_BUDGET // 2)
+                      .build())
+    plan = await agenerate_text(plan_prompt, max_output_tokens=PLAN_MAX_OUTPUT_TOKENS)
 
     if fsm:
         fsm.transition("planned")
 
     return {"issue_id": issue_id, "plan": plan, "issue_summary": issue_summary, "fsm": fsm}
+
+def planner(issue, fsm=None):
+    return run_sync(planner_async(issue, fsm))
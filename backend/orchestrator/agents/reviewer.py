@@ -1,6 +1,9 @@
-from orchestrator.mcp_client import sonar_client, github_client, jira_client
+from orchestrator.mcp_client import sonar_session, github_session, jira_session, run_sync
+from orchestrator.scheduler import aresource
+from orchestrator.logger import traced_agent
 
-def reviewer(coded_task):
+@traced_agent("reviewer")
+async def reviewer_async(coded_task):
     fsm = coded_task.get("fsm")
     if fsm:
         fsm.transition("reviewed")
@@ -11,7 +14,9 @@ def reviewer(coded_task):
     plan = coded_task["plan"]
     test_result = coded_task["test_result"]
 
-    sonar_result = sonar_client.scan_project(repo_path=target_dir)
+    async with aresource("sonar"):
+        sonar_result = await sonar_session.scan_project(repo_path=target_dir, incremental=True,
+                                                         branch_name=branch_name)
 
     workflow_status = "failed"
     pr_url = None
@@ -20,17 +25,19 @@ def reviewer(coded_task):
     if test_result["success"] and sonar_result["pass"]:
         pr_title = f"Auto PR for Jira {issue_id}"
         pr_body = f"Plan:\n{plan}"
-        pr_info = github_client.create_pr(branch_name=branch_name, title=pr_title, body=pr_body)
-        jira_client.update_issue(issue_id=issue_id, comment=f"PR created: {pr_info['pr_url']}")
+        pr_info = await github_session.create_pr(branch_name=branch_name, title=pr_title, body=pr_body)
+        await jira_session.update_issue(issue_id=issue_id, comment=f"PR created: {pr_info['pr_url']}")
         workflow_status = "success"
         pr_url = pr_info["pr_url"]
         if fsm:
             fsm.transition("pr_created")
     else:
+        # Bounded digests; the raw logs stay on disk behind fetch_log
         logs = {
-            "test_stdout": test_result["stdout"],
-            "test_stderr": test_result["stderr"],
-            "sonar_logs": sonar_result.get("logs")
+            "test_summary": test_result["summary"],
+            "test_log_path": test_result.get("log_path"),
+            "sonar_logs": sonar_result.get("logs"),
+            "sonar_log_path": sonar_result.get("log_path")
         }
         if fsm:
             fsm.transition("auto_fix")
@@ -38,3 +45,6 @@ def reviewer(coded_task):
     return {"issue_id": issue_id, "workflow_status": workflow_status, "pr_url": pr_url,
             "logs": logs, "target_dir": target_dir, "test_result": test_result,
             "sonar_result": sonar_result, "plan": plan, "fsm": fsm}
+
+def reviewer(coded_task):
+    return run_sync(reviewer_async(coded_task))
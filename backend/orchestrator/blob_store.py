@@ -0,0 +1,135 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from orchestrator.state_store import REDIS_URL, STATE_STORE
+
+# file (default, a directory on this host) or redis (shared by queue workers on several hosts)
+BLOB_STORE = os.getenv("BLOB_STORE", "redis" if STATE_STORE == "redis" else "file")
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", "/tmp/swe-agent-blobs")
+# Blobs not written or read for this many seconds are deleted
+BLOB_TTL = float(os.getenv("BLOB_TTL", str(7 * 24 * 3600)))
+
+
+def blob_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class FileBlobStore:
+    """
+    Content-addressed blobs in a directory: put() stores bytes under their
+    sha256 (sharded by the first two hex digits) and
+    returns the hex digest; identical content is stored once. Files are
+    written under a per-writer name and renamed into place, so concurrent
+    puts of the same blob are harmless.
+    """
+
+    def __init__(self, root=BLOB_STORE_DIR, ttl=BLOB_TTL):
+        self.root = root
+        self.ttl = ttl
+        # digest -> when this process last wrote or touched it; a recent one needs no file access
+        self._seen = {}
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def put(self, data):
+        digest = blob_digest(data)
+        now = time.time()
+        if now - self._seen.get(digest, 0) < self.ttl / 2:
+            return digest
+        if len(self._seen) >= 4096:
+            self._seen.clear()
+        path = self._path(digest)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        self._seen[digest] = now
+        return digest
+
+    def get(self, digest):
+        path = self._path(digest)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            raise KeyError(f"Blob {digest} not found in {self.root}") from None
+        now = time.time()
+        if now - self._seen.get(digest, 0) >= self.ttl / 2:
+            os.utime(path)
+            self._seen[digest] = now
+        return data
+
+    def prune(self):
+        """Delete blobs unused for `ttl` seconds; returns how many"""
+        cutoff, removed = time.time() - self.ttl, 0
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                        self._seen.pop(entry.name, None)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+class RedisBlobStore:
+    """Same interface in Redis, zlib-compressed since Redis keeps them in memory; every put or get renews the expiry"""
+
+    def __init__(self, url=REDIS_URL, prefix="swe", ttl=BLOB_TTL):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self._prefix = prefix
+        self.ttl = ttl
+
+    def _key(self, digest):
+        return f"{self._prefix}:blob:{digest}"
+
+    def put(self, data):
+        digest = blob_digest(data)
+        key = self._key(digest)
+        if not self._redis.expire(key, int(self.ttl)):
+            self._redis.set(key, zlib.compress(data, 1), ex=int(self.ttl))
+        return digest
+
+    def get(self, digest):
+        data = self._redis.getex(self._key(digest), ex=int(self.ttl))
+        if data is None:
+            raise KeyError(f"Blob {digest} not found in Redis")
+        return zlib.decompress(data)
+
+    def prune(self):
+        return 0
+
+
+def get_json(store, digest):
+    return json.loads(store.get(digest))
+
+
+_blob_store = None
+_blob_store_lock = threading.Lock()
+
+
+def get_blob_store():
+    """Process-wide blob store selected by BLOB_STORE; expired file blobs are pruned when it is created"""
+    global _blob_store
+    with _blob_store_lock:
+        if _blob_store is None:
+            _blob_store = RedisBlobStore() if BLOB_STORE == "redis" else FileBlobStore()
+            removed = _blob_store.prune()
+            if removed:
+                logging.info(f"Pruned {removed} expired blobs")
+        return _blob_store
@@ -1,23 +1,53 @@
+import time
+from array import array
+
+
 class IssueFSM:
     """
     Simple FSM to track the state of a Jira issue in the AI workflow
     States: planned → coded → reviewed → auto_fix → pr_created → failed
+    Transitions are also recorded in `store` (see orchestrator.state_store) when given.
+    History is kept as one byte (index into STATES) and one timestamp per
+    transition; details live only in the store.
     """
     STATES = ["planned", "coded", "reviewed", "auto_fix", "pr_created", "failed"]
+    __slots__ = ("issue_id", "state", "store", "_states", "_times")
 
-    def __init__(self, issue_id):
+    def __init__(self, issue_id, store=None):
         self.issue_id = issue_id
         self.state = None
-        self.history = []
+        self.store = store
+        self._states = bytearray()
+        self._times = array("d")
 
-    def transition(self, new_state):
+    def transition(self, new_state, detail=None):
         if new_state not in self.STATES:
             raise ValueError(f"Invalid state: {new_state}")
+        at = time.time()
         self.state = new_state
-        self.history.append(new_state)
+        self._states.append(self.STATES.index(new_state))
+        self._times.append(at)
+        if self.store is not None:
+            self.store.record_transition(self.issue_id, new_state, detail=detail, at=at)
+
+    def restore(self):
+        """Pick up the state and history recorded in `store` by an earlier run"""
+        if self.store is not None:
+            history = self.store.history(self.issue_id)
+            self._states = bytearray(self.STATES.index(h["state"]) for h in history)
+            self._times = array("d", (h["at"] for h in history))
+            self.state = history[-1]["state"] if history else None
 
     def get_state(self):
         return self.state
 
     def get_history(self):
-        return self.history
+        return [self.STATES[i] for i in self._states]
+
+    def transitions(self):
+        """(state, time) pairs in order"""
+        return [(self.STATES[i], at) for i, at in zip(self._states, self._times)]
+
+    def count(self, state):
+        """How many times the issue entered `state`"""
+        return self._states.count(self.STATES.index(state))
@@ -1,5 +1,12 @@
+import asyncio
 import os
 import logging
+import threading
+from orchestrator.llm_cache import get_cache
+from orchestrator.llm_dispatcher import LLMDispatcher
+from orchestrator.logger import record_llm, span
+
+GEMINI_MODEL_NAME = "gemini-2.5-pro"
 
 # Initialize Gemini model with error handling
 gemini_model = None
@@ -12,7 +19,7 @@ try:
     gcp_project = os.getenv("GCP_PROJECT")
     if gcp_project:
         init(project=gcp_project, location="us-central1")
-        gemini_model = TextGenerationModel.from_pretrained("gemini-2.5-pro")
+        gemini_model = TextGenerationModel.from_pretrained(GEMINI_MODEL_NAME)
         logging.info("✅ Gemini model loaded successfully")
     else:
         logging.warning("⚠️ GCP_PROJECT not set, Gemini model unavailable")
@@ -21,15 +28,64 @@ except Exception as e:
     logging.warning(f"⚠️ Failed to initialize Gemini model: {e}")
     logging.warning("Gemini functionality will be disabled. Set up Google Cloud authentication to enable it.")
 
-def generate_text(prompt: str, max_output_tokens: int = 512):
-    """Generate text using Gemini model or return a mock response if unavailable"""
-    if gemini_model is None:
-        # Return a mock response when Gemini is unavailable
-        return f"[MOCK RESPONSE] Generated text for prompt: {prompt[:50]}..."
-    
-    try:
-        response = gemini_model.predict(prompt, max_output_tokens=max_output_tokens)
-        return response.text
-    except Exception as e:
-        logging.error(f"Error generating text with Gemini: {e}")
-        return f"[ERROR] Failed to generate text: {str(e)}"
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def get_dispatcher():
+    """Process-wide rate-limited queue in front of gemini_model"""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = LLMDispatcher(gemini_model)
+        return _dispatcher
+
+def _cached(prompt, max_output_tokens, use_cache):
+    cache = get_cache() if use_cache else None
+    if cache is None:
+        return None, None
+    return cache, cache.get(GEMINI_MODEL_NAME, prompt, max_output_tokens)
+
+def generate_text(prompt: str, max_output_tokens: int = 512, use_cache: bool = True):
+    """
+    Generate text using Gemini model or return a mock response if unavailable.
+    Responses are served from the LLM cache when possible; pass
+    use_cache=False to force a fresh sample. Misses go through the shared
+    rate-limited dispatcher.
+    """
+    with span("llm.generate", model=GEMINI_MODEL_NAME) as current:
+        if gemini_model is None:
+            # Return a mock response when Gemini is unavailable
+            text = f"[MOCK RESPONSE] Generated text for prompt: {prompt[:50]}..."
+            record_llm(current, prompt, text, "mock")
+            return text
+
+        cache, hit = _cached(prompt, max_output_tokens, use_cache)
+        if hit is not None:
+            record_llm(current, prompt, hit, "hit")
+            return hit
+
+        text = get_dispatcher().generate(prompt, max_output_tokens)
+        if cache is not None:
+            cache.put(GEMINI_MODEL_NAME, prompt, max_output_tokens, text)
+        record_llm(current, prompt, text, "miss" if cache is not None else "off")
+        return text
+
+
+async def agenerate_text(prompt: str, max_output_tokens: int = 512, use_cache: bool = True):
+    """Coroutine version of generate_text() for the async agents"""
+    with span("llm.generate", model=GEMINI_MODEL_NAME) as current:
+        if gemini_model is None:
+            text = f"[MOCK RESPONSE] Generated text for prompt: {prompt[:50]}..."
+            record_llm(current, prompt, text, "mock")
+            return text
+
+        cache, hit = _cached(prompt, max_output_tokens, use_cache)
+        if hit is not None:
+            record_llm(current, prompt, hit, "hit")
+            return hit
+
+        text = await asyncio.wrap_future(get_dispatcher().submit(prompt, max_output_tokens))
+        if cache is not None:
+            cache.put(GEMINI_MODEL_NAME, prompt, max_output_tokens, text)
+        record_llm(current, prompt, text, "miss" if cache is not None else "off")
+        return text
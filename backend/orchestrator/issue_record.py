@@ -0,0 +1,66 @@
+import json
+import os
+from orchestrator.blob_store import get_blob_store, get_json
+
+# Task values whose JSON is longer than this many bytes go to the blob store
+RECORD_INLINE_MAX = int(os.getenv("RECORD_INLINE_MAX", "256"))
+
+
+def _offloaded(value):
+    """JSON bytes of `value` if it belongs in the blob store, else None"""
+    if value is None or isinstance(value, (bool, int, float)):
+        return None
+    if isinstance(value, str) and len(value) <= RECORD_INLINE_MAX:
+        return None
+    data = json.dumps(value, separators=(",", ":")).encode("utf-8")
+    return data if len(data) > RECORD_INLINE_MAX else None
+
+
+class IssueRecord:
+    """
+    Compact form of a pipeline task, carried between stages and kept for
+    finished issues: small values inline, large ones (plans, test and scan
+    results, logs, generated code, the Jira issue) as blob-store digests
+    (see orchestrator.blob_store). to_task() rebuilds the task dict a stage
+    works on; only the stage that is running holds it in full.
+    """
+    __slots__ = ("issue_id", "fsm", "fields", "blobs")
+
+    def __init__(self, issue_id, fsm=None, fields=None, blobs=None):
+        self.issue_id = issue_id
+        self.fsm = fsm
+        self.fields = fields or {}
+        self.blobs = blobs or {}
+
+    @classmethod
+    def from_task(cls, task, store=None):
+        store = store or get_blob_store()
+        fields, blobs = {}, {}
+        for key, value in task.items():
+            if key in ("issue_id", "fsm"):
+                continue
+            data = _offloaded(value)
+            if data is not None:
+                blobs[key] = store.put(data)
+            else:
+                fields[key] = value
+        return cls(task["issue_id"], task.get("fsm"), fields, blobs)
+
+    def get(self, key, default=None):
+        if key == "issue_id":
+            return self.issue_id
+        if key == "fsm":
+            return self.fsm
+        if key in self.blobs:
+            return get_json(get_blob_store(), self.blobs[key])
+        return self.fields.get(key, default)
+
+    def to_task(self, store=None):
+        store = store or get_blob_store()
+        task = dict(self.fields, issue_id=self.issue_id, fsm=self.fsm)
+        task.update((key, get_json(store, digest)) for key, digest in self.blobs.items())
+        return task
+
+    def summary(self):
+        """Inline fields plus the digest of each offloaded one, e.g. for API results"""
+        return dict(self.fields, issue_id=self.issue_id, fsm=self.fsm, blobs=dict(self.blobs))
@@ -0,0 +1,269 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+# redis (shared by every worker) or memory (workers inside one process)
+JOB_QUEUE = os.getenv("JOB_QUEUE", "redis")
+# A claimed job becomes visible to other workers again if its lease is not
+# extended within this many seconds (i.e. the worker died)
+JOB_VISIBILITY_TIMEOUT = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_DELAY = float(os.getenv("JOB_RETRY_DELAY", "30"))
+# Cluster-wide resource slots expire after this long if their holder dies
+CLUSTER_SLOT_TTL = float(os.getenv("CLUSTER_SLOT_TTL", "3600"))
+CLUSTER_SLOT_POLL = float(os.getenv("CLUSTER_SLOT_POLL", "0.5"))
+
+
+def job_id(run_id, issue_id, stage):
+    """Deterministic id, so enqueueing the same stage of the same run twice is a no-op"""
+    return f"{run_id}:{issue_id}:{stage}"
+
+
+class _SlotsMixin:
+    """Cluster-wide resource semaphores on top of try_acquire()/release()"""
+
+    @asynccontextmanager
+    async def aslot(self, name, limit):
+        holder = uuid.uuid4().hex
+        while not await asyncio.to_thread(self.try_acquire, name, holder, limit, CLUSTER_SLOT_TTL):
+            await asyncio.sleep(CLUSTER_SLOT_POLL)
+        try:
+            yield
+        finally:
+            await asyncio.to_thread(self.release, name, holder)
+
+
+class MemoryJobQueue(_SlotsMixin):
+    """
+    In-process queue with the same semantics as RedisJobQueue, for tests and
+    single-host runs where workers are threads or event loops in one process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._visible = {}
+        self._slots = {}
+        self.dead = []
+
+    def enqueue(self, job_id, issue_id, stage, payload, at=None):
+        with self._lock:
+            if job_id in self._jobs:
+                return False
+            self._jobs[job_id] = {"id": job_id, "issue_id": issue_id, "stage": stage, "payload": payload,
+                                  "state": "queued", "attempts": 0, "lease": None}
+            self._visible[job_id] = at or time.time()
+            return True
+
+    def claim(self, visibility_timeout=JOB_VISIBILITY_TIMEOUT):
+        now = time.time()
+        with self._lock:
+            ready = [j for j, at in self._visible.items() if at <= now]
+            if not ready:
+                return None
+            job = self._jobs[min(ready, key=self._visible.get)]
+            self._visible[job["id"]] = now + visibility_timeout
+            job.update(state="running", lease=uuid.uuid4().hex, attempts=job["attempts"] + 1)
+            return dict(job)
+
+    def extend(self, job_id, lease, visibility_timeout=JOB_VISIBILITY_TIMEOUT):
+        with self._lock:
+            if self._jobs[job_id]["lease"] != lease or job_id not in self._visible:
+                return False
+            self._visible[job_id] = time.time() + visibility_timeout
+            return True
+
+    def complete(self, job_id, result, next_job=None):
+        """Mark done and enqueue `next_job` (id, issue_id, stage, payload); only the first completion counts"""
+        # Next stage first: if we die in between, the redelivered job re-enqueues it as a no-op
+        if next_job:
+            self.enqueue(*next_job)
+        with self._lock:
+            job = self._jobs[job_id]
+            if job["state"] == "done":
+                return False
+            job.update(state="done", result=result)
+            self._visible.pop(job_id, None)
+        return True
+
+    def fail(self, job_id, lease, error, max_attempts=JOB_MAX_ATTEMPTS, retry_delay=JOB_RETRY_DELAY):
+        """Requeue after `retry_delay`, or dead-letter once attempts run out; returns the job's new state"""
+        with self._lock:
+            job = self._jobs[job_id]
+            if job["state"] != "running" or job["lease"] != lease:
+                return job["state"]
+            job["error"] = error
+            if job["attempts"] >= max_attempts:
+                job["state"] = "dead"
+                self._visible.pop(job_id, None)
+                self.dead.append(job_id)
+            else:
+                job["state"] = "queued"
+                self._visible[job_id] = time.time() + retry_delay
+            return job["state"]
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def pending(self):
+        with self._lock:
+            return len(self._visible)
+
+    def try_acquire(self, name, holder, limit, ttl):
+        now = time.time()
+        with self._lock:
+            slots = self._slots.setdefault(name, {})
+            for h in [h for h, expires in slots.items() if expires <= now]:
+                del slots[h]
+            if holder not in slots and len(slots) >= limit:
+                return False
+            slots[holder] = now + ttl
+            return True
+
+    def release(self, name, holder):
+        with self._lock:
+            self._slots.get(name, {}).pop(holder, None)
+
+
+# Each script runs atomically on the server, so concurrent workers on any
+# number of hosts see a consistent queue
+_ENQUEUE = """
+if redis.call('EXISTS', KEYS[1]) == 1 then return 0 end
+redis.call('HSET', KEYS[1], 'id', ARGV[1], 'issue_id', ARGV[2], 'stage', ARGV[3], 'payload', ARGV[4],
+           'state', 'queued', 'attempts', 0)
+redis.call('ZADD', KEYS[2], ARGV[5], ARGV[1])
+return 1
+"""
+
+_CLAIM = """
+local ready = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, 1)
+if #ready == 0 then return nil end
+local key = ARGV[4] .. ready[1]
+redis.call('ZADD', KEYS[1], ARGV[2], ready[1])
+redis.call('HSET', key, 'state', 'running', 'lease', ARGV[3])
+redis.call('HINCRBY', key, 'attempts', 1)
+return ready[1]
+"""
+
+_EXTEND = """
+if redis.call('HGET', KEYS[1], 'lease') ~= ARGV[1] then return 0 end
+return redis.call('ZADD', KEYS[2], 'XX', 'CH', ARGV[2], ARGV[3])
+"""
+
+_COMPLETE = """
+if redis.call('HGET', KEYS[1], 'state') == 'done' then return 0 end
+redis.call('HSET', KEYS[1], 'state', 'done', 'result', ARGV[1])
+redis.call('ZREM', KEYS[2], ARGV[2])
+return 1
+"""
+
+_FAIL = """
+local state = redis.call('HGET', KEYS[1], 'state')
+if state ~= 'running' or redis.call('HGET', KEYS[1], 'lease') ~= ARGV[1] then return state end
+redis.call('HSET', KEYS[1], 'error', ARGV[2])
+if tonumber(redis.call('HGET', KEYS[1], 'attempts')) >= tonumber(ARGV[3]) then
+    redis.call('HSET', KEYS[1], 'state', 'dead')
+    redis.call('ZREM', KEYS[2], ARGV[5])
+    redis.call('RPUSH', KEYS[3], ARGV[5])
+    return 'dead'
+end
+redis.call('HSET', KEYS[1], 'state', 'queued')
+redis.call('ZADD', KEYS[2], ARGV[4], ARGV[5])
+return 'queued'
+"""
+
+_ACQUIRE = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZSCORE', KEYS[1], ARGV[2]) or redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[3]) then
+    redis.call('ZADD', KEYS[1], ARGV[4], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+
+class RedisJobQueue(_SlotsMixin):
+    """
+    Job queue shared by worker processes on any number of hosts: a hash per
+    job, a sorted set of job ids scored by the time they become visible
+    (claiming pushes that time out by the visibility timeout) and a sorted
+    set per resource class holding the cluster-wide slots.
+    """
+
+    def __init__(self, url=None, prefix="swe"):
+        import redis
+        from orchestrator.state_store import REDIS_URL
+        self._redis = redis.Redis.from_url(url or REDIS_URL, decode_responses=True)
+        self._prefix = prefix
+        self._enqueue = self._redis.register_script(_ENQUEUE)
+        self._claim = self._redis.register_script(_CLAIM)
+        self._extend = self._redis.register_script(_EXTEND)
+        self._complete = self._redis.register_script(_COMPLETE)
+        self._fail = self._redis.register_script(_FAIL)
+        self._acquire = self._redis.register_script(_ACQUIRE)
+
+    def _key(self, *parts):
+        return ":".join((self._prefix,) + parts)
+
+    def enqueue(self, job_id, issue_id, stage, payload, at=None):
+        return bool(self._enqueue(keys=[self._key("job", job_id), self._key("jobs", "queue")],
+                                  args=[job_id, issue_id, stage, json.dumps(payload), at or time.time()]))
+
+    def claim(self, visibility_timeout=JOB_VISIBILITY_TIMEOUT):
+        now = time.time()
+        claimed = self._claim(keys=[self._key("jobs", "queue")],
+                              args=[now, now + visibility_timeout, uuid.uuid4().hex, self._key("job", "")])
+        return self.get(claimed) if claimed else None
+
+    def extend(self, job_id, lease, visibility_timeout=JOB_VISIBILITY_TIMEOUT):
+        return bool(self._extend(keys=[self._key("job", job_id), self._key("jobs", "queue")],
+                                 args=[lease, time.time() + visibility_timeout, job_id]))
+
+    def complete(self, job_id, result, next_job=None):
+        if next_job:
+            self.enqueue(*next_job)
+        return bool(self._complete(keys=[self._key("job", job_id), self._key("jobs", "queue")],
+                                   args=[json.dumps(result), job_id]))
+
+    def fail(self, job_id, lease, error, max_attempts=JOB_MAX_ATTEMPTS, retry_delay=JOB_RETRY_DELAY):
+        return self._fail(keys=[self._key("job", job_id), self._key("jobs", "queue"), self._key("jobs", "dead")],
+                          args=[lease, error, max_attempts, time.time() + retry_delay, job_id])
+
+    def get(self, job_id):
+        raw = self._redis.hgetall(self._key("job", job_id))
+        if not raw:
+            return None
+        raw["payload"] = json.loads(raw["payload"])
+        raw["attempts"] = int(raw["attempts"])
+        if "result" in raw:
+            raw["result"] = json.loads(raw["result"])
+        return raw
+
+    def pending(self):
+        return self._redis.zcard(self._key("jobs", "queue"))
+
+    def try_acquire(self, name, holder, limit, ttl):
+        now = time.time()
+        return bool(self._acquire(keys=[self._key("slots", name)], args=[now, holder, limit, now + ttl]))
+
+    def release(self, name, holder):
+        self._redis.zrem(self._key("slots", name), holder)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    """Process-wide job queue selected by JOB_QUEUE (redis or memory)"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = MemoryJobQueue() if JOB_QUEUE == "memory" else RedisJobQueue()
+        return _queue
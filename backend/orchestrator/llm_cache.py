@@ -0,0 +1,133 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "/tmp/swe-agent-llm-cache.sqlite")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Responses starting with these markers are never stored
+UNCACHEABLE_PREFIXES = ("[ERROR]", "[MOCK RESPONSE]")
+
+
+def cache_key(model, prompt, max_output_tokens):
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{model}\0{max_output_tokens}\0{digest}".encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Two-tier, content-addressed cache for LLM responses: an in-memory LRU in
+    front of a SQLite file. Entries expire after `ttl` seconds; the memory
+    tier holds at most `max_entries` and the disk tier at most `max_bytes`
+    of responses, evicting least recently used first.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL,
+                 max_entries=LLM_CACHE_MAX_ENTRIES, max_bytes=LLM_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed)")
+        self._db.commit()
+
+    def get(self, model, prompt, max_output_tokens):
+        key = cache_key(model, prompt, max_output_tokens)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return entry[0]
+            self._memory.pop(key, None)
+
+            row = self._db.execute(
+                "SELECT response, created FROM llm_cache WHERE key = ? AND created > ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self._db.execute("UPDATE llm_cache SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self._remember(key, row[0], row[1])
+            self.stats["disk_hits"] += 1
+            return row[0]
+
+    def put(self, model, prompt, max_output_tokens, response):
+        if not isinstance(response, str) or response.startswith(UNCACHEABLE_PREFIXES):
+            return False
+        key = cache_key(model, prompt, max_output_tokens)
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, response, len(response.encode("utf-8")), now, now),
+            )
+            self._evict(now)
+            self._db.commit()
+            self.stats["stores"] += 1
+        return True
+
+    def _remember(self, key, response, created):
+        self._memory[key] = (response, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self, now):
+        expired = self._db.execute("DELETE FROM llm_cache WHERE created <= ?", (now - self.ttl,)).rowcount
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        evicted = 0
+        if total > self.max_bytes:
+            for key, size in self._db.execute("SELECT key, size FROM llm_cache ORDER BY accessed").fetchall():
+                if total <= self.max_bytes:
+                    break
+                self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._memory.pop(key, None)
+                total -= size
+                evicted += 1
+        self.stats["evictions"] += expired + evicted
+
+    def hit_rate(self):
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return hits / lookups if lookups else 0.0
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._db.execute("DELETE FROM llm_cache")
+            self._db.commit()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide cache, created on first use; None when LLM_CACHE_ENABLED=false"""
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache()
+        return _cache
@@ -0,0 +1,160 @@
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+from orchestrator.scheduler import RESOURCE_LIMITS
+
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "60"))
+GEMINI_TPM = float(os.getenv("GEMINI_TPM", "250000"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "6"))
+GEMINI_BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", "1.0"))
+GEMINI_BACKOFF_MAX = float(os.getenv("GEMINI_BACKOFF_MAX", "60"))
+
+
+def estimate_tokens(prompt, max_output_tokens):
+    """Rough request cost for the token bucket: ~4 characters per prompt token"""
+    return len(prompt) // 4 + max_output_tokens
+
+
+def is_quota_error(error):
+    if getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429:
+        return True
+    if type(error).__name__ in ("ResourceExhausted", "TooManyRequests"):
+        return True
+    message = str(error).lower()
+    return "429" in message or "quota" in message or "rate limit" in message
+
+
+class TokenBucket:
+    """Refills at `per_minute / 60` units per second up to `capacity`"""
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount):
+        """Take `amount` now and return the seconds to wait until it is covered"""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+            self.level -= amount
+            return max(0.0, -self.level / self.rate)
+
+
+class LLMDispatcher:
+    """
+    Shared queue in front of the model. Prompts from every agent are run by
+    `concurrency` worker threads under token buckets for both requests and
+    tokens per minute. Quota errors pause all workers and are retried with
+    jittered exponential backoff, so callers only see [ERROR] once the
+    retries are exhausted or for non-quota failures.
+    """
+
+    def __init__(self, model, requests_per_minute=GEMINI_RPM, tokens_per_minute=GEMINI_TPM,
+                 concurrency=None, max_retries=GEMINI_MAX_RETRIES,
+                 backoff_base=GEMINI_BACKOFF_BASE, backoff_max=GEMINI_BACKOFF_MAX,
+                 request_burst=None, token_burst=None):
+        self.model = model
+        self.requests = TokenBucket(requests_per_minute, request_burst)
+        self.tokens = TokenBucket(tokens_per_minute, token_burst)
+        self.concurrency = concurrency or RESOURCE_LIMITS["llm"]
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "retries": 0,
+                      "in_flight": 0, "total_wait": 0.0, "max_wait": 0.0}
+        self._queue = queue.Queue()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._workers = []
+
+    def submit(self, prompt, max_output_tokens=512):
+        """Queue a prompt; the returned Future resolves to the generated text"""
+        self._start()
+        future = Future()
+        with self._lock:
+            self.stats["submitted"] += 1
+        self._queue.put((prompt, max_output_tokens, future, time.monotonic()))
+        return future
+
+    def generate(self, prompt, max_output_tokens=512):
+        return self.submit(prompt, max_output_tokens).result()
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        started = stats["completed"] + stats["failed"] + stats["in_flight"]
+        stats["queue_depth"] = self.queue_depth()
+        stats["avg_wait"] = stats["total_wait"] / started if started else 0.0
+        return stats
+
+    def _start(self):
+        with self._lock:
+            while len(self._workers) < self.concurrency:
+                worker = threading.Thread(target=self._work, name=f"llm-dispatch-{len(self._workers)}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _throttle(self, cost):
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            time.sleep(pause)
+        delay = max(self.requests.reserve(1), self.tokens.reserve(cost))
+        if delay > 0:
+            time.sleep(delay)
+
+    def _backoff(self, attempt):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        delay *= random.uniform(0.5, 1.5)
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self.stats["retries"] += 1
+
+    def _work(self):
+        while True:
+            prompt, max_output_tokens, future, submitted = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            cost = estimate_tokens(prompt, max_output_tokens)
+            self._throttle(cost)
+            waited = time.monotonic() - submitted
+            with self._lock:
+                self.stats["in_flight"] += 1
+                self.stats["total_wait"] += waited
+                self.stats["max_wait"] = max(self.stats["max_wait"], waited)
+            try:
+                future.set_result(self._generate(prompt, max_output_tokens, cost))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self.stats["in_flight"] -= 1
+
+    def _generate(self, prompt, max_output_tokens, cost):
+        attempt = 0
+        while True:
+            try:
+                text = self.model.predict(prompt, max_output_tokens=max_output_tokens).text
+                with self._lock:
+                    self.stats["completed"] += 1
+                return text
+            except Exception as e:
+                if not is_quota_error(e) or attempt >= self.max_retries:
+                    logging.error(f"Error generating text with Gemini: {e}")
+                    with self._lock:
+                        self.stats["failed"] += 1
+                    return f"[ERROR] Failed to generate text: {str(e)}"
+                self._backoff(attempt)
+                attempt += 1
+                self._throttle(cost)
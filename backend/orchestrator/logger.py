@@ -0,0 +1,336 @@
+import atexit
+import contextvars
+import functools
+import hashlib
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+# Finished spans are also written here as OTLP/JSON files when set
+TRACE_EXPORT_DIR = os.getenv("TRACE_EXPORT_DIR", "")
+TRACE_EXPORT_INTERVAL = float(os.getenv("TRACE_EXPORT_INTERVAL", "5"))
+# Spans kept for the next export; beyond this they are dropped (and counted)
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "10000"))
+# Every process pushes its metrics to the state store this often; /metrics
+# merges the snapshots of processes that reported within METRICS_TTL, plus
+# the retired totals of those that stopped before
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "15"))
+METRICS_TTL = float(os.getenv("METRICS_TTL", "3600"))
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "swe-agent")
+
+# Unique per process start, so a restart (e.g. as pid 1 in a new container) never overwrites the old snapshot
+SOURCE = f"{socket.gethostname()}:{os.getpid()}:{random.getrandbits(32):08x}"
+LATENCY_BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+# Span attributes passed down to child spans
+INHERITED = ("issue_id", "stage", "round")
+
+METRIC_HELP = {
+    "swe_agent_span_seconds": ("histogram", "Span latency by span name and pipeline stage"),
+    "swe_agent_span_errors_total": ("counter", "Spans that ended with an exception"),
+    "swe_agent_resource_wait_seconds": ("histogram", "Time waiting for a scheduler resource slot"),
+    "swe_agent_tool_queue_wait_seconds": ("histogram", "Build admission wait reported by Maven/Sonar tools"),
+    "swe_agent_tool_run_seconds": ("histogram", "Build run time reported by Maven/Sonar tools"),
+    "swe_agent_tool_results_total": ("counter", "Tool results by whether they were served from the result cache"),
+    "swe_agent_llm_requests_total": ("counter", "LLM calls by cache outcome (hit, miss, off, mock)"),
+    "swe_agent_llm_tokens_total": ("counter", "Estimated LLM tokens (4 characters per token) by kind"),
+    "swe_agent_prompts_total": ("counter", "Budgeted prompts built, by prompt and whether sections were cut"),
+    "swe_agent_prompt_tokens_total": ("counter", "Estimated tokens of budgeted prompts by prompt and section"),
+    "swe_agent_prompt_omitted_tokens_total": ("counter", "Estimated tokens cut from budgeted prompts to fit"),
+    "swe_agent_time_to_pr_seconds": ("histogram", "From an issue entering the pipeline to its PR, by Jira priority"),
+    "swe_agent_spans_dropped_total": ("counter", "Spans dropped because the export buffer was full"),
+}
+
+_current = contextvars.ContextVar("span", default=None)
+
+
+class Metrics:
+    """Counters and fixed-bucket histograms per (name, labels); snapshots from many processes merge by summing"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = [[0] * len(LATENCY_BUCKETS), 0.0, 0]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    hist[0][i] += 1
+                    break
+            hist[1] += value
+            hist[2] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {"counters": [[n, dict(l), v] for (n, l), v in self.counters.items()],
+                    "histograms": [[n, dict(l), list(h[0]), h[1], h[2]] for (n, l), h in self.histograms.items()]}
+
+
+metrics = Metrics()
+
+
+def _labels(labels, **extra):
+    items = {**labels, **extra}
+    if not items:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in items.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(items, escaped)) + "}"
+
+
+def render_prometheus(snapshots):
+    """Prometheus text exposition of the summed `snapshots`"""
+    counters, histograms = {}, {}
+    for snap in snapshots:
+        for name, labels, value in snap.get("counters", []):
+            key = (name, tuple(sorted(labels.items())))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, buckets, total, count in snap.get("histograms", []):
+            key = (name, tuple(sorted(labels.items())))
+            merged = histograms.setdefault(key, [[0] * len(LATENCY_BUCKETS), 0.0, 0])
+            merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+            merged[1] += total
+            merged[2] += count
+
+    lines = []
+    for name in sorted({n for n, _ in counters} | {n for n, _ in histograms}):
+        kind, help_text = METRIC_HELP.get(name, ("untyped", name))
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for (n, labels), value in sorted(counters.items()):
+            if n == name:
+                lines.append(f"{name}{_labels(dict(labels))} {value}")
+        for (n, labels), (buckets, total, count) in sorted(histograms.items()):
+            if n != name:
+                continue
+            cumulative = 0
+            for bound, hits in zip(LATENCY_BUCKETS, buckets):
+                cumulative += hits
+                lines.append(f"{name}_bucket{_labels(dict(labels), le=bound)} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(dict(labels), le='+Inf')} {count}")
+            lines.append(f"{name}_sum{_labels(dict(labels))} {total:.6f}")
+            lines.append(f"{name}_count{_labels(dict(labels))} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def render_metrics():
+    """Metrics of every process that reported recently, with this process's live values"""
+    from orchestrator.state_store import get_store
+    snapshots = get_store().load_metrics(METRICS_TTL)
+    snapshots[SOURCE] = metrics.snapshot()
+    return render_prometheus(snapshots.values())
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update((k, v) for k, v in attributes.items() if v is not None)
+
+
+def _trace_id(issue_id):
+    # Every span of an issue lands in the same trace, across stages, processes and workers
+    if issue_id is not None:
+        return hashlib.sha256(f"issue:{issue_id}".encode()).hexdigest()[:32]
+    return f"{random.getrandbits(128):032x}"
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time the block as a span named `name`. issue_id/stage/round are inherited
+    from the enclosing span; the latency lands in swe_agent_span_seconds and,
+    with TRACE_EXPORT_DIR set, the span in the next OTLP/JSON trace file.
+    """
+    if not TRACING_ENABLED:
+        yield Span(name, None, None, {})
+        return
+    parent = _current.get()
+    attrs = {k: parent.attributes[k] for k in INHERITED if parent and k in parent.attributes}
+    attrs.update((k, v) for k, v in attributes.items() if v is not None)
+    current = Span(name, parent.trace_id if parent else _trace_id(attrs.get("issue_id")),
+                   parent.span_id if parent else None, attrs)
+    token = _current.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        current.end_ns = time.time_ns()
+        labels = {"span": name, "stage": attrs.get("stage", "")}
+        metrics.observe("swe_agent_span_seconds", time.perf_counter() - start, **labels)
+        if current.error:
+            metrics.inc("swe_agent_span_errors_total", **labels)
+        _exporter.add(current)
+
+
+def traced_agent(stage):
+    """Run an agent coroutine inside an `agent.<stage>` span tagged with its issue id and auto-fix round"""
+    def wrap(fn):
+        @functools.wraps(fn)
+        async def run(task, *args, **kwargs):
+            with span(f"agent.{stage}", issue_id=task.get("issue_id", task.get("id")), stage=stage,
+                      round=task.get("fix_round")):
+                return await fn(task, *args, **kwargs)
+        return run
+    return wrap
+
+
+def record_tool_result(tool, result):
+    """Queue-wait/run-time split and result-cache outcome reported in a Maven/Sonar tool result"""
+    if not isinstance(result, dict):
+        return
+    if "queue_wait" in result:
+        metrics.observe("swe_agent_tool_queue_wait_seconds", result["queue_wait"], tool=tool)
+    if "duration" in result and not result.get("cached"):
+        metrics.observe("swe_agent_tool_run_seconds", result["duration"], tool=tool)
+    if "cached" in result:
+        metrics.inc("swe_agent_tool_results_total", tool=tool, cached=str(bool(result["cached"])).lower())
+
+
+def record_llm(current, prompt, text, cache):
+    """Token estimates and cache outcome (hit, miss, off, mock) of one LLM call"""
+    prompt_tokens, output_tokens = len(prompt) // 4, len(text or "") // 4
+    current.set(cache=cache, prompt_tokens=prompt_tokens, output_tokens=output_tokens)
+    metrics.inc("swe_agent_llm_requests_total", cache=cache)
+    if cache in ("miss", "off"):
+        metrics.inc("swe_agent_llm_tokens_total", prompt_tokens, kind="prompt")
+        metrics.inc("swe_agent_llm_tokens_total", output_tokens, kind="output")
+
+
+def record_prompt(report):
+    """Per-section token usage of a prompt built by prompt_budget.PromptBuilder"""
+    name = report["prompt"]
+    current = _current.get()
+    if current is not None:
+        current.set(prompt=name, prompt_budget=report["budget"], prompt_tokens_budgeted=report["tokens"],
+                    prompt_omitted_tokens=sum(report["omitted"].values()))
+    metrics.inc("swe_agent_prompts_total", prompt=name, truncated=str(bool(report["omitted"])).lower())
+    for section, tokens in report["sections"].items():
+        metrics.inc("swe_agent_prompt_tokens_total", tokens, prompt=name, section=section)
+    for section, tokens in report["omitted"].items():
+        metrics.inc("swe_agent_prompt_omitted_tokens_total", tokens, prompt=name, section=section)
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_json(spans):
+    """OTLP/JSON ExportTraceServiceRequest for `spans`"""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}},
+                                    {"key": "host.name", "value": {"stringValue": socket.gethostname()}},
+                                    {"key": "process.pid", "value": {"intValue": str(os.getpid())}}]},
+        "scopeSpans": [{"scope": {"name": "orchestrator"}, "spans": [{
+            "traceId": s.trace_id, "spanId": s.span_id, "parentSpanId": s.parent_id or "", "name": s.name,
+            "kind": 1, "startTimeUnixNano": str(s.start_ns), "endTimeUnixNano": str(s.end_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+            "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+        } for s in spans]}],
+    }]}
+
+
+class Exporter:
+    """
+    Background thread that pushes this process's metrics to the state store
+    and, with TRACE_EXPORT_DIR set, writes buffered spans to OTLP/JSON files.
+    Spans are only appended to a bounded deque on the hot path.
+    """
+
+    def __init__(self, trace_dir=TRACE_EXPORT_DIR):
+        self.trace_dir = trace_dir
+        self._spans = deque(maxlen=TRACE_BUFFER_SIZE) if trace_dir else None
+        self._started = False
+        self._lock = threading.Lock()
+        self._files = 0
+
+    def add(self, finished):
+        if self._spans is not None:
+            if len(self._spans) == self._spans.maxlen:
+                metrics.inc("swe_agent_spans_dropped_total")
+            self._spans.append(finished)
+        if not self._started:
+            self._start()
+
+    def _start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._run, name="telemetry-export", daemon=True).start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        last_metrics = time.monotonic()
+        while True:
+            time.sleep(TRACE_EXPORT_INTERVAL if self.trace_dir else METRICS_FLUSH_INTERVAL)
+            self.flush_spans()
+            if time.monotonic() - last_metrics >= METRICS_FLUSH_INTERVAL:
+                self.flush_metrics()
+                last_metrics = time.monotonic()
+
+    def flush_spans(self):
+        if not self._spans:
+            return
+        batch = []
+        while self._spans:
+            batch.append(self._spans.popleft())
+        with self._lock:
+            self._files += 1
+            name = f"traces-{socket.gethostname()}-{os.getpid()}-{int(time.time())}-{self._files}.json"
+        try:
+            os.makedirs(self.trace_dir, exist_ok=True)
+            tmp = os.path.join(self.trace_dir, f".{name}.tmp")
+            with open(tmp, "w") as f:
+                json.dump(otlp_json(batch), f, separators=(",", ":"))
+            os.replace(tmp, os.path.join(self.trace_dir, name))
+        except OSError as e:
+            logging.warning(f"Could not write trace file: {e}")
+
+    def flush_metrics(self):
+        try:
+            from orchestrator.state_store import get_store
+            get_store().save_metrics(SOURCE, metrics.snapshot())
+        except Exception as e:
+            logging.warning(f"Could not publish metrics: {e}")
+
+    def flush(self):
+        self.flush_spans()
+        self.flush_metrics()
+
+
+_exporter = Exporter()
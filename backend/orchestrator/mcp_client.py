@@ -1,10 +1,160 @@
 # backend/orchestrator/mcp_client.py
 
-from mcp.server import Server
-
-# Create MCP servers for each agent type
-jira_client = Server("jira")
-github_client = Server("github")
-maven_client = Server("maven")
-filesystem_client = Server("filesystem")
-sonar_client = Server("sonar")
+import asyncio
+import json
+import logging
+import os
+import shlex
+import sys
+import threading
+from pathlib import Path
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from orchestrator.logger import record_tool_result, span
+
+MCP_SERVERS_DIR = os.getenv("MCP_SERVERS_DIR", str(Path(__file__).resolve().parents[2] / "mcp_servers"))
+
+
+class MCPToolError(RuntimeError):
+    pass
+
+
+class MCPSession:
+    """
+    One long-lived client session per MCP server. The server process is
+    started on first use and concurrent tool calls are multiplexed over the
+    same stdio stream. Tools are exposed as coroutine attributes:
+
+        issues = await jira_session.list_issues(assignee="AI-Agent")
+    """
+
+    def __init__(self, name):
+        self.name = name
+        # MCP_<NAME>_COMMAND overrides how the server is launched
+        command = os.getenv(f"MCP_{name.upper()}_COMMAND")
+        argv = shlex.split(command) if command else [sys.executable, os.path.join(MCP_SERVERS_DIR, f"{name}_mcp_server.py")]
+        self.params = StdioServerParameters(command=argv[0], args=argv[1:], env=dict(os.environ))
+        self._session = None
+        self._ready = None
+        self._closing = None
+        self._task = None
+        self._local = None
+
+    def attach(self, server):
+        """
+        Answer tool calls from `server`, anything with ClientSession's
+        call_tool(), in this process instead of launching the MCP server
+        (e.g. the load-simulation stand-ins in scripts/load_standins.py).
+        None detaches it again.
+        """
+        self._local = server
+
+    async def _run(self):
+        try:
+            async with stdio_client(self.params) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    self._session = session
+                    self._ready.set_result(None)
+                    await self._closing.wait()
+        except Exception as e:
+            if not self._ready.done():
+                self._ready.set_exception(e)
+            else:
+                logging.error(f"MCP session '{self.name}' ended: {e}")
+        finally:
+            self._session = None
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            loop = asyncio.get_running_loop()
+            self._ready = loop.create_future()
+            self._closing = asyncio.Event()
+            self._task = loop.create_task(self._run())
+        await asyncio.shield(self._ready)
+
+    async def close(self):
+        if self._task is not None and not self._task.done():
+            self._closing.set()
+            await self._task
+
+    async def call(self, tool, **arguments):
+        if self._local is None:
+            await self.start()
+        session = self._local or self._session
+        if session is None:
+            raise MCPToolError(f"{self.name} session is closed")
+        with span(f"mcp.{self.name}.{tool}", server=self.name, tool=tool):
+            result = await session.call_tool(tool, arguments)
+            text = "".join(c.text for c in result.content if getattr(c, "type", None) == "text")
+            if result.isError:
+                raise MCPToolError(f"{self.name}.{tool} failed: {text}")
+            try:
+                value = json.loads(text)
+            except ValueError:
+                return text
+        record_tool_result(f"{self.name}.{tool}", value)
+        return value
+
+    def __getattr__(self, tool):
+        if tool.startswith("_"):
+            raise AttributeError(tool)
+
+        async def call(**arguments):
+            return await self.call(tool, **arguments)
+        return call
+
+
+# Background event loop that owns every session; sync callers submit to it
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="mcp-loop", daemon=True).start()
+        return _loop
+
+
+def run_sync(coro):
+    """Run a coroutine on the orchestrator loop and block for its result"""
+    loop = get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_sync() called from the orchestrator loop; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+class SyncToolClient:
+    """Blocking facade over an MCPSession, e.g. jira_client.list_issues(assignee=...)"""
+
+    def __init__(self, session):
+        self._session = session
+
+    def __getattr__(self, tool):
+        if tool.startswith("_"):
+            raise AttributeError(tool)
+
+        def call(**arguments):
+            return run_sync(self._session.call(tool, **arguments))
+        return call
+
+
+jira_session = MCPSession("jira")
+github_session = MCPSession("github")
+maven_session = MCPSession("maven")
+filesystem_session = MCPSession("filesystem")
+sonar_session = MCPSession("sonar")
+
+jira_client = SyncToolClient(jira_session)
+github_client = SyncToolClient(github_session)
+maven_client = SyncToolClient(maven_session)
+filesystem_client = SyncToolClient(filesystem_session)
+sonar_client = SyncToolClient(sonar_session)
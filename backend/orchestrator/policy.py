@@ -0,0 +1,141 @@
+import contextvars
+import itertools
+import logging
+import math
+import os
+import time
+from datetime import datetime
+from orchestrator.logger import METRICS_TTL, SOURCE, metrics
+
+# priority: resource slots go to the best-ranked waiting issue; fifo: to the longest-waiting one
+SCHEDULING_POLICY = os.getenv("SCHEDULING_POLICY", "priority")
+# Capacity is shared evenly across this Jira field within a priority band: project, assignee or none
+FAIR_SHARE_BY = os.getenv("FAIR_SHARE_BY", "project")
+# An issue waiting this many hours (since it was created in Jira) climbs one priority rank,
+# by at most PRIORITY_AGING_MAX_RANKS, so low priorities are not starved
+PRIORITY_AGING_HOURS = float(os.getenv("PRIORITY_AGING_HOURS", "72"))
+PRIORITY_AGING_MAX_RANKS = float(os.getenv("PRIORITY_AGING_MAX_RANKS", "2"))
+# Ranks an issue drops for every auto-fix round after the first
+AUTO_FIX_ROUND_PENALTY = float(os.getenv("AUTO_FIX_ROUND_PENALTY", "0.5"))
+# Expected stage durations come from the agent span histograms, re-read this often
+STAGE_COST_REFRESH = float(os.getenv("STAGE_COST_REFRESH", "60"))
+# Waiting issues are re-banded this often (seconds), so aging applies while they wait
+RERANK_INTERVAL = 60.0
+
+# Jira priority name -> rank (0 runs first); missing or unknown priorities rank as Medium
+PRIORITY_RANKS = {"highest": 0, "blocker": 0, "critical": 1, "high": 1, "major": 2, "medium": 2,
+                  "low": 3, "minor": 3, "lowest": 4, "trivial": 4}
+DEFAULT_RANK = 2
+# Jira fields the policy reads; list_issues must fetch them (see JIRA_FIELDS)
+SCHEDULING_FIELDS = ("priority", "created", "project", "assignee")
+# Pipeline stages in order, with the durations assumed until spans of each have been recorded
+STAGES = ("planner", "coder", "auto_fix")
+STAGE_COST_DEFAULTS = {"planner": 30.0, "coder": 120.0, "auto_fix": 300.0}
+
+current_ticket = contextvars.ContextVar("ticket", default=None)
+_seq = itertools.count()
+_costs = None
+_costs_at = 0.0
+
+
+def _created(value, default):
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%f%z").timestamp()
+    except (TypeError, ValueError):
+        return default
+
+
+def _name(value):
+    # Jira returns objects for priority/project/assignee
+    if isinstance(value, dict):
+        return value.get("name") or value.get("key") or value.get("displayName")
+    return value
+
+
+class Ticket:
+    """What the policy knows about one issue in the pipeline: Jira priority, age, fair-share group and progress"""
+
+    def __init__(self, issue_id, fields=None, fsm=None, enqueued=None):
+        fields = fields or {}
+        self.issue_id = issue_id
+        self.fields = {k: fields[k] for k in SCHEDULING_FIELDS if fields.get(k) is not None}
+        self.priority = _name(fields.get("priority")) or "Medium"
+        self.rank = PRIORITY_RANKS.get(str(self.priority).lower(), DEFAULT_RANK)
+        self.enqueued = enqueued or time.time()
+        self.created = _created(fields.get("created"), self.enqueued)
+        self.group = _name(fields.get(FAIR_SHARE_BY)) if FAIR_SHARE_BY in SCHEDULING_FIELDS else None
+        self.fsm = fsm
+        self.seq = next(_seq)
+
+    @classmethod
+    def from_item(cls, item):
+        """Ticket for a pipeline item: an (issue, fsm) pair or a task dict carrying `jira_fields` and `queued_at`"""
+        if isinstance(item, tuple):
+            issue, fsm = item
+            return cls(issue["id"], issue.get("fields"), fsm)
+        return cls(item.get("issue_id"), item.get("jira_fields"), item.get("fsm"), item.get("queued_at"))
+
+    def rounds(self):
+        return self.fsm.count("auto_fix") if self.fsm else 0
+
+    def stage(self):
+        """Index in STAGES of the stage the issue is in"""
+        state = self.fsm.get_state() if self.fsm else None
+        return 0 if state is None else 1 if state == "planned" else 2
+
+    def band(self, now):
+        aging = min((now - self.created) / 3600 / PRIORITY_AGING_HOURS, PRIORITY_AGING_MAX_RANKS)
+        penalty = AUTO_FIX_ROUND_PENALTY * max(self.rounds() - 1, 0)
+        return max(math.floor(self.rank + penalty - max(aging, 0)), 0)
+
+    def expected_remaining(self):
+        costs = stage_costs()
+        return sum(costs[stage] for stage in STAGES[self.stage():])
+
+
+def stage_costs():
+    """
+    Mean duration of each pipeline stage from the agent.<stage> span
+    histograms of this process and of every process that reported to the
+    state store within METRICS_TTL; STAGE_COST_DEFAULTS until there are any.
+    """
+    global _costs, _costs_at
+    if _costs is not None and time.monotonic() - _costs_at < STAGE_COST_REFRESH:
+        return _costs
+    snapshots = [metrics.snapshot()]
+    try:
+        from orchestrator.state_store import RETIRED_METRICS, get_store
+        snapshots += [s for source, s in get_store().load_metrics(METRICS_TTL).items()
+                      if source not in (SOURCE, RETIRED_METRICS)]
+    except Exception as e:
+        logging.warning(f"Stage timings from other processes unavailable: {e}")
+    totals = {}
+    for snap in snapshots:
+        for name, labels, _, total, count in snap.get("histograms", []):
+            stage = labels.get("stage")
+            if name == "swe_agent_span_seconds" and labels.get("span") == f"agent.{stage}":
+                t = totals.setdefault(stage, [0.0, 0])
+                t[0] += total
+                t[1] += count
+    _costs = {stage: totals[stage][0] / totals[stage][1] if totals.get(stage, [0, 0])[1] else default
+              for stage, default in STAGE_COST_DEFAULTS.items()}
+    _costs_at = time.monotonic()
+    return _costs
+
+
+def queue_key(ticket, now):
+    """((band, fair-share group), order within it) of a waiter; see sort_key()"""
+    if ticket is None:
+        return (DEFAULT_RANK, None), (0.0, -1)
+    return (ticket.band(now), ticket.group), (ticket.expected_remaining(), ticket.seq)
+
+
+def sort_key(ticket, usage, now):
+    """
+    Order in which waiters get a resource slot: priority band (Jira
+    priority, raised by age, lowered by auto-fix rounds), then the fair-share
+    group that has held the resource least, then least expected remaining
+    work, then arrival. Work outside the pipeline ranks as Medium.
+    """
+    (band, group), order = queue_key(ticket, now)
+    return (band, usage.get(group, 0.0), *order)
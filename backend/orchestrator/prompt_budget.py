@@ -0,0 +1,273 @@
+import logging
+import os
+import re
+from orchestrator.logger import record_prompt
+
+# Prompt tokens allowed per LLM call, whatever the build output looks like
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+# Source lines shown above and below each line a failure points at
+PROMPT_SNIPPET_LINES = int(os.getenv("PROMPT_SNIPPET_LINES", "6"))
+PROMPT_MAX_SNIPPETS = int(os.getenv("PROMPT_MAX_SNIPPETS", "4"))
+# Chunks retrieved from the repository code index per prompt (0 disables retrieval)
+PROMPT_CODE_RESULTS = int(os.getenv("PROMPT_CODE_RESULTS", "5"))
+# Sections cut below this many tokens are dropped rather than kept as a stub
+MIN_SECTION_TOKENS = 24
+
+_FRAME = re.compile(r"^\s*at\s+(?P<frame>(?P<cls>[\w.$]+)\.[\w$<>]+\((?P<file>[\w$]+\.java):(?P<line>\d+)\))")
+# Numbers, addresses and durations that make otherwise identical log lines differ
+_VOLATILE = re.compile(r"0x[0-9a-fA-F]+|\d+(?:\.\d+)?")
+
+
+def count_tokens(text):
+    """Estimated tokens of `text`; the same ~4 characters per token the dispatcher budgets with"""
+    return (len(text) + 3) // 4
+
+
+def dedupe_log(text):
+    """
+    Collapse noise in build output: a stack trace identical to an earlier one
+    becomes a one-line back-reference, and a line repeated anywhere in the
+    log (ignoring numbers) is kept once with a repeat count.
+    """
+    lines, counts, index, traces = [], [], {}, set()
+    block = []
+
+    def flush():
+        if not block:
+            return
+        key = tuple(_VOLATILE.sub("#", f.strip()) for f in block)
+        if key in traces:
+            lines.append(f"    ... same {len(block)} frames as above")
+            counts.append(1)
+        else:
+            traces.add(key)
+            lines.extend(block)
+            counts.extend([1] * len(block))
+        block.clear()
+
+    for line in text.splitlines():
+        if _FRAME.match(line):
+            block.append(line.rstrip())
+            continue
+        flush()
+        if not line.strip():
+            continue
+        key = _VOLATILE.sub("#", line.strip())
+        if key in index:
+            counts[index[key]] += 1
+            continue
+        index[key] = len(lines)
+        lines.append(line.rstrip())
+        counts.append(1)
+    flush()
+    return "\n".join(line if n == 1 else f"{line}  [x{n}]" for line, n in zip(lines, counts))
+
+
+def _frame_ref(frame):
+    """(path relative to the repo, line) candidates for a "pkg.Cls.method(Cls.java:12)" frame"""
+    match = _FRAME.match(f"at {frame}")
+    if not match:
+        return None
+    cls = match.group("cls").split("$")[0]
+    package = cls.rsplit(".", 1)[0].replace(".", "/") + "/" if "." in cls else ""
+    name = match.group("file")
+    return (f"src/main/java/{package}{name}", f"src/test/java/{package}{name}", name), int(match.group("line"))
+
+
+def rank_failures(test_result, sonar_result=None):
+    """
+    Failures worth showing the model, most useful first, as (text, refs)
+    items where refs are ((candidate paths...), line) source locations.
+    Compile errors come first, then test errors and failures, then Sonar
+    issues; failures with the same message at the same place are merged.
+    Without digests the summaries are deduplicated and returned whole.
+    """
+    digest = (test_result or {}).get("digest")
+    sonar_digest = (sonar_result or {}).get("digest")
+    ranked = []
+    if digest:
+        for e in digest.get("compile_errors", []):
+            ranked.append((0, f"COMPILE {e['file']}:{e['line']}: {e['message']}", [((e["file"],), e["line"])]))
+
+        groups = {}
+        for f in digest.get("failures", []):
+            key = (f["kind"], _VOLATILE.sub("#", f["message"] or ""), f["frames"][0] if f["frames"] else "")
+            groups.setdefault(key, []).append(f)
+        for (kind, _, _), group in groups.items():
+            first = group[0]
+            text = f"{kind.upper()} {first['test_class']}.{first['test_method']}: {first['message'] or ''}"
+            if len(group) > 1:
+                others = ", ".join(f"{f['test_class'].rsplit('.', 1)[-1]}.{f['test_method']}" for f in group[1:4])
+                text += f"\n    (+{len(group) - 1} more with the same failure: {others}{', ...' if len(group) > 4 else ''})"
+            text += "".join(f"\n    at {frame}" for frame in first["frames"])
+            refs = [ref for ref in map(_frame_ref, first["frames"][:1]) if ref]
+            # Errors (exceptions) usually point closer to the bug than assertion failures
+            ranked.append((1 if kind == "error" else 2, text, refs))
+
+        for goal in digest.get("goal_errors", []):
+            ranked.append((4, goal, []))
+    elif test_result and not test_result.get("success", True):
+        ranked.append((1, dedupe_log(test_result.get("summary") or ""), []))
+
+    if sonar_digest:
+        by_rule = {}
+        for i in sonar_digest.get("issues", []):
+            by_rule.setdefault(i["rule"], []).append(i)
+        for rule, issues in by_rule.items():
+            first = issues[0]
+            text = f"{rule} {first['file']}:{first['line']}: {first['message']}"
+            if len(issues) > 1:
+                text += f" (+{len(issues) - 1} more: " + ", ".join(f"{i['file']}:{i['line']}" for i in issues[1:4]) + ")"
+            ranked.append((3, text, [((first["file"],), first["line"])] if first.get("line") else []))
+        if sonar_digest.get("quality_gate"):
+            ranked.append((3, f"Quality gate: {sonar_digest['quality_gate']}", []))
+        for error in sonar_digest.get("errors", []):
+            ranked.append((4, error, []))
+    elif sonar_result and sonar_result.get("logs"):
+        ranked.append((3, dedupe_log(sonar_result["logs"]), []))
+
+    ranked.sort(key=lambda item: item[0])
+    return [(text, refs) for _, text, refs in ranked if text.strip()]
+
+
+async def source_snippets(read_files, repo_path, failures, limit=PROMPT_MAX_SNIPPETS, context=PROMPT_SNIPPET_LINES):
+    """
+    Numbered source excerpts around the lines `failures` reference, fetched
+    in one ranged bulk read with `read_files(files=[...])` (the filesystem
+    MCP tool). At most `limit` excerpts are shown; lines inside one already
+    shown and unreadable paths are skipped.
+    """
+    refs = list(dict.fromkeys(ref for _, refs in failures for ref in refs))[:limit * 4]
+    wanted = [(paths, line, path if os.path.isabs(path) else os.path.join(repo_path, path))
+              for paths, line in refs for path in paths]
+    if not wanted:
+        return []
+    reply = await read_files(files=[{"path": full, "start_line": max(line - context, 1), "end_line": line + context}
+                                    for _, line, full in wanted])
+    snippets, shown, done = [], {}, set()
+    for (paths, line, full), result in zip(wanted, reply["files"]):
+        if len(snippets) >= limit:
+            break
+        # The first candidate path that exists and reaches the line wins
+        if (paths, line) in done or "error" in result or result["end_line"] < line:
+            continue
+        done.add((paths, line))
+        if any(start <= line <= end for start, end in shown.get(full, ())):
+            continue
+        shown.setdefault(full, []).append((result["start_line"], result["end_line"]))
+        body = "\n".join(f"{'>' if n == line else ' '}{n:5} {text}"
+                         for n, text in enumerate(result["content"].splitlines(), result["start_line"]))
+        snippets.append(f"{os.path.relpath(full, repo_path)}:{line}\n{body}")
+    return snippets
+
+
+async def related_code(search_code, query, limit=PROMPT_CODE_RESULTS):
+    """
+    The indexed code chunks that best match `query`, as prompt items, from
+    the GitHub server's `search_code` tool. Retrieval is best effort: with
+    no index yet (or no repository configured) the prompt goes without.
+    """
+    if limit <= 0 or not query.strip():
+        return []
+    try:
+        # A read of the index, which the server keeps up to date in the background
+        found = await search_code(query=query, limit=limit)
+    except Exception as e:
+        logging.warning(f"Code search failed: {e}")
+        return []
+    return [f"{r['path']}:{r['start_line']}-{r['end_line']} ({r['symbol'] or 'file header'})\n{r['text']}"
+            for r in found["results"]]
+
+
+def _clip(text, tokens):
+    """Leading lines of `text` that fit in `tokens`, with a marker for what was cut"""
+    kept, used = [], 0
+    for line in text.splitlines():
+        cost = count_tokens(line + "\n")
+        if used + cost > tokens:
+            break
+        kept.append(line)
+        used += cost
+    if not kept:
+        # One long line (minified output, a huge message): cut it instead
+        kept, used = [text[:tokens * 4]], tokens
+    omitted = count_tokens(text) - used
+    return "\n".join(kept + [f"[... {omitted} tokens omitted]"])
+
+
+class PromptBuilder:
+    """
+    Assembles a prompt from titled sections that fits `budget` tokens.
+
+    Sections are filled in priority order (lower first) and emitted in the
+    order they were added, each under a "Title:" line unless heading=False.
+    Text sections that don't fit are cut to their leading lines; list
+    sections keep whole items, in order, and note how many were left out (a
+    first item too long on its own is cut like text). `limit` caps a
+    section's share so one noisy section cannot crowd out the rest. build()
+    returns the prompt and its per-section token usage, which is also
+    reported to the metrics registry.
+    """
+
+    def __init__(self, name, budget=PROMPT_TOKEN_BUDGET):
+        self.name = name
+        self.budget = budget
+        self.sections = []
+
+    def add(self, title, content, priority=0, limit=None, heading=True):
+        if content:
+            self.sections.append({"title": title, "content": content, "priority": priority, "limit": limit,
+                                  "heading": heading})
+        return self
+
+    def _fit(self, section, tokens):
+        heading = f"{section['title']}:\n" if section["heading"] else ""
+        tokens -= count_tokens(heading)
+        content = section["content"]
+        if isinstance(content, str):
+            if count_tokens(content) <= tokens:
+                return heading + content, 0
+            if tokens < MIN_SECTION_TOKENS:
+                return None, count_tokens(content)
+            return heading + _clip(content, tokens - 8), count_tokens(content)
+        kept, used = [], 0
+        for item in content:
+            cost = count_tokens(item + "\n")
+            if used + cost > tokens - 8:
+                break
+            kept.append(item)
+            used += cost
+        if not kept:
+            if tokens < MIN_SECTION_TOKENS:
+                return None, sum(count_tokens(item) for item in content)
+            # The first item alone is over the limit: keep its head rather than nothing
+            first = _clip(content[0], tokens - 16)
+            omitted = content[1:]
+            kept = [first] + ([f"[... {len(omitted)} more omitted]"] if omitted else [])
+            return (heading + "\n".join(kept),
+                    count_tokens(content[0]) - count_tokens(first) + sum(count_tokens(item) for item in omitted))
+        omitted = content[len(kept):]
+        if omitted:
+            kept.append(f"[... {len(omitted)} more omitted]")
+        return heading + "\n".join(kept), sum(count_tokens(item) for item in omitted)
+
+    def build(self):
+        remaining = self.budget
+        rendered, usage, omitted = {}, {}, {}
+        for i, section in sorted(enumerate(self.sections), key=lambda s: s[1]["priority"]):
+            tokens = remaining if section["limit"] is None else min(remaining, section["limit"])
+            text, cut = self._fit(section, tokens)
+            if cut:
+                omitted[section["title"]] = cut
+            if text is None:
+                continue
+            rendered[i] = text
+            usage[section["title"]] = count_tokens(text + "\n\n")
+            remaining -= usage[section["title"]]
+        prompt = "\n\n".join(rendered[i] for i in sorted(rendered))
+        report = {"prompt": self.name, "budget": self.budget, "tokens": count_tokens(prompt),
+                  "sections": usage, "omitted": omitted}
+        if omitted:
+            logging.info(f"Prompt {self.name}: {report['tokens']}/{self.budget} tokens, cut {omitted}")
+        record_prompt(report)
+        return prompt, report
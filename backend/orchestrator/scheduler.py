@@ -0,0 +1,202 @@
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+from orchestrator import policy
+from orchestrator.logger import metrics
+
+# Concurrency limit per resource class, overridable via <NAME>_CONCURRENCY
+RESOURCE_LIMITS = {
+    "llm": int(os.getenv("LLM_CONCURRENCY", "4")),
+    "git": int(os.getenv("GIT_CONCURRENCY", "2")),
+    "maven": int(os.getenv("MAVEN_CONCURRENCY", "2")),
+    "sonar": int(os.getenv("SONAR_CONCURRENCY", "2")),
+}
+
+_async_semaphores = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+_cluster = None
+
+
+def configure_limits(**limits):
+    """Override resource limits, e.g. configure_limits(llm=8, maven=1)"""
+    with _lock:
+        unknown = set(limits) - set(RESOURCE_LIMITS)
+        if unknown:
+            raise ValueError(f"Unknown resource class: {', '.join(sorted(unknown))}")
+        RESOURCE_LIMITS.update(limits)
+        _async_semaphores.clear()
+
+
+def use_cluster_limits(queue):
+    """
+    Make aresource() also hold a slot in `queue` (see orchestrator.job_queue),
+    so RESOURCE_LIMITS hold across every worker sharing it; None turns it off.
+    All workers should run with the same limits.
+    """
+    global _cluster
+    _cluster = queue
+
+
+class PrioritySemaphore:
+    """
+    asyncio semaphore that hands a freed slot to the waiter whose ticket
+    (orchestrator.policy.current_ticket) ranks first under policy.sort_key()
+    rather than to the one that has waited longest. Waiters are queued per
+    (priority band, fair-share group), so a release costs a heap pop plus a
+    look at the queue heads, and are re-banded every RERANK_INTERVAL as they age.
+    """
+
+    def __init__(self, value):
+        self._value = value
+        # (band, group) -> heap of (order..., tiebreak, future, ticket)
+        self._queues = {}
+        self._order = itertools.count()
+        self._ranked = time.time()
+        # Seconds each fair-share group has held a slot
+        self.usage = {}
+
+    def _push(self, entry, now):
+        queue, order = policy.queue_key(entry[-1], now)
+        heapq.heappush(self._queues.setdefault(queue, []), (*order, next(self._order), *entry))
+
+    def _rerank(self, now):
+        entries = [e[-2:] for heap in self._queues.values() for e in heap]
+        self._queues = {}
+        for entry in entries:
+            self._push(entry, now)
+        self._ranked = now
+
+    async def acquire(self):
+        ticket = policy.current_ticket.get()
+        if self._value > 0 and not self._queues:
+            self._value -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._push((future, ticket), time.time())
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we were cancelled; pass it on
+                self.release()
+            else:
+                self._discard(future)
+            raise
+
+    def _discard(self, future):
+        for queue, heap in self._queues.items():
+            for i, entry in enumerate(heap):
+                if entry[-2] is future:
+                    heap[i] = heap[-1]
+                    heap.pop()
+                    heapq.heapify(heap)
+                    if not heap:
+                        del self._queues[queue]
+                    return
+
+    def release(self):
+        now = time.time()
+        if self._queues and now - self._ranked > policy.RERANK_INTERVAL:
+            self._rerank(now)
+        while self._queues:
+            band = min(b for b, _ in self._queues)
+            queue = min((q for q in self._queues if q[0] == band),
+                        key=lambda q: (self.usage.get(q[1], 0.0), str(q[1])))
+            heap = self._queues[queue]
+            *_, future, _ = heapq.heappop(heap)
+            if not heap:
+                del self._queues[queue]
+            # A waiter cancelled since it queued has not run its cleanup yet
+            if not future.done():
+                future.set_result(None)
+                return
+        self._value += 1
+
+    def charge(self, ticket, seconds):
+        group = ticket.group if ticket else None
+        if group not in self.usage:
+            # A group that was idle starts level with the least-served one rather than owed every second it missed
+            self.usage[group] = min(self.usage.values(), default=0.0)
+        self.usage[group] += seconds
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+
+def _async_semaphore(name):
+    # asyncio primitives belong to one loop, so keep a set per loop
+    loop = asyncio.get_running_loop()
+    with _lock:
+        per_loop = _async_semaphores.setdefault(loop, {})
+        sem = per_loop.get(name)
+        if sem is None:
+            limit = RESOURCE_LIMITS[name]
+            sem = per_loop[name] = (PrioritySemaphore(limit) if policy.SCHEDULING_POLICY == "priority"
+                                    else asyncio.BoundedSemaphore(limit))
+        return sem
+
+
+@asynccontextmanager
+async def aresource(name):
+    """Hold one slot of a resource class (llm, git, maven, sonar) for the block"""
+    sem = _async_semaphore(name)
+    start = time.perf_counter()
+    async with sem:
+        held = time.perf_counter()
+        try:
+            if _cluster is None:
+                metrics.observe("swe_agent_resource_wait_seconds", time.perf_counter() - start, resource=name)
+                yield
+            else:
+                async with _cluster.aslot(name, RESOURCE_LIMITS[name]):
+                    metrics.observe("swe_agent_resource_wait_seconds", time.perf_counter() - start, resource=name)
+                    yield
+        finally:
+            if isinstance(sem, PrioritySemaphore):
+                sem.charge(policy.current_ticket.get(), time.perf_counter() - held)
+
+
+async def arun_pipeline(items, stages, max_in_flight=None, on_error=None, ticket=None):
+    """
+    Push every item through `stages` (coroutine functions) independently:
+    an item starts its next stage as soon as its previous one finishes, so
+    there is no barrier between stages. Every item is a task, so hundreds
+    of issues can be in flight without a thread each; only the aresource()
+    limits (and `max_in_flight`) bound it. Results are returned in
+    completion order. With `ticket` (item -> policy.Ticket), every resource wait of an item,
+    and its turn through `max_in_flight`, is ordered by the policy.
+    """
+    gate = None
+    if max_in_flight:
+        gate = (PrioritySemaphore(max_in_flight) if ticket and policy.SCHEDULING_POLICY == "priority"
+                else asyncio.Semaphore(max_in_flight))
+
+    async def run_one(item):
+        result = item
+        try:
+            for stage in stages:
+                result = await stage(result)
+        except Exception as e:
+            if on_error is None:
+                raise
+            return on_error(item, e)
+        return result
+
+    async def gated(item):
+        if ticket is not None:
+            # Each item runs in its own task, so the ticket stays with it (and tasks it spawns)
+            policy.current_ticket.set(ticket(item))
+        if gate is None:
+            return await run_one(item)
+        async with gate:
+            return await run_one(item)
+
+    return [await f for f in asyncio.as_completed([gated(item) for item in items])]
@@ -0,0 +1,447 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+# sqlite (default) or redis
+STATE_STORE = os.getenv("STATE_STORE", "sqlite")
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", "/tmp/swe-agent-state.sqlite")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Source under which the last snapshots of processes gone for longer than the metrics TTL are
+# summed, so counters and histogram counts served by /metrics never go down
+RETIRED_METRICS = "retired"
+
+# Result fields kept per issue and served by /api/issues
+ISSUE_FIELDS = ("plan", "workflow_status", "pr_url", "auto_fix_rounds", "tests_passed",
+                "tests_total", "sonar_quality", "branch_name", "error")
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+def encode_cursor(updated_at, issue_id):
+    return f"{updated_at!r}|{issue_id}"
+
+
+def decode_cursor(cursor):
+    updated_at, issue_id = cursor.split("|", 1)
+    return float(updated_at), issue_id
+
+
+def _to_api(issue_id, state, created_at, updated_at, data, history, seq=None):
+    """Shape an issue the way the dashboard expects it"""
+    fsm_logs = {}
+    for entry in history:
+        fsm_logs[entry["state"]] = entry.get("detail") or f"Entered at {_iso(entry['at'])}"
+    issue = {"issue_id": issue_id, "fsm_state": state, "fsm_history": [h["state"] for h in history],
+             "fsm_logs": fsm_logs, "created_at": created_at, "updated_at": updated_at, "seq": seq}
+    issue.update({field: data.get(field) for field in ISSUE_FIELDS})
+    return issue
+
+
+def _fold_metrics(total, snapshot):
+    """`total` plus `snapshot`, both in Metrics.snapshot() form: counters and histograms summed per name and labels"""
+    def key(name, labels):
+        return name, json.dumps(labels, sort_keys=True)
+    counters = {key(n, l): [n, l, v] for n, l, v in total.get("counters", [])}
+    for n, l, v in snapshot.get("counters", []):
+        counters.setdefault(key(n, l), [n, l, 0])[2] += v
+    histograms = {key(n, l): [n, l, list(b), t, c] for n, l, b, t, c in total.get("histograms", [])}
+    for n, l, b, t, c in snapshot.get("histograms", []):
+        entry = histograms.setdefault(key(n, l), [n, l, [0] * len(b), 0.0, 0])
+        entry[2] = [x + y for x, y in zip(entry[2], b)]
+        entry[3] += t
+        entry[4] += c
+    return {"counters": list(counters.values()), "histograms": list(histograms.values())}
+
+
+def _checkpoint_json(task):
+    # Tasks carry their live IssueFSM; on resume it is rebuilt from the recorded transitions
+    return json.dumps({k: v for k, v in task.items() if k != "fsm"})
+
+
+class SQLiteStateStore:
+    """
+    Durable record of every issue and FSM transition. Issues are indexed by
+    state and last update time and transitions by issue and time, so
+    filtered, keyset-paginated listing stays fast on large histories.
+    Every change also stamps the issue with a new global `seq`, which is the
+    resume token for change feeds (see changes_since()).
+    """
+
+    def __init__(self, path=STATE_DB_PATH):
+        self._lock = threading.Lock()
+        self._changed = threading.Condition()
+        self._local_seq = 0
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS issues (
+                issue_id TEXT PRIMARY KEY, state TEXT, created_at REAL NOT NULL,
+                updated_at REAL NOT NULL, data TEXT NOT NULL DEFAULT '{}', history TEXT NOT NULL DEFAULT '[]',
+                seq INTEGER NOT NULL DEFAULT 0);
+            CREATE INDEX IF NOT EXISTS issues_updated ON issues (updated_at, issue_id);
+            CREATE INDEX IF NOT EXISTS issues_state_updated ON issues (state, updated_at, issue_id);
+            CREATE TABLE IF NOT EXISTS transitions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, issue_id TEXT NOT NULL, state TEXT NOT NULL,
+                at REAL NOT NULL, detail TEXT);
+            CREATE INDEX IF NOT EXISTS transitions_issue ON transitions (issue_id, id);
+            CREATE INDEX IF NOT EXISTS transitions_at ON transitions (at);
+            CREATE INDEX IF NOT EXISTS transitions_state_at ON transitions (state, at);
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                issue_id TEXT PRIMARY KEY, stage TEXT, task TEXT NOT NULL, updated_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS metrics (
+                source TEXT PRIMARY KEY, snapshot TEXT NOT NULL, updated_at REAL NOT NULL);
+        """)
+        columns = [r[1] for r in self._db.execute("PRAGMA table_info(issues)")]
+        if "seq" not in columns:
+            self._db.execute("ALTER TABLE issues ADD COLUMN seq INTEGER NOT NULL DEFAULT 0")
+        self._db.execute("CREATE INDEX IF NOT EXISTS issues_seq ON issues (seq)")
+        self._db.commit()
+
+    def _bump(self, issue_id):
+        # A single statement, so concurrent writers (other processes) can't hand out the same seq
+        self._db.execute("UPDATE issues SET seq = (SELECT COALESCE(MAX(seq), 0) + 1 FROM issues) WHERE issue_id = ?",
+                         (issue_id,))
+        return self._db.execute("SELECT seq FROM issues WHERE issue_id = ?", (issue_id,)).fetchone()[0]
+
+    def _notify(self, seq):
+        with self._changed:
+            self._local_seq = max(self._local_seq, seq)
+            self._changed.notify_all()
+
+    def record_transition(self, issue_id, state, detail=None, at=None):
+        at = at or time.time()
+        entry = {"state": state, "at": at}
+        if detail:
+            entry["detail"] = detail
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO issues (issue_id, state, created_at, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(issue_id) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+                (issue_id, state, at, at),
+            )
+            row = self._db.execute("SELECT history FROM issues WHERE issue_id = ?", (issue_id,)).fetchone()
+            history = json.loads(row[0]) + [entry]
+            self._db.execute("UPDATE issues SET history = ? WHERE issue_id = ?", (json.dumps(history), issue_id))
+            cur = self._db.execute("INSERT INTO transitions (issue_id, state, at, detail) VALUES (?, ?, ?, ?)",
+                                   (issue_id, state, at, detail))
+            seq = self._bump(issue_id)
+            self._db.commit()
+        self._notify(seq)
+        return cur.lastrowid
+
+    def update_issue(self, issue_id, **fields):
+        """Merge result fields (see ISSUE_FIELDS) into an issue's record"""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT data FROM issues WHERE issue_id = ?", (issue_id,)).fetchone()
+            data = json.loads(row[0]) if row else {}
+            data.update({k: v for k, v in fields.items() if k in ISSUE_FIELDS})
+            self._db.execute(
+                "INSERT INTO issues (issue_id, state, created_at, updated_at, data) VALUES (?, NULL, ?, ?, ?) "
+                "ON CONFLICT(issue_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                (issue_id, now, now, json.dumps(data)),
+            )
+            seq = self._bump(issue_id)
+            self._db.commit()
+        self._notify(seq)
+
+    def get_issue(self, issue_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT issue_id, state, created_at, updated_at, data, history, seq FROM issues WHERE issue_id = ?",
+                (issue_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return _to_api(*row[:4], json.loads(row[4]), json.loads(row[5]), row[6])
+
+    def history(self, issue_id):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, state, at, detail FROM transitions WHERE issue_id = ? ORDER BY id", (issue_id,)
+            ).fetchall()
+        return [{"seq": r[0], "state": r[1], "at": r[2], "detail": r[3]} for r in rows]
+
+    def list_issues(self, state=None, since=None, until=None, limit=100, cursor=None):
+        """Newest-updated first; returns (issues, next_cursor or None)"""
+        clauses, params = [], []
+        if state:
+            clauses.append("state = ?")
+            params.append(state)
+        if since is not None:
+            clauses.append("updated_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("updated_at < ?")
+            params.append(until)
+        if cursor:
+            updated_at, issue_id = decode_cursor(cursor)
+            clauses.append("(updated_at < ? OR (updated_at = ? AND issue_id < ?))")
+            params += [updated_at, updated_at, issue_id]
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT issue_id, state, created_at, updated_at, data, history, seq FROM issues {where} "
+                f"ORDER BY updated_at DESC, issue_id DESC LIMIT ?",
+                params + [limit + 1],
+            ).fetchall()
+        issues = [_to_api(*r[:4], json.loads(r[4]), json.loads(r[5]), r[6]) for r in rows[:limit]]
+        next_cursor = encode_cursor(rows[limit - 1][3], rows[limit - 1][0]) if len(rows) > limit else None
+        return issues, next_cursor
+
+    def save_checkpoint(self, issue_id, task, stage=None):
+        """Durably keep an issue's latest stage result; `stage` names the last completed stage (None keeps it)"""
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO checkpoints (issue_id, stage, task, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(issue_id) DO UPDATE SET task = excluded.task, updated_at = excluded.updated_at, "
+                "stage = COALESCE(excluded.stage, checkpoints.stage)",
+                (issue_id, stage, _checkpoint_json(task), time.time()),
+            )
+            self._db.commit()
+
+    def load_checkpoint(self, issue_id):
+        """(stage, task) saved by the last run, or None"""
+        with self._lock:
+            row = self._db.execute("SELECT stage, task FROM checkpoints WHERE issue_id = ?", (issue_id,)).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def clear_checkpoint(self, issue_id):
+        with self._lock:
+            self._db.execute("DELETE FROM checkpoints WHERE issue_id = ?", (issue_id,))
+            self._db.commit()
+
+    def list_checkpoints(self):
+        """Issue ids with unfinished work, oldest first"""
+        with self._lock:
+            return [r[0] for r in self._db.execute("SELECT issue_id FROM checkpoints ORDER BY updated_at")]
+
+    def current_seq(self):
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM issues").fetchone()[0]
+
+    def changes_since(self, seq, limit=500):
+        """Issues changed after resume token `seq`, oldest change first; returns (issues, new_seq)"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT issue_id, state, created_at, updated_at, data, history, seq FROM issues "
+                "WHERE seq > ? ORDER BY seq LIMIT ?",
+                (seq, limit),
+            ).fetchall()
+        issues = [_to_api(*r[:4], json.loads(r[4]), json.loads(r[5]), r[6]) for r in rows]
+        return issues, (rows[-1][6] if rows else seq)
+
+    def save_metrics(self, source, snapshot):
+        """Latest metrics snapshot of one process (see orchestrator.logger)"""
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO metrics (source, snapshot, updated_at) VALUES (?, ?, ?)",
+                             (source, json.dumps(snapshot), time.time()))
+            self._db.commit()
+
+    def load_metrics(self, max_age):
+        """
+        {source: snapshot} for processes that reported within `max_age`
+        seconds, plus RETIRED_METRICS: older snapshots are folded into it
+        (once, under a write transaction shared by every process) and dropped
+        """
+        cutoff = time.time() - max_age
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                stale = self._db.execute("SELECT source, snapshot FROM metrics WHERE updated_at < ? AND source != ?",
+                                         (cutoff, RETIRED_METRICS)).fetchall()
+                if stale:
+                    row = self._db.execute("SELECT snapshot FROM metrics WHERE source = ?",
+                                           (RETIRED_METRICS,)).fetchone()
+                    retired = json.loads(row[0]) if row else {}
+                    for _, snapshot in stale:
+                        retired = _fold_metrics(retired, json.loads(snapshot))
+                    self._db.execute("INSERT OR REPLACE INTO metrics (source, snapshot, updated_at) VALUES (?, ?, ?)",
+                                     (RETIRED_METRICS, json.dumps(retired), time.time()))
+                    self._db.executemany("DELETE FROM metrics WHERE source = ?", [(source,) for source, _ in stale])
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                raise
+            rows = self._db.execute("SELECT source, snapshot FROM metrics").fetchall()
+        return {source: json.loads(snapshot) for source, snapshot in rows}
+
+    def wait_for_change(self, seq, timeout):
+        """Block until this process writes past `seq` or `timeout` passes (writes from other processes are seen on the next poll)"""
+        with self._changed:
+            if self._local_seq <= seq:
+                self._changed.wait(timeout)
+
+
+class RedisStateStore:
+    """
+    Same interface backed by Redis: a hash per issue, sorted sets by update
+    time (overall and per state) and a list of transitions per issue.
+    """
+
+    def __init__(self, url=REDIS_URL, prefix="swe"):
+        import redis
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._prefix = prefix
+
+    def _key(self, *parts):
+        return ":".join((self._prefix,) + parts)
+
+    def _touch(self, pipe, issue_id, old_state, new_state, at):
+        pipe.zadd(self._key("issues", "by_updated"), {issue_id: at})
+        if old_state and old_state != new_state:
+            pipe.zrem(self._key("issues", "state", old_state), issue_id)
+        if new_state:
+            pipe.zadd(self._key("issues", "state", new_state), {issue_id: at})
+
+    def record_transition(self, issue_id, state, detail=None, at=None):
+        at = at or time.time()
+        entry = {"state": state, "at": at}
+        if detail:
+            entry["detail"] = detail
+        key = self._key("issue", issue_id)
+        old_state = self._redis.hget(key, "state")
+        seq = self._redis.incr(self._key("transitions", "seq"))
+        entry["seq"] = seq
+        change = self._redis.incr(self._key("issues", "seq"))
+        pipe = self._redis.pipeline()
+        pipe.hsetnx(key, "created_at", at)
+        pipe.hset(key, mapping={"state": state, "updated_at": at, "seq": change})
+        pipe.zadd(self._key("issues", "by_seq"), {issue_id: change})
+        pipe.rpush(self._key("transitions", issue_id), json.dumps(entry))
+        self._touch(pipe, issue_id, old_state, state, at)
+        pipe.execute()
+        return seq
+
+    def update_issue(self, issue_id, **fields):
+        now = time.time()
+        key = self._key("issue", issue_id)
+        data = json.loads(self._redis.hget(key, "data") or "{}")
+        data.update({k: v for k, v in fields.items() if k in ISSUE_FIELDS})
+        state = self._redis.hget(key, "state")
+        change = self._redis.incr(self._key("issues", "seq"))
+        pipe = self._redis.pipeline()
+        pipe.hsetnx(key, "created_at", now)
+        pipe.hset(key, mapping={"data": json.dumps(data), "updated_at": now, "seq": change})
+        pipe.zadd(self._key("issues", "by_seq"), {issue_id: change})
+        self._touch(pipe, issue_id, state, state, now)
+        pipe.execute()
+
+    def history(self, issue_id):
+        return [json.loads(e) for e in self._redis.lrange(self._key("transitions", issue_id), 0, -1)]
+
+    def get_issue(self, issue_id):
+        raw = self._redis.hgetall(self._key("issue", issue_id))
+        if not raw:
+            return None
+        return _to_api(issue_id, raw.get("state"), float(raw["created_at"]), float(raw["updated_at"]),
+                       json.loads(raw.get("data") or "{}"), self.history(issue_id), int(raw.get("seq", 0)))
+
+    def list_issues(self, state=None, since=None, until=None, limit=100, cursor=None):
+        index = self._key("issues", "state", state) if state else self._key("issues", "by_updated")
+        high = "+inf" if until is None else f"({until}"
+        low = "-inf" if since is None else since
+        if cursor:
+            updated_at, _ = decode_cursor(cursor)
+            high = updated_at if until is None else min(updated_at, until)
+        # Over-fetch to skip entries sharing the cursor's timestamp
+        ids = self._redis.zrevrangebyscore(index, high, low, start=0, num=limit * 2 + 1, withscores=True)
+        if cursor:
+            updated_at, issue_id = decode_cursor(cursor)
+            ids = [(i, s) for i, s in ids if s < updated_at or (s == updated_at and i < issue_id)]
+        page = ids[:limit]
+        issues = [i for i in (self.get_issue(issue_id) for issue_id, _ in page) if i]
+        next_cursor = encode_cursor(page[-1][1], page[-1][0]) if len(ids) > limit else None
+        return issues, next_cursor
+
+    def save_checkpoint(self, issue_id, task, stage=None):
+        mapping = {"task": _checkpoint_json(task), "updated_at": time.time()}
+        if stage:
+            mapping["stage"] = stage
+        pipe = self._redis.pipeline()
+        pipe.hset(self._key("checkpoint", issue_id), mapping=mapping)
+        pipe.zadd(self._key("checkpoints"), {issue_id: mapping["updated_at"]})
+        pipe.execute()
+
+    def load_checkpoint(self, issue_id):
+        raw = self._redis.hgetall(self._key("checkpoint", issue_id))
+        return (raw.get("stage"), json.loads(raw["task"])) if raw else None
+
+    def clear_checkpoint(self, issue_id):
+        pipe = self._redis.pipeline()
+        pipe.delete(self._key("checkpoint", issue_id))
+        pipe.zrem(self._key("checkpoints"), issue_id)
+        pipe.execute()
+
+    def list_checkpoints(self):
+        return self._redis.zrange(self._key("checkpoints"), 0, -1)
+
+    def current_seq(self):
+        return int(self._redis.get(self._key("issues", "seq")) or 0)
+
+    def changes_since(self, seq, limit=500):
+        ids = self._redis.zrangebyscore(self._key("issues", "by_seq"), f"({seq}", "+inf",
+                                        start=0, num=limit, withscores=True)
+        issues = [i for i in (self.get_issue(issue_id) for issue_id, _ in ids) if i]
+        return issues, (int(ids[-1][1]) if ids else seq)
+
+    def save_metrics(self, source, snapshot):
+        pipe = self._redis.pipeline()
+        pipe.hset(self._key("metrics"), source, json.dumps(snapshot))
+        pipe.zadd(self._key("metrics", "updated"), {source: time.time()})
+        pipe.execute()
+
+    def load_metrics(self, max_age):
+        import redis
+        hash_key, updated_key = self._key("metrics"), self._key("metrics", "updated")
+        retired_key = self._key("metrics", RETIRED_METRICS)
+        while True:
+            with self._redis.pipeline() as pipe:
+                try:
+                    # Folded once: a concurrent fold of the same sources aborts this one, which then retries
+                    pipe.watch(hash_key, retired_key)
+                    stale = pipe.zrangebyscore(updated_key, "-inf", f"({time.time() - max_age}")
+                    if stale:
+                        retired = json.loads(pipe.get(retired_key) or "{}")
+                        for snapshot in pipe.hmget(hash_key, stale):
+                            if snapshot:
+                                retired = _fold_metrics(retired, json.loads(snapshot))
+                        pipe.multi()
+                        pipe.set(retired_key, json.dumps(retired))
+                        pipe.hdel(hash_key, *stale)
+                        pipe.zrem(updated_key, *stale)
+                        pipe.execute()
+                    else:
+                        pipe.unwatch()
+                    break
+                except redis.WatchError:
+                    continue
+        snapshots = {source: json.loads(snapshot) for source, snapshot in self._redis.hgetall(hash_key).items()}
+        retired = self._redis.get(retired_key)
+        if retired:
+            snapshots[RETIRED_METRICS] = json.loads(retired)
+        return snapshots
+
+    def wait_for_change(self, seq, timeout):
+        # Changes may come from any process; callers simply poll changes_since()
+        time.sleep(timeout)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Process-wide state store selected by STATE_STORE"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = RedisStateStore() if STATE_STORE == "redis" else SQLiteStateStore()
+        return _store
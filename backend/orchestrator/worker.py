@@ -0,0 +1,131 @@
+"""
+Queue worker: runs pipeline stages claimed from orchestrator.job_queue, so
+any number of stateless worker processes (on any number of hosts) share one
+backlog. Start workers with `python -m orchestrator.worker` and enqueue a
+batch with `python -m orchestrator.worker --submit`.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+from orchestrator import policy
+from orchestrator.fsm import IssueFSM
+from orchestrator.job_queue import JOB_VISIBILITY_TIMEOUT, get_queue, job_id
+from orchestrator.mcp_client import jira_session, run_sync
+from orchestrator.scheduler import use_cluster_limits
+from orchestrator.state_store import get_store
+
+# Jobs one worker process runs at once; cluster-wide RESOURCE_LIMITS still apply
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "4"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+# Index of the pipeline stage that creates the issue's worktree (coder)
+WORKTREE_STAGE = 1
+
+
+def _payload(task):
+    return {k: v for k, v in task.items() if k != "fsm"}
+
+
+async def submit_issues(queue=None, assignee="AI-Agent", run_id=None, delta=False):
+    """Enqueue the first stage for every issue assigned to `assignee` (with `delta`, only those updated since the last delta submit); returns the run id"""
+    queue = queue or get_queue()
+    run_id = run_id or time.strftime("%Y%m%dT%H%M%S")
+    issues = await jira_session.list_issues(assignee=assignee, delta=delta)
+    for issue in issues:
+        queue.enqueue(job_id(run_id, issue["id"], 0), issue["id"], 0, {"run": run_id, "issue": issue})
+    logging.info(f"Run {run_id}: queued {len(issues)} issues")
+    return run_id
+
+
+async def _keep_leased(queue, job, visibility_timeout):
+    while True:
+        await asyncio.sleep(visibility_timeout / 3)
+        if not await asyncio.to_thread(queue.extend, job["id"], job["lease"], visibility_timeout):
+            logging.warning(f"Job {job['id']}: lease lost, another worker may run it too")
+            return
+
+
+async def run_job(queue, job, stages, visibility_timeout=JOB_VISIBILITY_TIMEOUT):
+    stage, payload, issue_id = int(job["stage"]), job["payload"], job["issue_id"]
+    fsm = IssueFSM(issue_id, store=get_store())
+    if stage == 0:
+        item = (payload["issue"], fsm)
+    else:
+        fsm.restore()
+        item = dict(payload["task"], fsm=fsm)
+    # Resource slots within this worker go by policy order; the queue itself is claimed in order
+    policy.current_ticket.set(policy.Ticket.from_item(item))
+
+    heartbeat = asyncio.create_task(_keep_leased(queue, job, visibility_timeout))
+    try:
+        if stage > WORKTREE_STAGE and not os.path.isdir(item.get("target_dir") or ""):
+            # The worktree lives on the host that ran the coder (or was released); redo coding here
+            logging.warning(f"Job {job['id']}: worktree {item.get('target_dir')} missing, re-running the coding stage")
+            item["checkpoint"] = "planned"
+            item = await stages[WORKTREE_STAGE](item)
+        result = await stages[stage](item)
+    except Exception as e:
+        state = await asyncio.to_thread(queue.fail, job["id"], job["lease"], str(e))
+        logging.error(f"Job {job['id']} failed (attempt {job['attempts']}, now {state}): {e}")
+        if state == "dead":
+            fsm.transition("failed", detail=str(e))
+            get_store().update_issue(issue_id, workflow_status="failed", error=str(e))
+        return None
+    finally:
+        heartbeat.cancel()
+
+    # Stages are checkpointed, so a redelivered job skips work that already
+    # finished and completing it twice is a no-op
+    task = _payload(result)
+    next_job = None
+    if stage + 1 < len(stages):
+        next_job = (job_id(payload["run"], issue_id, stage + 1), issue_id, stage + 1,
+                    {"run": payload["run"], "task": task})
+    await asyncio.to_thread(queue.complete, job["id"], task, next_job)
+    return task
+
+
+async def run_worker(queue=None, stages=None, concurrency=JOB_WORKER_CONCURRENCY, stop=None,
+                     visibility_timeout=JOB_VISIBILITY_TIMEOUT):
+    """Claim and run jobs until `stop` is set; `stages` defaults to the workflow pipeline"""
+    if stages is None:
+        from orchestrator.workflow import pipeline_stages
+        stages = pipeline_stages()
+    queue = queue or get_queue()
+    stop = stop or asyncio.Event()
+    use_cluster_limits(queue)
+
+    async def slot():
+        while not stop.is_set():
+            job = await asyncio.to_thread(queue.claim, visibility_timeout)
+            if job is None:
+                try:
+                    await asyncio.wait_for(stop.wait(), JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await run_job(queue, job, stages, visibility_timeout)
+
+    await asyncio.gather(*(slot() for _ in range(concurrency)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--submit", metavar="ASSIGNEE", nargs="?", const="AI-Agent",
+                        help="enqueue the assignee's issues instead of running a worker")
+    parser.add_argument("--delta", action="store_true", help="with --submit, only issues updated since the last delta submit")
+    parser.add_argument("--concurrency", type=int, default=JOB_WORKER_CONCURRENCY)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.submit:
+        run_sync(submit_issues(assignee=args.submit, delta=args.delta))
+    else:
+        run_sync(run_worker(concurrency=args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,153 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from orchestrator.agents import planner, coder, auto_fix
-from orchestrator.mcp_client import jira_client
+import logging
+import os
+import time
+from orchestrator import policy
+from orchestrator.agents import planner_async, coder_async, auto_fix_async
+from orchestrator.mcp_client import jira_session, run_sync
 from orchestrator.fsm import IssueFSM
+from orchestrator.issue_record import IssueRecord
+from orchestrator.logger import metrics
+from orchestrator.scheduler import arun_pipeline
+from orchestrator.state_store import get_store
 
-MAX_WORKERS = 3
 
-def run_multi_issue_workflow(assignee="AI-Agent"):
-    issues = jira_client.list_issues(assignee=assignee)
-    if not issues:
-        return []
+def _summary(task):
+    """Result fields worth keeping in the state store"""
+    fields = {k: task[k] for k in ("plan", "branch_name", "workflow_status", "pr_url") if k in task}
+    counts = (task.get("test_result") or {}).get("digest", {}).get("counts")
+    if counts:
+        fields["tests_total"] = counts["run"]
+        fields["tests_passed"] = counts["run"] - counts["failures"] - counts["errors"] - counts["skipped"]
+    fsm = task.get("fsm")
+    if fsm:
+        fields["auto_fix_rounds"] = max(0, fsm.count("reviewed") - 1)
+    return fields
+
+
+def _persisted(stage):
+    async def run(task):
+        result = await stage(task)
+        get_store().update_issue(result["issue_id"], **_summary(result))
+        return result
+    return run
+
+
+# Stages whose results are checkpointed, in pipeline order
+CHECKPOINT_STAGES = ["planned", "coded"]
+
+
+def _resume(issue_id, stage, task, fsm):
+    fsm.restore()
+    task.update(issue_id=issue_id, fsm=fsm, checkpoint=stage)
+    if stage != "planned" and not os.path.isdir(task.get("target_dir") or ""):
+        # The worktree is gone (released after an error, or /tmp was wiped); redo the coding stage
+        logging.warning(f"Issue {issue_id}: worktree {task.get('target_dir')} missing, resuming after planning")
+        task["checkpoint"] = "planned"
+    logging.info(f"Issue {issue_id}: resuming after stage '{task['checkpoint']}'")
+    return task
+
+
+def _checkpointed(name, stage):
+    """Skip `stage` when a checkpoint shows it already completed; otherwise run it and checkpoint the result"""
+    async def run(task):
+        if CHECKPOINT_STAGES.index(task.get("checkpoint", "planned")) >= CHECKPOINT_STAGES.index(name):
+            return task
+        result = await stage(task)
+        result["checkpoint"] = name
+        get_store().save_checkpoint(result["issue_id"], result, stage=name)
+        return result
+    return run
+
+
+def _ticket(item):
+    return policy.current_ticket.get() or policy.Ticket.from_item(item)
+
 
-    results = []
+def _finished(stage):
+    async def run(task):
+        result = await stage(task)
+        get_store().clear_checkpoint(result["issue_id"])
+        if result.get("pr_url"):
+            ticket = _ticket(result)
+            metrics.observe("swe_agent_time_to_pr_seconds", time.time() - ticket.enqueued, priority=ticket.priority)
+        return result
+    return run
 
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        # Step 1: Planning
-        planned_tasks = []
-        futures = []
-        for issue in issues:
-            fsm = IssueFSM(issue_id=issue["id"])
-            futures.append(executor.submit(planner, issue, fsm))
-        planned_tasks = [f.result() for f in as_completed(futures)]
 
-        # Step 2: Coding
-        coded_tasks = [f.result() for f in as_completed(
-            [executor.submit(coder, task) for task in planned_tasks]
-        )]
+async def _plan(item):
+    issue, fsm = item
+    # Later stages (and queue workers running them) are scheduled from what the task carries
+    ticket = _ticket(item)
+    saved = get_store().load_checkpoint(issue["id"])
+    if saved:
+        task = _resume(issue["id"], *saved, fsm)
+    else:
+        task = await planner_async(issue, fsm)
+        task["checkpoint"] = "planned"
+        task.update(jira_fields=ticket.fields, queued_at=ticket.enqueued)
+        get_store().save_checkpoint(task["issue_id"], task, stage="planned")
+    task.setdefault("jira_fields", ticket.fields)
+    task.setdefault("queued_at", ticket.enqueued)
+    return task
 
-        # Step 3: Reviewing + Auto-Fix
-        future_to_task = {executor.submit(auto_fix, task): task for task in coded_tasks}
-        results = [f.result() for f in as_completed(future_to_task)]
 
-    # Include FSM history in final results
+def _compact(stage):
+    """Run `stage` on the full task rebuilt from an IssueRecord and return the result as one"""
+    async def run(record):
+        task = record.to_task()
+        issue = task.pop("issue", None)
+        # The first stage takes the Jira issue itself
+        result = await stage((issue, record.fsm) if issue is not None else task)
+        return IssueRecord.from_task(result)
+    return run
+
+
+def _on_error(item, error):
+    issue_id, fsm = (item[0]["id"], item[1]) if isinstance(item, tuple) else (item.issue_id, item.fsm)
+    logging.error(f"Issue {issue_id} failed: {error}")
+    fsm.transition("failed", detail=str(error))
+    get_store().update_issue(issue_id, workflow_status="failed", error=str(error))
+    return {"issue_id": issue_id, "workflow_status": "failed", "error": str(error), "fsm": fsm}
+
+
+def pipeline_stages():
+    """planner -> coder -> auto_fix, persisted and checkpointed; also run one job at a time by orchestrator.worker"""
+    return [_persisted(_plan), _persisted(_checkpointed("coded", coder_async)),
+            _persisted(_finished(auto_fix_async))]
+
+
+async def run_multi_issue_workflow_async(assignee="AI-Agent"):
+    store = get_store()
+    issues = await jira_session.list_issues(assignee=assignee)
+    # Work interrupted by a restart is resumed even if Jira no longer lists it
+    listed = {issue["id"] for issue in issues}
+    issues += [{"id": issue_id, "fields": {"summary": None}}
+               for issue_id in store.list_checkpoints() if issue_id not in listed]
+    if not issues:
+        return []
+
+    # Each issue runs planner -> coder -> auto_fix on its own; concurrency is
+    # bounded per resource class (see orchestrator.scheduler.RESOURCE_LIMITS)
+    # and freed slots go to issues in orchestrator.policy order. Stage results
+    # are checkpointed, so a restarted run picks each issue up after its last
+    # completed stage (or auto-fix round). Between stages, and once finished,
+    # an issue is held as an IssueRecord whose large values sit in the blob store.
+    items = []
+    for issue in issues:
+        ticket = policy.Ticket.from_item((issue, IssueFSM(issue_id=issue["id"], store=store)))
+        items.append(IssueRecord.from_task({"issue_id": issue["id"], "fsm": ticket.fsm, "issue": issue,
+                                            "jira_fields": ticket.fields, "queued_at": ticket.enqueued}))
+    del issues
+    if policy.SCHEDULING_POLICY == "priority":
+        # Slots free at the start go in task creation order
+        now = time.time()
+        items.sort(key=lambda item: policy.sort_key(policy.Ticket.from_item(item), {}, now))
+    stages = [_compact(stage) for stage in pipeline_stages()]
+    results = await arun_pipeline(items, stages, on_error=_on_error, ticket=policy.Ticket.from_item)
+
+    # Finished issues are returned as their inline fields, the digests of
+    # the offloaded ones (see IssueRecord.summary) and the FSM history
+    results = [res.summary() if isinstance(res, IssueRecord) else res for res in results]
     for res in results:
         fsm = res.get("fsm")
         if fsm:
@@ -38,3 +155,7 @@ def run_multi_issue_workflow(assignee="AI-Agent"):
             res["fsm_state"] = fsm.get_state()
 
     return results
+
+
+def run_multi_issue_workflow(assignee="AI-Agent"):
+    return run_sync(run_multi_issue_workflow_async(assignee))
@@ -15,6 +15,10 @@ export interface IssueResult {
   tests_passed?: number;
   tests_total?: number;
   sonar_quality?: number; // 0-100
+
+  // Change sequence number; also the resume token for /api/issues/stream
+  seq?: number;
+  updated_at?: number;
 }
 
 export const fetchWorkflowResults = async (): Promise<IssueResult[]> => {
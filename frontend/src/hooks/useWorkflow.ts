@@ -1,18 +1,49 @@
 // src/hooks/useWorkflow.ts
-import { useQuery } from "@tanstack/react-query";
+import { useEffect, useState } from "react";
+import { useQuery, useQueryClient } from "@tanstack/react-query";
 import axios from "axios";
 import type { IssueResult } from "../api/workflow";
 
+const API_URL = "http://localhost:5050/api/issues"; // adjust your Flask endpoint
+
 const fetchWorkflow = async (): Promise<IssueResult[]> => {
-  const response = await axios.get("http://localhost:5050/api/issues"); // adjust your Flask endpoint
+  const response = await axios.get(API_URL);
   return response.data;
 };
 
+// Upsert changed issues, newest update first (same order as /api/issues)
+const mergeIssues = (current: IssueResult[] = [], changed: IssueResult[]) => {
+  const byId = new Map(current.map((issue) => [issue.issue_id, issue]));
+  changed.forEach((issue) => byId.set(issue.issue_id, issue));
+  return [...byId.values()].sort((a, b) => (b.updated_at ?? 0) - (a.updated_at ?? 0));
+};
+
 export const useWorkflow = () => {
+  const queryClient = useQueryClient();
+  const [streaming, setStreaming] = useState(false);
+
+  // Server pushes only the issues that changed; EventSource reconnects on its
+  // own and resumes from the last event id. Polling covers the gaps.
+  useEffect(() => {
+    if (typeof EventSource === "undefined") return;
+    const source = new EventSource(`${API_URL}/stream`);
+    source.addEventListener("snapshot", (e) => {
+      queryClient.setQueryData<IssueResult[]>(["workflow"], JSON.parse((e as MessageEvent).data));
+      setStreaming(true);
+    });
+    source.addEventListener("issues", (e) => {
+      const changed: IssueResult[] = JSON.parse((e as MessageEvent).data);
+      queryClient.setQueryData<IssueResult[]>(["workflow"], (current) => mergeIssues(current, changed));
+    });
+    source.onopen = () => setStreaming(true);
+    source.onerror = () => setStreaming(false);
+    return () => source.close();
+  }, [queryClient]);
+
   return useQuery<IssueResult[], Error>({
     queryKey: ["workflow"],
     queryFn: fetchWorkflow,
-    refetchInterval: 3000, // poll every 3 seconds
-    refetchOnWindowFocus: true,
+    refetchInterval: streaming ? false : 3000, // poll every 3 seconds without a live stream
+    refetchOnWindowFocus: !streaming,
   });
 };
@@ -0,0 +1,289 @@
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from log_digest import kill_process_group, run_streaming
+
+
+def _total_memory_mb():
+    try:
+        with open("/proc/meminfo") as f:
+            return int(f.readline().split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        return 8192
+
+
+# Host-wide budget shared by every Maven and Sonar run on this machine
+BUILD_CPU_BUDGET = float(os.getenv("BUILD_CPU_BUDGET", str(os.cpu_count() or 1)))
+BUILD_MEMORY_BUDGET_MB = int(os.getenv("BUILD_MEMORY_BUDGET_MB", str(_total_memory_mb() * 3 // 4)))
+# Admission ledger shared by the MCP server processes (they run as separate processes)
+BUILD_LEDGER_PATH = os.getenv("BUILD_LEDGER_PATH", "/tmp/swe-agent-builds.json")
+BUILD_ADMISSION_POLL = float(os.getenv("BUILD_ADMISSION_POLL", "0.2"))
+# auto | cgroup | rlimit; auto uses cgroup v2 when a delegated subtree is writable
+BUILD_SANDBOX = os.getenv("BUILD_SANDBOX", "auto")
+BUILD_CGROUP_ROOT = os.getenv("BUILD_CGROUP_ROOT", "/sys/fs/cgroup/swe-agent-builds")
+
+
+class BuildLedger:
+    """
+    Admission against the CPU/memory budget. Holders and waiters are kept
+    in a JSON file under an flock so every server process on the host sees
+    the same budget; waiters are admitted strictly in arrival order, and
+    entries of dead processes are dropped.
+    """
+
+    def __init__(self, path=BUILD_LEDGER_PATH, cpus=BUILD_CPU_BUDGET, memory_mb=BUILD_MEMORY_BUDGET_MB):
+        self.path = path
+        self.cpus = cpus
+        self.memory_mb = memory_mb
+
+    @contextmanager
+    def _locked(self):
+        with open(self.path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            try:
+                state = json.loads(f.read() or "{}")
+            except ValueError:
+                state = {}
+            state.setdefault("running", {})
+            state.setdefault("waiting", [])
+            _prune(state)
+            yield state
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps(state))
+
+    def _try_admit(self, ticket):
+        with self._locked() as state:
+            waiting = state["waiting"]
+            head = waiting[0] if waiting else None
+            if head is None or head["ticket"] != ticket:
+                return False
+            used_cpus = sum(r["cpus"] for r in state["running"].values())
+            used_mem = sum(r["memory_mb"] for r in state["running"].values())
+            fits = used_cpus + head["cpus"] <= self.cpus and used_mem + head["memory_mb"] <= self.memory_mb
+            if fits or not state["running"]:
+                state["running"][ticket] = waiting.pop(0)
+                return True
+            return False
+
+    @contextmanager
+    def admit(self, cpus, memory_mb):
+        """Block until `cpus`/`memory_mb` fit in the budget (or nothing else runs); yields the seconds spent queued"""
+        ticket = uuid.uuid4().hex
+        with self._locked() as state:
+            state["waiting"].append({"ticket": ticket, "pid": os.getpid(), "cpus": cpus, "memory_mb": memory_mb})
+        start = time.monotonic()
+        try:
+            while not self._try_admit(ticket):
+                time.sleep(BUILD_ADMISSION_POLL)
+            yield time.monotonic() - start
+        finally:
+            with self._locked() as state:
+                state["running"].pop(ticket, None)
+                state["waiting"] = [w for w in state["waiting"] if w["ticket"] != ticket]
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _prune(state):
+    state["running"] = {t: r for t, r in state["running"].items() if _alive(r["pid"])}
+    state["waiting"] = [w for w in state["waiting"] if _alive(w["pid"])]
+
+
+def _wrap(cmd, cpu_seconds, cgroup=None):
+    """
+    Run `cmd` through /bin/sh, which joins `cgroup` and sets the rlimits in
+    the child before exec'ing it. Builds are started from worker threads,
+    where a preexec_fn could deadlock the forked child.
+    """
+    script = "ulimit -c 0"
+    if cpu_seconds:
+        script += f"; ulimit -t {cpu_seconds}"
+    if cgroup:
+        script = f'echo $$ > "$0/cgroup.procs" || exit 125; {script}'
+    return ["/bin/sh", "-c", f'{script}; exec "$@"', cgroup or "sh", *cmd]
+
+
+class RlimitSandbox:
+    """
+    Portable limits: JVMs are told the build's CPU and memory share
+    (-XX:ActiveProcessorCount / -XX:MaxRAM size their thread pools and heap
+    from it), RLIMIT_CPU stops runaway builds, and timeouts kill the whole
+    process group. confine() returns (wrap(cmd) -> cmd, kill(proc), close()).
+    """
+
+    name = "rlimit"
+
+    @staticmethod
+    def _cpu_seconds(cpus, timeout):
+        return int(max(cpus, 1) * timeout) + 60 if timeout else None
+
+    def confine(self, cpus, memory_mb, timeout):
+        cpu_seconds = self._cpu_seconds(cpus, timeout)
+        return lambda cmd: _wrap(cmd, cpu_seconds), kill_process_group, lambda: None
+
+
+class CgroupSandbox(RlimitSandbox):
+    """cgroup v2 limits: a child cgroup per build with cpu.max and memory.max, killed as a unit"""
+
+    name = "cgroup"
+
+    def __init__(self, root=BUILD_CGROUP_ROOT):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        with open(os.path.join(os.path.dirname(root), "cgroup.subtree_control")) as f:
+            enabled = f.read().split()
+        if not {"cpu", "memory"} <= set(enabled):
+            raise OSError("cpu and memory controllers are not delegated")
+        with open(os.path.join(root, "cgroup.subtree_control"), "w") as f:
+            f.write("+cpu +memory")
+
+    def confine(self, cpus, memory_mb, timeout):
+        cpu_seconds = self._cpu_seconds(cpus, timeout)
+        path = os.path.join(self.root, f"build-{uuid.uuid4().hex[:12]}")
+        os.mkdir(path)
+        with open(os.path.join(path, "cpu.max"), "w") as f:
+            f.write(f"{int(cpus * 100000)} 100000")
+        with open(os.path.join(path, "memory.max"), "w") as f:
+            f.write(str(memory_mb * 1024 * 1024))
+
+        def kill(proc):
+            # cgroup.kill also reaches processes that left the session
+            try:
+                with open(os.path.join(path, "cgroup.kill"), "w") as f:
+                    f.write("1")
+            except OSError:
+                kill_process_group(proc)
+
+        def close():
+            try:
+                os.rmdir(path)
+            except OSError as e:
+                logging.warning(f"Could not remove build cgroup {path}: {e}")
+        return lambda cmd: _wrap(cmd, cpu_seconds, path), kill, close
+
+
+def get_sandbox(kind=BUILD_SANDBOX):
+    if kind in ("auto", "cgroup"):
+        try:
+            return CgroupSandbox()
+        except OSError as e:
+            if kind == "cgroup":
+                logging.warning(f"cgroup sandbox unavailable ({e}), using rlimits")
+    return RlimitSandbox()
+
+
+class BuildExecutor:
+    """Admits builds against the host budget, then runs each confined by the sandbox"""
+
+    # cancel() requests are remembered this long for builds still waiting for admission
+    CANCEL_MEMORY = 3600.0
+
+    def __init__(self, ledger=None, sandbox=None):
+        self.ledger = ledger or BuildLedger()
+        self.sandbox = sandbox or get_sandbox()
+        self._running = {}
+        self._cancelled = set()
+        # realpath -> monotonic time of the last cancel() for it
+        self._cancelled_dirs = {}
+        self._lock = threading.Lock()
+
+    def _cancelled_since(self, where, requested):
+        return self._cancelled_dirs.get(where, float("-inf")) >= requested
+
+    def run(self, cmd, cwd, parser, cpus, memory_mb, timeout=None, env=None, prefix="build"):
+        """
+        run_streaming() plus `queue_wait` (admission) and `run_time`
+        (execution) in seconds, and `cancelled` when cancel() killed it or
+        was called for `cwd` while it waited for admission (it is then not run)
+        """
+        if shutil.which(cmd[0]) is None:
+            raise FileNotFoundError(f"{cmd[0]} not found on PATH")
+        # A build larger than the whole budget runs alone, with the whole budget
+        cpus, memory_mb = min(cpus, self.ledger.cpus), min(memory_mb, self.ledger.memory_mb)
+        where, token, requested = os.path.realpath(cwd), object(), time.monotonic()
+        with self.ledger.admit(cpus, memory_mb) as queue_wait:
+            start = time.monotonic()
+            with self._lock:
+                refused = self._cancelled_since(where, requested)
+            if refused:
+                # Its worktree may already be released; running it would build whatever is left there
+                result = {"returncode": -1, "log_path": None, "tail": ["Cancelled before it started"],
+                          "timed_out": False}
+                cancelled = True
+            else:
+                result, cancelled = self._run(cmd, cwd, parser, cpus, memory_mb, timeout, env, prefix,
+                                              where, token, requested)
+        result.update(queue_wait=queue_wait, run_time=time.monotonic() - start, cancelled=cancelled,
+                      limits={"cpus": cpus, "memory_mb": memory_mb, "sandbox": self.sandbox.name})
+        return result
+
+    def _run(self, cmd, cwd, parser, cpus, memory_mb, timeout, env, prefix, where, token, requested):
+        env = dict(env or os.environ)
+        jvm = f"-XX:ActiveProcessorCount={max(int(cpus), 1)} -XX:MaxRAM={memory_mb}m"
+        env["JAVA_TOOL_OPTIONS"] = f"{env.get('JAVA_TOOL_OPTIONS', '')} {jvm}".strip()
+        wrap, kill, close = self.sandbox.confine(cpus, memory_mb, timeout)
+
+        def started(proc):
+            with self._lock:
+                self._running.setdefault(where, {})[token] = (proc, kill)
+                # A cancel() between admission and spawn found nothing to kill
+                late = self._cancelled_since(where, requested)
+                if late:
+                    self._cancelled.add(token)
+            if late:
+                kill(proc)
+
+        try:
+            result = run_streaming(wrap(cmd), cwd, parser, timeout=timeout, env=env, prefix=prefix,
+                                   kill=kill, started=started)
+        finally:
+            close()
+            with self._lock:
+                self._running.get(where, {}).pop(token, None)
+                if not self._running.get(where):
+                    self._running.pop(where, None)
+                cancelled = token in self._cancelled
+                self._cancelled.discard(token)
+        return result, cancelled
+
+    def cancel(self, cwd):
+        """
+        Kill every build running in `cwd` (process trees included) and refuse
+        those already requested for it that have not started; returns how many were killed
+        """
+        where, now = os.path.realpath(cwd), time.monotonic()
+        with self._lock:
+            self._cancelled_dirs = {d: t for d, t in self._cancelled_dirs.items() if now - t < self.CANCEL_MEMORY}
+            self._cancelled_dirs[where] = now
+            runs = dict(self._running.get(where, {}))
+            self._cancelled.update(runs)
+        for proc, kill in runs.values():
+            kill(proc)
+        return len(runs)
+
+
+_executor = None
+
+
+def get_executor():
+    """Process-wide executor (admission itself is shared through the ledger file)"""
+    global _executor
+    if _executor is None:
+        _executor = BuildExecutor()
+    return _executor
@@ -0,0 +1,406 @@
+import collections
+import contextlib
+import math
+import os
+import re
+import sqlite3
+import subprocess
+import threading
+import time
+
+CODE_INDEX_PATH = os.getenv("CODE_INDEX_PATH", "/tmp/swe-agent-code-index.sqlite")
+# Files indexed, by suffix; symbols and imports are only parsed for Java
+CODE_INDEX_SUFFIXES = tuple(os.getenv("CODE_INDEX_SUFFIXES", ".java,.kt,.xml,.properties,.yml,.yaml").split(","))
+# Larger files are usually generated and would dominate the index
+CODE_INDEX_MAX_FILE_BYTES = int(os.getenv("CODE_INDEX_MAX_FILE_BYTES", str(512 * 1024)))
+# Search results are chunks of at most this many lines, split at declarations
+MAX_CHUNK_LINES = 60
+# BM25 parameters
+K1, B = 1.2, 0.75
+# Raised when parsing changes; an index written by an older version is rebuilt from scratch
+INDEX_VERSION = 2
+# Query terms found in more than this share of chunks ("exception", "value") add
+# almost nothing to BM25 but cost the most to score; they are skipped when the
+# query has other terms
+MAX_DF_RATIO = 0.5
+
+_PACKAGE = re.compile(r"^\s*package\s+([\w.]+)\s*;", re.M)
+_IMPORT = re.compile(r"^\s*import\s+(?:static\s+)?([\w.]+(?:\.\*)?)\s*;", re.M)
+_TYPE = re.compile(r"^[\w\s@]*?\b(class|interface|enum|record|@interface)\s+(\w+)")
+_METHOD = re.compile(r"^\s*(?:@\w+(?:\([^)]*\))?\s+)*(?P<modifiers>(?:(?:public|protected|private|static|final|abstract|"
+                     r"synchronized|native|default|strictfp)\s+)*)(?:<[^>]*>\s+)?(?P<type>[\w.$]+(?:<[^()]*>)?(?:\[\])*\s+)?"
+                     # The declaration head: name(params) then a body, throws, ; (abstract, interface), default
+                     # (annotation element) or the end of the line (parameters or brace continue below)
+                     r"(?P<name>\w+)\s*\((?:[^()]|\([^()]*\))*(?:\)\s*(?:\[\]\s*)*(?:\{|throws\b|default\b|;|$)|$)")
+_NOT_METHODS = {"if", "for", "while", "switch", "catch", "return", "new", "else", "try", "synchronized", "throw", "super",
+                "this", "assert", "case", "yield", "do"}
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_CAMEL = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+STOPWORDS = frozenset("""
+    abstract assert boolean break byte case catch char class const continue default do double else enum extends final
+    finally float for goto if implements import instanceof int interface long native new package private protected
+    public return short static strictfp super switch synchronized this throw throws transient try void volatile while
+    var null true false string java lang util org com override the and for with from that this when should into not
+    are was has have can will get set of to in on is it be by or as an at we if""".split())
+
+
+def terms(text):
+    """Search terms of `text`: identifiers lower-cased whole and split at camelCase/snake_case boundaries"""
+    out = []
+    for word in _WORD.findall(text):
+        lower = word.lower()
+        parts = [p.lower() for p in _CAMEL.findall(word)] if not word.islower() or "_" in word else []
+        if len(parts) > 1:
+            out.extend(p for p in parts if len(p) > 1 and p not in STOPWORDS and not p.isdigit())
+        if len(lower) > 1 and lower not in STOPWORDS:
+            out.append(lower)
+    return out
+
+
+def parse_java(text):
+    """(package, imports, symbols, declaration lines) of a Java source; symbols are (name, kind, line, container)"""
+    package = _PACKAGE.search(text)
+    package = package.group(1) if package else ""
+    imports = _IMPORT.findall(text)
+    symbols, declarations, container = [], [], None
+    for number, line in enumerate(text.splitlines(), 1):
+        stripped = line.strip()
+        if not stripped or stripped.startswith(("//", "*", "/*", "import ", "package ")):
+            continue
+        match = _TYPE.match(line)
+        if match and not stripped.endswith(";"):
+            container = match.group(2)
+            kind = "annotation" if match.group(1) == "@interface" else match.group(1)
+            symbols.append((container, kind, number, None))
+            declarations.append((number, container))
+            continue
+        match = _METHOD.match(line)
+        # A declaration has a return type or modifiers (constructors); a bare "call(" line is a call
+        if not match or not container or not line.startswith((" ", "\t")) or not (match["modifiers"] or match["type"]):
+            continue
+        if match["name"] in _NOT_METHODS or (match["type"] or "").strip() in _NOT_METHODS:
+            continue
+        symbols.append((match["name"], "method", number, container))
+        declarations.append((number, f"{container}.{match['name']}"))
+    return package, imports, symbols, declarations
+
+
+def chunks(text, declarations):
+    """(start, end, symbol) line ranges: one per declaration, split to at most MAX_CHUNK_LINES"""
+    total = text.count("\n") + (0 if text.endswith("\n") else 1)
+    bounds = [(1, None)] + [d for d in declarations if d[0] > 1]
+    out = []
+    for (start, symbol), following in zip(bounds, bounds[1:] + [(total + 1, None)]):
+        end = following[0] - 1
+        while start <= end:
+            out.append((start, min(end, start + MAX_CHUNK_LINES - 1), symbol))
+            start += MAX_CHUNK_LINES
+    return out
+
+
+def _git(git_dir, *args):
+    result = subprocess.run(["git", *args], cwd=git_dir, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)} failed: {result.stderr.decode(errors='replace').strip()}")
+    return result.stdout
+
+
+def read_blobs(git_dir, shas):
+    """{sha: text} for blob `shas`, read through a single `git cat-file --batch`"""
+    if not shas:
+        return {}
+    payload = "".join(f"{sha}\n" for sha in shas).encode()
+    out = subprocess.run(["git", "cat-file", "--batch"], cwd=git_dir, input=payload, capture_output=True,
+                         check=True).stdout
+    blobs, pos = {}, 0
+    while pos < len(out):
+        header_end = out.index(b"\n", pos)
+        header = out[pos:header_end].split()
+        if len(header) < 3:
+            # "<sha> missing"
+            pos = header_end + 1
+            continue
+        size = int(header[2])
+        blobs[header[0].decode()] = out[header_end + 1:header_end + 1 + size].decode("utf-8", "replace")
+        pos = header_end + 1 + size + 1
+    return blobs
+
+
+class CodeIndex:
+    """
+    Per-repository code index in a SQLite file: files with their git blob,
+    Java symbols (file -> class map), the import graph, and a BM25 inverted
+    index over declaration-sized chunks. A repository (a git dir, e.g. a
+    pooled mirror) is indexed at one commit; moving it to another commit
+    re-indexes only the files `git diff-tree` reports as changed. Text is
+    not stored: snippets are read back from the blobs at query time.
+    Queries go through their own connection and see the last committed
+    index, so they never wait for an update in progress.
+    """
+
+    def __init__(self, path=CODE_INDEX_PATH):
+        self._lock = threading.Lock()
+        self._repo_locks = {}
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=60)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS repos (
+                id INTEGER PRIMARY KEY, repo TEXT NOT NULL UNIQUE, commit_sha TEXT NOT NULL, chunks INTEGER NOT NULL,
+                total_length INTEGER NOT NULL, updated REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS files (
+                id INTEGER PRIMARY KEY, repo TEXT NOT NULL, path TEXT NOT NULL, blob TEXT NOT NULL,
+                package TEXT NOT NULL, UNIQUE (repo, path));
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY, file_id INTEGER NOT NULL REFERENCES files (id) ON DELETE CASCADE,
+                start_line INTEGER NOT NULL, end_line INTEGER NOT NULL, symbol TEXT, length INTEGER NOT NULL);
+            CREATE INDEX IF NOT EXISTS chunks_file ON chunks (file_id);
+            CREATE TABLE IF NOT EXISTS symbols (
+                file_id INTEGER NOT NULL REFERENCES files (id) ON DELETE CASCADE, name TEXT NOT NULL,
+                kind TEXT NOT NULL, line INTEGER NOT NULL, container TEXT);
+            CREATE INDEX IF NOT EXISTS symbols_file ON symbols (file_id);
+            CREATE INDEX IF NOT EXISTS symbols_name ON symbols (name);
+            CREATE TABLE IF NOT EXISTS classes (
+                repo TEXT NOT NULL, fqn TEXT NOT NULL,
+                file_id INTEGER NOT NULL REFERENCES files (id) ON DELETE CASCADE);
+            CREATE INDEX IF NOT EXISTS classes_fqn ON classes (repo, fqn);
+            CREATE INDEX IF NOT EXISTS classes_file ON classes (file_id);
+            CREATE TABLE IF NOT EXISTS imports (
+                file_id INTEGER NOT NULL REFERENCES files (id) ON DELETE CASCADE, target TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS imports_file ON imports (file_id);
+            CREATE INDEX IF NOT EXISTS imports_target ON imports (target);
+            -- Keyed and denormalised so a term's postings are one index range, no joins
+            CREATE TABLE IF NOT EXISTS postings (
+                repo_id INTEGER NOT NULL, term TEXT NOT NULL,
+                chunk_id INTEGER NOT NULL REFERENCES chunks (id) ON DELETE CASCADE,
+                tf INTEGER NOT NULL, length INTEGER NOT NULL, PRIMARY KEY (repo_id, term, chunk_id)) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_chunk ON postings (chunk_id);
+        """)
+        if self._db.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+            # Unchanged blobs are never parsed again, so symbols from an older parser would stay
+            self._db.execute("DELETE FROM files")
+            self._db.execute("DELETE FROM repos")
+            self._db.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        self._db.commit()
+        # Read transactions are opened explicitly so a query's statements share one snapshot
+        self._read_lock = threading.Lock()
+        self._read = sqlite3.connect(path, check_same_thread=False, timeout=60, isolation_level=None)
+
+    def _repo_lock(self, repo):
+        with self._lock:
+            return self._repo_locks.setdefault(repo, threading.Lock())
+
+    @contextlib.contextmanager
+    def _reading(self):
+        with self._read_lock:
+            self._read.execute("BEGIN")
+            try:
+                yield self._read
+            finally:
+                self._read.execute("COMMIT")
+
+    def status(self, repo):
+        with self._reading() as db:
+            row = db.execute("SELECT commit_sha, chunks, total_length, updated FROM repos "
+                             "WHERE repo = ? AND commit_sha != ''", (repo,)).fetchone()
+            files = db.execute("SELECT COUNT(*) FROM files WHERE repo = ?", (repo,)).fetchone()[0]
+        if row is None:
+            return None
+        return {"commit": row[0], "files": files, "chunks": row[1], "updated": row[3]}
+
+    def _changes(self, git_dir, old, new):
+        """{path: new blob or None} between two commits, or None when `old` is unknown and a full scan is needed"""
+        if old is None:
+            return None
+        try:
+            out = _git(git_dir, "diff-tree", "-r", "-z", "--no-renames", old, new).decode("utf-8", "replace")
+        except RuntimeError:
+            # The old commit is gone (force push, gc): compare the whole tree instead
+            return None
+        fields = out.split("\0")
+        changes = {}
+        for meta, path in zip(fields[0::2], fields[1::2]):
+            parts = meta.lstrip(":").split()
+            if len(parts) == 5:
+                changes[path] = None if parts[4] == "D" or parts[1] == "160000" else parts[3]
+        return changes
+
+    def _tree(self, git_dir, commit):
+        out = _git(git_dir, "ls-tree", "-r", "-z", "--full-tree", "-l", commit).decode("utf-8", "replace")
+        tree = {}
+        for entry in out.split("\0"):
+            if not entry:
+                continue
+            meta, path = entry.split("\t", 1)
+            mode, kind, sha, size = meta.split()
+            if kind == "blob" and path.endswith(CODE_INDEX_SUFFIXES) and int(size) <= CODE_INDEX_MAX_FILE_BYTES:
+                tree[path] = sha
+        return tree
+
+    def update(self, repo, git_dir, commit):
+        """
+        Bring `repo` to `commit`, re-indexing only changed files when the
+        previously indexed commit is still reachable. Returns what changed.
+        """
+        start = time.monotonic()
+        with self._repo_lock(repo):
+            current = self.status(repo)
+            if current and current["commit"] == commit:
+                return {"commit": commit, "indexed": 0, "removed": 0, "full": False, "duration": 0.0}
+            with self._lock:
+                known = dict(self._db.execute("SELECT path, blob FROM files WHERE repo = ?", (repo,)))
+            changes = self._changes(git_dir, current and current["commit"], commit)
+            full = changes is None
+            if full:
+                tree = self._tree(git_dir, commit)
+                changes = {path: sha for path, sha in tree.items() if known.get(path) != sha}
+                changes.update((path, None) for path in known.keys() - tree.keys())
+            else:
+                changes = {path: sha for path, sha in changes.items()
+                           if sha is None or path.endswith(CODE_INDEX_SUFFIXES)}
+            blobs = read_blobs(git_dir, sorted({sha for sha in changes.values() if sha}))
+
+            with self._lock:
+                self._db.execute("INSERT OR IGNORE INTO repos (repo, commit_sha, chunks, total_length, updated) "
+                                 "VALUES (?, '', 0, 0, 0)", (repo,))
+                repo_id = self._db.execute("SELECT id FROM repos WHERE repo = ?", (repo,)).fetchone()[0]
+                # Changed files are dropped and indexed again; deleted ones are only dropped
+                stale = [path for path in changes if path in known]
+                for batch in range(0, len(stale), 500):
+                    paths = stale[batch:batch + 500]
+                    self._db.execute(f"DELETE FROM files WHERE repo = ? AND path IN ({','.join('?' * len(paths))})",
+                                     (repo, *paths))
+                indexed = 0
+                for path, sha in changes.items():
+                    text = blobs.get(sha) if sha else None
+                    if text is None or len(text.encode()) > CODE_INDEX_MAX_FILE_BYTES:
+                        continue
+                    self._index_file(repo, repo_id, path, sha, text)
+                    indexed += 1
+                count, total = self._db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks JOIN files ON files.id = chunks.file_id "
+                    "WHERE files.repo = ?", (repo,)).fetchone()
+                self._db.execute("UPDATE repos SET commit_sha = ?, chunks = ?, total_length = ?, updated = ? "
+                                 "WHERE id = ?", (commit, count, total, time.time(), repo_id))
+                self._db.commit()
+        return {"commit": commit, "indexed": indexed, "removed": sum(1 for sha in changes.values() if sha is None),
+                "full": full, "duration": round(time.monotonic() - start, 3)}
+
+    def _index_file(self, repo, repo_id, path, sha, text):
+        package, imports, symbols, declarations = parse_java(text) if path.endswith(".java") else ("", [], [], [])
+        file_id = self._db.execute("INSERT INTO files (repo, path, blob, package) VALUES (?, ?, ?, ?)",
+                                   (repo, path, sha, package)).lastrowid
+        self._db.executemany("INSERT INTO symbols VALUES (?, ?, ?, ?, ?)",
+                             [(file_id, *symbol) for symbol in symbols])
+        self._db.executemany("INSERT INTO classes VALUES (?, ?, ?)",
+                             [(repo, f"{package}.{name}" if package else name, file_id)
+                              for name, kind, _, _ in symbols if kind != "method"])
+        self._db.executemany("INSERT INTO imports VALUES (?, ?)", [(file_id, target) for target in imports])
+        lines = text.splitlines()
+        # Path components go into the file's first chunk only; repeating them in every chunk
+        # would make package names the densest terms of the index
+        path_terms = terms(path.replace("/", " ").rsplit(".", 1)[0])
+        for number, (start, end, symbol) in enumerate(chunks(text, declarations)):
+            # The declared name (Class.method) counts double: a query naming it should rank its chunk first
+            words = terms("\n".join(lines[start - 1:end])) + terms(symbol or "") * 2 + (path_terms if number == 0 else [])
+            if not words:
+                continue
+            chunk_id = self._db.execute(
+                "INSERT INTO chunks (file_id, start_line, end_line, symbol, length) VALUES (?, ?, ?, ?, ?)",
+                (file_id, start, end, symbol, len(words))).lastrowid
+            self._db.executemany("INSERT INTO postings VALUES (?, ?, ?, ?, ?)",
+                                 [(repo_id, term, chunk_id, tf, len(words))
+                                  for term, tf in collections.Counter(words).items()])
+
+    def search(self, repo, query, limit=5):
+        """Top `limit` chunks for `query` by BM25, as {path, blob, start_line, end_line, symbol, score}"""
+        with self._reading() as db:
+            row = db.execute("SELECT id, chunks, total_length FROM repos WHERE repo = ? AND commit_sha != ''",
+                             (repo,)).fetchone()
+            if not row or not row[1]:
+                return []
+            repo_id, n, total = row
+            average = total / n
+            query_terms = sorted(set(terms(query)))
+            if not query_terms:
+                return []
+            marks = ",".join("?" * len(query_terms))
+            df = dict(db.execute(f"SELECT term, COUNT(*) FROM postings WHERE repo_id = ? AND term IN ({marks}) "
+                                 f"GROUP BY term", (repo_id, *query_terms)))
+            if not df:
+                return []
+            if any(count <= n * MAX_DF_RATIO for count in df.values()):
+                df = {term: count for term, count in df.items() if count <= n * MAX_DF_RATIO}
+            # Scored inside SQLite: each term's idf is a CASE arm, every posting one row of the aggregate
+            idf = " ".join(f"WHEN ? THEN {math.log(1 + (n - count + 0.5) / (count + 0.5))!r}" for count in df.values())
+            top = db.execute(
+                f"SELECT chunk_id, SUM((CASE term {idf} END) * tf * {K1 + 1} / (tf + {K1} * ({1 - B} + {B} * length / ?))) "
+                f"AS score FROM postings WHERE repo_id = ? AND term IN ({','.join('?' * len(df))}) "
+                f"GROUP BY chunk_id ORDER BY score DESC LIMIT ?",
+                (*df, average, repo_id, *df, limit)).fetchall()
+            hits = []
+            for chunk_id, score in top:
+                path, blob, start, end, symbol = db.execute(
+                    "SELECT files.path, files.blob, chunks.start_line, chunks.end_line, chunks.symbol FROM chunks "
+                    "JOIN files ON files.id = chunks.file_id WHERE chunks.id = ?", (chunk_id,)).fetchone()
+                hits.append({"path": path, "blob": blob, "start_line": start, "end_line": end, "symbol": symbol,
+                             "score": round(score, 3)})
+        return hits
+
+    def symbols(self, repo, name):
+        """Declarations named `name` as {path, kind, line, container}"""
+        with self._reading() as db:
+            rows = db.execute(
+                "SELECT files.path, symbols.kind, symbols.line, symbols.container FROM symbols "
+                "JOIN files ON files.id = symbols.file_id WHERE symbols.name = ? AND files.repo = ?",
+                (name, repo)).fetchall()
+        return [{"path": p, "kind": k, "line": l, "container": c} for p, k, l, c in rows]
+
+    def related(self, repo, path):
+        """Files `path` imports (resolved through the class map) and files that import one of its classes"""
+        with self._reading() as db:
+            row = db.execute("SELECT id, package FROM files WHERE repo = ? AND path = ?", (repo, path)).fetchone()
+            if row is None:
+                return {"imports": [], "imported_by": []}
+            file_id, package = row
+            imports = set()
+            for (target,) in db.execute("SELECT target FROM imports WHERE file_id = ?", (file_id,)).fetchall():
+                if target.endswith(".*"):
+                    query = "SELECT path FROM files WHERE repo = ? AND package = ?"
+                    target = target[:-2]
+                else:
+                    query = "SELECT files.path FROM classes JOIN files ON files.id = classes.file_id " \
+                            "WHERE classes.repo = ? AND classes.fqn = ?"
+                imports.update(p for (p,) in db.execute(query, (repo, target)))
+            targets = [fqn for (fqn,) in db.execute("SELECT fqn FROM classes WHERE file_id = ?", (file_id,))]
+            targets += [f"{package}.*"] if package else []
+            imported_by = {p for (p,) in db.execute(
+                f"SELECT files.path FROM imports JOIN files ON files.id = imports.file_id "
+                f"WHERE files.repo = ? AND imports.target IN ({','.join('?' * len(targets))})",
+                (repo, *targets))} if targets else set()
+        return {"imports": sorted(imports - {path}), "imported_by": sorted(imported_by - {path})}
+
+
+def snippet_text(git_dir, hits):
+    """`hits` with the "text" of their line range, read from the indexed blobs"""
+    blobs = read_blobs(git_dir, sorted({hit["blob"] for hit in hits}))
+    out = []
+    for hit in hits:
+        lines = (blobs.get(hit["blob"]) or "").splitlines()
+        out.append({**{k: v for k, v in hit.items() if k != "blob"},
+                    "text": "\n".join(lines[hit["start_line"] - 1:hit["end_line"]])})
+    return out
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_code_index():
+    """Process-wide index, created on first use"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = CodeIndex()
+        return _index
@@ -0,0 +1,190 @@
+import itertools
+import mmap
+import os
+import tempfile
+import unified_diff
+
+# Ranged reads of files at least this large scan an mmap of the file for line
+# offsets instead of reading it through Python's line iterator
+FS_MMAP_THRESHOLD = int(os.getenv("FS_MMAP_THRESHOLD", str(1024 * 1024)))
+# Content returned by one bulk read; files past it come back truncated
+FS_READ_MAX_BYTES = int(os.getenv("FS_READ_MAX_BYTES", str(8 * 1024 * 1024)))
+
+
+def _line_start(m, line, pos=0, block_size=1 << 20):
+    """Byte offset in `m` where 1-based `line` starts (counting from `pos`), or -1 past the end"""
+    remaining = line - 1
+    while remaining:
+        if pos >= len(m):
+            return -1
+        # Newlines are counted a block at a time; only the last block is searched line by line
+        block = m[pos:pos + block_size]
+        count = block.count(b"\n")
+        if count < remaining:
+            remaining -= count
+            pos += len(block)
+            continue
+        at = -1
+        for _ in range(remaining):
+            at = block.find(b"\n", at + 1)
+        return pos + at + 1
+    return pos
+
+
+def read_range(path, start_line=1, end_line=0, max_bytes=FS_READ_MAX_BYTES):
+    """
+    Lines start_line..end_line (1-based, inclusive; end_line 0 = to the end)
+    of `path` as {"content", "start_line", "end_line", "eof", "truncated"}.
+    Large files are mapped rather than read, so asking for a few lines of a
+    big log or generated source costs only the pages those lines sit on.
+    """
+    start_line = max(start_line, 1)
+    size = os.path.getsize(path)
+    if size >= FS_MMAP_THRESHOLD:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            begin = _line_start(m, start_line)
+            if begin < 0:
+                return {"content": "", "start_line": start_line, "end_line": start_line - 1, "eof": True,
+                        "truncated": False}
+            end = _line_start(m, end_line - start_line + 2, begin) if end_line else -1
+            end = len(m) if end < 0 else end
+            truncated = end - begin > max_bytes
+            data = m[begin:begin + max_bytes] if truncated else m[begin:end]
+            eof = end >= len(m)
+    else:
+        with open(path, "rb") as f:
+            wanted = itertools.islice(f, start_line - 1, end_line or None)
+            chunks, total, truncated = [], 0, False
+            for line in wanted:
+                if total + len(line) > max_bytes:
+                    chunks.append(line[:max_bytes - total])
+                    truncated = True
+                    break
+                chunks.append(line)
+                total += len(line)
+            eof = truncated is False and f.read(1) == b""
+            data = b"".join(chunks)
+    content = data.decode("utf-8", "replace")
+    count = content.count("\n") + (1 if content and not content.endswith("\n") else 0)
+    return {"content": content, "start_line": start_line, "end_line": start_line + count - 1, "eof": eof,
+            "truncated": truncated}
+
+
+def read_many(requests, max_bytes=FS_READ_MAX_BYTES):
+    """
+    Bulk ranged reads. Each request is a path or {"path", "start_line",
+    "end_line"}; results come back in the same order, with "error" instead of
+    content for unreadable files. `max_bytes` bounds the whole reply.
+    """
+    results, budget = [], max_bytes
+    for request in requests:
+        request = {"path": request} if isinstance(request, str) else request
+        path = request["path"]
+        try:
+            result = read_range(path, request.get("start_line", 1), request.get("end_line", 0), max(budget, 0))
+        except OSError as e:
+            results.append({"path": path, "error": f"{type(e).__name__}: {e.strerror or e}"})
+            continue
+        budget -= len(result["content"])
+        results.append({"path": path, **result})
+    return results
+
+
+def commit(changes):
+    """
+    Write {path: content} (content None deletes the file) all-or-nothing.
+    Each file is written to a temporary sibling and renamed over the
+    original, keeping its mode; if any step fails, the files already
+    replaced are restored and the error is raised.
+    """
+    done = []
+    try:
+        for path, content in changes.items():
+            try:
+                with open(path, "rb") as f:
+                    previous = f.read()
+                mode = os.stat(path).st_mode & 0o7777
+            except FileNotFoundError:
+                previous, mode = None, None
+            if content is None:
+                if previous is not None:
+                    os.remove(path)
+            else:
+                directory = os.path.dirname(path) or "."
+                os.makedirs(directory, exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=directory, prefix=".swe-agent-")
+                try:
+                    with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                        f.write(content)
+                    if mode is not None:
+                        os.chmod(tmp, mode)
+                    os.replace(tmp, path)
+                except BaseException:
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+                    raise
+            done.append((path, previous, mode))
+    except BaseException:
+        for path, previous, mode in reversed(done):
+            if previous is None:
+                if os.path.exists(path):
+                    os.remove(path)
+                continue
+            with open(path, "wb") as f:
+                f.write(previous)
+            if mode is not None:
+                os.chmod(path, mode)
+        raise
+
+
+def _inside(repo_path, relative):
+    root = os.path.realpath(repo_path)
+    full = os.path.realpath(os.path.join(root, relative))
+    if os.path.commonpath([root, full]) != root:
+        raise unified_diff.PatchError([{"file": relative, "reason": "path is outside the repository"}])
+    return full
+
+
+def apply_unified_diff(repo_path, patch, check=False):
+    """
+    Apply every file of a unified diff under `repo_path` in-process, or
+    none of them. Returns the per-file hunk and line counts; raises
+    PatchError with every failing hunk when the diff doesn't apply. With
+    `check`, nothing is written.
+    """
+    files = unified_diff.parse(patch)
+    if not files:
+        raise unified_diff.PatchError([{"file": None, "reason": "no unified diff hunks found"}])
+    changes, summary, errors = {}, [], []
+    for file_patch in files:
+        name = file_patch["new"] or file_patch["old"]
+        try:
+            source = _inside(repo_path, file_patch["old"]) if file_patch["old"] else None
+            target = _inside(repo_path, file_patch["new"]) if file_patch["new"] else source
+            if source is None and os.path.exists(target):
+                raise unified_diff.PatchError([{"file": name, "reason": "file to create already exists"}])
+            text = None
+            if source in changes:
+                # An earlier section of the same diff already changed this file
+                text = changes[source]
+            elif source is not None:
+                try:
+                    with open(source, encoding="utf-8", newline="") as f:
+                        text = f.read()
+                except FileNotFoundError:
+                    raise unified_diff.PatchError([{"file": name, "reason": "file to patch does not exist"}])
+            changes[target] = unified_diff.apply(text, file_patch, name)
+            if source is not None and target != source:
+                changes[source] = None
+        except unified_diff.PatchError as e:
+            errors.extend(e.errors)
+            continue
+        ops = [op for h in file_patch["hunks"] for op, _ in h["lines"]]
+        summary.append({"path": name, "hunks": len(file_patch["hunks"]), "added": ops.count("+"),
+                        "removed": ops.count("-"),
+                        "action": "create" if source is None else "delete" if file_patch["new"] is None else "modify"})
+    if errors:
+        raise unified_diff.PatchError(errors)
+    if not check:
+        commit(changes)
+    return summary
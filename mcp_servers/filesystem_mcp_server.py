@@ -1,30 +1,49 @@
 from mcp.server import Server
 from mcp import stdio_server
-import os
-import subprocess
+from tool_dispatch import register_tools
+from file_ops import apply_unified_diff, commit, read_many, read_range
+from unified_diff import PatchError
 import asyncio
 
 server = Server("filesystem")
 
-@server.call_tool()
-def read_file(path: str):
-    with open(path, "r") as f:
-        return f.read()
+def read_file(path: str, start_line: int = 1, end_line: int = 0):
+    """Contents of `path`, or only lines start_line..end_line (1-based, inclusive) when given"""
+    if start_line == 1 and not end_line:
+        with open(path, "r") as f:
+            return f.read()
+    return read_range(path, start_line, end_line)["content"]
+
+def read_files(files: list):
+    """
+    Several files or line ranges in one call; each entry is a path or
+    {"path", "start_line", "end_line"}. Large files are memory-mapped and
+    only the requested lines are decoded.
+    """
+    return {"files": read_many(files)}
 
-@server.call_tool()
 def write_file(path: str, content: str):
-    with open(path, "w") as f:
-        f.write(content)
+    commit({path: content})
     return {"status": "ok"}
 
-@server.call_tool()
-def apply_patch(patch_content: str, repo_path: str):
-    patch_file = os.path.join(repo_path, "tmp_patch.diff")
-    with open(patch_file, "w") as f:
-        f.write(patch_content)
-    subprocess.run(["git", "apply", patch_file], cwd=repo_path)
-    os.remove(patch_file)
-    return {"status": "applied"}
+def write_files(files: dict):
+    """Write {path: content} atomically: every file is replaced, or none is"""
+    commit(files)
+    return {"status": "ok", "written": len(files)}
+
+def apply_patch(patch_content: str, repo_path: str, check: bool = False):
+    """
+    Apply a unified diff in-process and atomically: either every file in it
+    changes or none does. A rejected patch reports each failing hunk.
+    With check=True the patch is only validated.
+    """
+    try:
+        files = apply_unified_diff(repo_path, patch_content, check=check)
+    except PatchError as e:
+        return {"status": "rejected", "errors": e.errors}
+    return {"status": "checked" if check else "applied", "files": files}
+
+register_tools(server, read_file, read_files, write_file, write_files, apply_patch)
 
 async def main():
     async with stdio_server() as streams:
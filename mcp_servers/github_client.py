@@ -0,0 +1,169 @@
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+GH_API_URL = os.getenv("GH_API_URL", "https://api.github.com")
+GH_POOL_SIZE = int(os.getenv("GH_POOL_SIZE", "8"))
+# PR creations in flight at once
+GH_PR_CONCURRENCY = int(os.getenv("GH_PR_CONCURRENCY", "4"))
+# Minimum spacing between mutating requests; GitHub's secondary rate limits
+# punish bursts of content creation
+GH_WRITE_INTERVAL = float(os.getenv("GH_WRITE_INTERVAL", "1.0"))
+# Requests left in the primary quota that are kept in reserve; below it we wait for the reset
+GH_RATE_LIMIT_RESERVE = int(os.getenv("GH_RATE_LIMIT_RESERVE", "10"))
+GH_MAX_RETRIES = int(os.getenv("GH_MAX_RETRIES", "5"))
+GH_BACKOFF_BASE = float(os.getenv("GH_BACKOFF_BASE", "2.0"))
+GH_BACKOFF_MAX = float(os.getenv("GH_BACKOFF_MAX", "120"))
+GH_TIMEOUT = float(os.getenv("GH_TIMEOUT", "30"))
+GH_ETAG_CACHE_SIZE = 512
+
+
+class RateLimiter:
+    """Paces requests from the X-RateLimit-* headers GitHub returns on every response"""
+
+    def __init__(self, write_interval=GH_WRITE_INTERVAL, reserve=GH_RATE_LIMIT_RESERVE):
+        self.write_interval = write_interval
+        self.reserve = reserve
+        self.remaining = None
+        self.reset_at = 0.0
+        self.blocked_until = 0.0
+        self._next_write = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self, method):
+        with self._lock:
+            now = time.time()
+            delay = max(0.0, self.blocked_until - now)
+            if self.remaining is not None and self.remaining <= self.reserve and self.reset_at > now:
+                delay = max(delay, self.reset_at - now)
+            if method not in ("GET", "HEAD"):
+                # Reserve the next write slot so concurrent writers queue up behind each other
+                start = max(now + delay, self._next_write)
+                self._next_write = start + self.write_interval
+                delay = start - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def update(self, headers):
+        with self._lock:
+            if "X-RateLimit-Remaining" in headers:
+                self.remaining = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Reset" in headers:
+                self.reset_at = float(headers["X-RateLimit-Reset"])
+
+    def block(self, seconds):
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.time() + seconds)
+
+
+def _retry_after(value):
+    """Seconds to wait for a Retry-After header, given in seconds or as an HTTP date"""
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return GH_BACKOFF_BASE
+
+
+def _rate_limited(res):
+    if res.status_code == 429:
+        return True
+    if res.status_code != 403:
+        return False
+    return (res.headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in res.headers
+            or "rate limit" in res.text.lower())
+
+
+class GitHubClient:
+    """
+    GitHub REST client over one keep-alive connection pool. Every request
+    is paced by RateLimiter, rate-limited responses (403/429) are retried
+    after Retry-After / the quota reset / jittered backoff, GETs are
+    conditional on the cached ETag, and PR creation is bounded by
+    GH_PR_CONCURRENCY.
+    """
+
+    def __init__(self, token=None, api_url=GH_API_URL, pool_size=GH_POOL_SIZE, pr_concurrency=GH_PR_CONCURRENCY,
+                 limiter=None):
+        self.api_url = api_url.rstrip("/")
+        self.pr_concurrency = pr_concurrency
+        self.limiter = limiter or RateLimiter()
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": f"token {token or os.getenv('GH_TOKEN')}",
+                                     "Accept": "application/vnd.github+json"})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._pr_slots = threading.BoundedSemaphore(pr_concurrency)
+        self._etags = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "not_modified": 0, "rate_limited": 0}
+
+    def request(self, method, path, **kwargs):
+        url = path if path.startswith("http") else f"{self.api_url}{path}"
+        for attempt in range(GH_MAX_RETRIES + 1):
+            self.limiter.wait(method)
+            res = self.session.request(method, url, timeout=GH_TIMEOUT, **kwargs)
+            self.limiter.update(res.headers)
+            retryable = _rate_limited(res) or (method == "GET" and res.status_code >= 500)
+            with self._lock:
+                self.stats["requests"] += 1
+                self.stats["rate_limited"] += _rate_limited(res)
+            if not retryable or attempt == GH_MAX_RETRIES:
+                return res
+            if "Retry-After" in res.headers:
+                delay = _retry_after(res.headers["Retry-After"])
+            elif res.headers.get("X-RateLimit-Remaining") == "0":
+                delay = float(res.headers.get("X-RateLimit-Reset", 0)) - time.time()
+            else:
+                delay = min(GH_BACKOFF_MAX, GH_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+            self.limiter.block(max(delay, 0.0))
+
+    def get(self, path, params=None):
+        """GET with If-None-Match; a 304 (which doesn't use quota) is served from the cache"""
+        key = (path, tuple(sorted((params or {}).items())))
+        with self._lock:
+            cached = self._etags.get(key)
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        res = self.request("GET", path, params=params, headers=headers)
+        if res.status_code == 304 and cached:
+            with self._lock:
+                self.stats["not_modified"] += 1
+                self._etags.move_to_end(key)
+            return cached[1]
+        res.raise_for_status()
+        body = res.json()
+        if res.headers.get("ETag"):
+            with self._lock:
+                self._etags[key] = (res.headers["ETag"], body)
+                self._etags.move_to_end(key)
+                while len(self._etags) > GH_ETAG_CACHE_SIZE:
+                    self._etags.popitem(last=False)
+        return body
+
+    def create_pr(self, repo, head, title, body, base="main"):
+        """Open a PR, or return the open one for `head` if a retry already created it"""
+        with self._pr_slots:
+            res = self.request("POST", f"/repos/{repo}/pulls",
+                               json={"title": title, "head": head, "base": base, "body": body})
+            if res.status_code == 422 and "already exists" in res.text:
+                owner = repo.split("/")[0]
+                existing = self.get(f"/repos/{repo}/pulls", params={"head": f"{owner}:{head}", "state": "open"})
+                if existing:
+                    return existing[0]
+            res.raise_for_status()
+            return res.json()
+
+    def create_prs(self, repo, prs):
+        """Open many PRs concurrently, at most `pr_concurrency` in flight; `prs` are create_pr kwargs"""
+        with ThreadPoolExecutor(max_workers=self.pr_concurrency) as executor:
+            return list(executor.map(lambda pr: self.create_pr(repo, **pr), prs))
@@ -1,30 +1,101 @@
 from mcp.server import Server
 from mcp import stdio_server
-import os, subprocess, requests
+from tool_dispatch import register_tools
+from repo_pool import RepoPool
+from github_client import GitHubClient
+from code_index import get_code_index, snippet_text
+import os
 import asyncio
+import logging
+import threading
 
 server = Server("github")
+repo_pool = RepoPool()
+# Pooled, rate-limit-aware client shared by every tool call
+github = GitHubClient()
+# Bases whose index a background thread is bringing up to date
+_indexing = set()
+_indexing_lock = threading.Lock()
 
-@server.call_tool()
 def create_pr(branch_name: str, title: str, body: str, base="main"):
-    repo = os.getenv("GH_REPO")  # e.g., owner/repo
-    token = os.getenv("GH_TOKEN")
-    url = f"https://api.github.com/repos/{repo}/pulls"
-    headers = {"Authorization": f"token {token}"}
-    payload = {"title": title, "head": branch_name, "base": base, "body": body}
-    res = requests.post(url, headers=headers, json=payload)
-    res.raise_for_status()
-    return {"pr_url": res.json()["html_url"]}
-
-@server.call_tool()
-def clone_repo(branch_name: str, target_dir: str):
-    repo = os.getenv("GH_REPO")
-    url = f"https://github.com/{repo}.git"
-    subprocess.run(["git", "clone", url, target_dir])
-    subprocess.run(["git", "checkout", branch_name], cwd=target_dir)
+    pr = github.create_pr(os.getenv("GH_REPO"), branch_name, title, body, base=base)  # GH_REPO: owner/repo
+    return {"pr_url": pr["html_url"]}
+
+def create_prs(prs: list):
+    """Open several PRs concurrently (bounded by GH_PR_CONCURRENCY); `prs` is a list of {branch_name, title, body[, base]}"""
+    specs = [{"head": pr["branch_name"], "title": pr["title"], "body": pr["body"], "base": pr.get("base", "main")}
+             for pr in prs]
+    return {"pr_urls": [pr["html_url"] for pr in github.create_prs(os.getenv("GH_REPO"), specs)]}
+
+def _remote_url():
+    # GH_REMOTE_URL points at another remote, e.g. a local bare repo
+    return os.getenv("GH_REMOTE_URL") or f"https://github.com/{os.getenv('GH_REPO')}.git"
+
+def clone_repo(branch_name: str, target_dir: str, base: str = "main"):
+    """Check out a fresh branch for an issue as a worktree of the pooled mirror"""
+    repo_pool.checkout(_remote_url(), branch_name, target_dir, base=base)
+    # The mirror was just synced: move the index along with it
+    _refresh_index(base)
     return {"status": "cloned"}
 
+def fork_repo(source_dir: str, target_dir: str):
+    """Copy an issue's worktree, uncommitted changes included, into a new detached worktree"""
+    repo_pool.fork(source_dir, target_dir)
+    return {"status": "forked"}
+
+def release_repo(target_dir: str):
+    """Reclaim an issue's worktree once it has finished or failed"""
+    return {"status": "released" if repo_pool.release(target_dir) else "unknown"}
+
+def _update_index(base):
+    try:
+        # The index follows origin/<base> of the pooled mirror, re-indexing only what changed since it last moved
+        mirror, commit = repo_pool.head(_remote_url(), base)
+        update = get_code_index().update(mirror, mirror, commit)
+        if update["indexed"] or update["removed"]:
+            logging.info(f"Indexed origin/{base} at {commit[:12]}: {update}")
+    except Exception as e:
+        logging.warning(f"Indexing origin/{base} failed: {e}")
+    finally:
+        with _indexing_lock:
+            _indexing.discard(base)
+
+def _refresh_index(base):
+    """Start bringing the index of origin/<base> up to date in the background, unless that is under way"""
+    with _indexing_lock:
+        if base in _indexing:
+            return
+        _indexing.add(base)
+    threading.Thread(target=_update_index, args=(base,), name=f"index-{base}", daemon=True).start()
+
+def _indexed(base):
+    # Queries read the index as last built and never wait for a fetch or an update; until the
+    # first build of a repository finishes they find nothing
+    _refresh_index(base)
+    return repo_pool.mirror_path(_remote_url())
+
+def search_code(query: str, limit: int = 5, base: str = "main"):
+    """Top code chunks for `query` (BM25 over the repository index at origin/<base>), with their source text"""
+    mirror = _indexed(base)
+    status = get_code_index().status(mirror)
+    return {"commit": status and status["commit"],
+            "results": snippet_text(mirror, get_code_index().search(mirror, query, limit))}
+
+def find_symbol(name: str, base: str = "main"):
+    """Declarations (classes, interfaces, methods) named `name` at origin/<base>"""
+    return {"symbols": get_code_index().symbols(_indexed(base), name)}
+
+def related_files(path: str, base: str = "main"):
+    """Files `path` imports and files that import it, from the import graph at origin/<base>"""
+    return get_code_index().related(_indexed(base), path)
+
+register_tools(server, create_pr, create_prs, clone_repo, fork_repo, release_repo, search_code, find_symbol,
+               related_files)
+
 async def main():
+    if os.getenv("GH_REPO") or os.getenv("GH_REMOTE_URL"):
+        # Built ahead of the first search, which would otherwise find nothing
+        _refresh_index("main")
     async with stdio_server() as streams:
         await server.run(*streams, server.create_initialization_options())
 
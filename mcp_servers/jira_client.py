@@ -0,0 +1,158 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+JIRA_PAGE_SIZE = int(os.getenv("JIRA_PAGE_SIZE", "100"))
+# Only these fields are fetched; the planner reads the summary, delta sync needs `updated`
+# and the scheduling policy priority, created, project and assignee
+JIRA_FIELDS = os.getenv("JIRA_FIELDS", "summary,status,updated,priority,created,project,assignee")
+JIRA_POOL_SIZE = int(os.getenv("JIRA_POOL_SIZE", "8"))
+JIRA_TIMEOUT = float(os.getenv("JIRA_TIMEOUT", "30"))
+# Last `updated` timestamp seen per query, kept between runs for delta sync
+JIRA_WATERMARK_PATH = os.getenv("JIRA_WATERMARK_PATH", "/tmp/swe-agent-jira-watermarks.json")
+# JQL dates are read in the Jira user's time zone
+JIRA_TIMEZONE = os.getenv("JIRA_TIMEZONE", "UTC")
+
+
+def parse_updated(value):
+    """Jira timestamps look like 2024-05-01T12:34:56.789+0000"""
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%f%z")
+
+
+class WatermarkStore:
+    """JSON file of {query: {"updated": iso timestamp, "ids": [ids updated at that instant]}}"""
+
+    def __init__(self, path=JIRA_WATERMARK_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def get(self, query):
+        with self._lock:
+            return self._load().get(query)
+
+    def set(self, query, watermark):
+        with self._lock:
+            marks = self._load()
+            marks[query] = watermark
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(marks, f)
+            os.replace(tmp, self.path)
+
+
+class JiraClient:
+    """
+    Jira REST client over one pooled, retrying requests.Session. Searches
+    are paginated lazily and fetch only JIRA_FIELDS; with delta=True a
+    search only returns issues updated since the previous delta search for
+    the same query.
+    """
+
+    def __init__(self, base_url=None, token=None, page_size=JIRA_PAGE_SIZE, fields=JIRA_FIELDS,
+                 pool_size=JIRA_POOL_SIZE, watermarks=None):
+        self.base_url = (base_url or os.getenv("JIRA_URL", "")).rstrip("/")
+        self.page_size = page_size
+        self.fields = fields
+        self.pool_size = pool_size
+        self.watermarks = watermarks or WatermarkStore()
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": f"Bearer {token or os.getenv('JIRA_TOKEN')}",
+                                     "Accept": "application/json"})
+        # Idempotent requests are retried on 429s and gateway errors, honouring Retry-After
+        retry = Retry(total=5, backoff_factor=0.5, status_forcelist=(429, 502, 503, 504),
+                      respect_retry_after_header=True)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _page(self, jql, fields, start):
+        res = self.session.get(f"{self.base_url}/rest/api/3/search", timeout=JIRA_TIMEOUT, params={
+            "jql": jql, "startAt": start, "maxResults": self.page_size, "fields": fields,
+        })
+        res.raise_for_status()
+        page = res.json()
+        return page.get("issues", []), page.get("total", 0)
+
+    def iter_search(self, jql, fields=None):
+        """Yield every issue matching `jql`, one page at a time by offset, so the order should be stable"""
+        start = 0
+        while True:
+            issues, total = self._page(jql, fields or self.fields, start)
+            yield from issues
+            start += len(issues)
+            if not issues or start >= total:
+                return
+
+    def search(self, jql, delta=False, limit=None):
+        """
+        Issues matching `jql`, oldest update first. With `delta`, only those
+        updated since the stored watermark; the watermark advances once the
+        search has been read to the end (not when cut short by `limit`).
+
+        Pages are fetched by key rather than offset: each re-queries from the
+        newest `updated` seen so far. An issue updated mid-scan moves to the
+        end of the order, which would shift the next one past an offset page
+        boundary; here it is only seen again, and kept once, as last seen.
+        """
+        fields = self.fields if "updated" in self.fields.split(",") else f"{self.fields},updated"
+        mark = self.watermarks.get(jql) if delta else None
+        # The newest `updated` seen and the ids seen at that instant
+        cursor = dict(mark) if mark else None
+        issues, index, start = [], {}, 0
+        while True:
+            query = jql
+            if cursor:
+                cursor_at = parse_updated(cursor["updated"])
+                # JQL compares at minute precision; the exact cut happens below
+                query = f"({jql}) AND updated >= \"{cursor_at.astimezone(ZoneInfo(JIRA_TIMEZONE)):%Y/%m/%d %H:%M}\""
+            page, total = self._page(query + " ORDER BY updated ASC", fields, start)
+            progressed = False
+            for issue in page:
+                updated = issue.get("fields", {}).get("updated")
+                at = parse_updated(updated) if updated else None
+                if cursor and at and (at < cursor_at or (at == cursor_at and issue["id"] in cursor["ids"])):
+                    continue
+                if issue["id"] in index:
+                    issues[index[issue["id"]]] = issue
+                else:
+                    index[issue["id"]] = len(issues)
+                    issues.append(issue)
+                    progressed = True
+                    if limit and len(issues) >= limit:
+                        return issues
+                if at and cursor and at == cursor_at:
+                    cursor["ids"] = cursor["ids"] + [issue["id"]]
+                    progressed = True
+                elif at and (not cursor or at > cursor_at):
+                    cursor, cursor_at, progressed = {"updated": updated, "ids": [issue["id"]]}, at, True
+            if not page or start + len(page) >= total:
+                break
+            # A page with nothing new: more issues share the cursor's minute than fit in one, so step past them
+            start = 0 if progressed else start + len(page)
+        if delta and cursor:
+            self.watermarks.set(jql, cursor)
+        return issues
+
+    def add_comment(self, issue_id, comment):
+        res = self.session.post(f"{self.base_url}/rest/api/3/issue/{issue_id}/comment",
+                                json={"body": comment}, timeout=JIRA_TIMEOUT)
+        return {"issue_id": issue_id, "status": res.status_code}
+
+    def add_comments(self, updates):
+        """Comment on many issues concurrently over the shared pool; `updates` is [{issue_id, comment}]"""
+        with ThreadPoolExecutor(max_workers=self.pool_size) as executor:
+            return list(executor.map(lambda u: self.add_comment(u["issue_id"], u["comment"]), updates))
@@ -1,25 +1,26 @@
 from mcp.server import Server
 from mcp import stdio_server
-import os, requests
+from tool_dispatch import register_tools
+from jira_client import JiraClient
 import asyncio
 
 server = Server("jira")
+# One pooled session for every tool call
+jira = JiraClient()
 
-@server.call_tool()
-def list_issues(assignee: str):
-    url = f"{os.getenv('JIRA_URL')}/rest/api/3/search"
-    headers = {"Authorization": f"Bearer {os.getenv('JIRA_TOKEN')}"}
-    jql = f"assignee={assignee} AND status='To Do'"
-    res = requests.get(url, headers=headers, params={"jql": jql})
-    res.raise_for_status()
-    return res.json().get("issues", [])
+def list_issues(assignee: str, status: str = "To Do", delta: bool = False, limit: int = 0):
+    """Issues assigned to `assignee`, every page; with delta, only those updated since the last delta call"""
+    jql = f"assignee={assignee} AND status='{status}'"
+    return jira.search(jql, delta=delta, limit=limit or None)
 
-@server.call_tool()
 def update_issue(issue_id: str, comment: str):
-    url = f"{os.getenv('JIRA_URL')}/rest/api/3/issue/{issue_id}/comment"
-    headers = {"Authorization": f"Bearer {os.getenv('JIRA_TOKEN')}"}
-    res = requests.post(url, headers=headers, json={"body": comment})
-    return {"status": res.status_code}
+    return {"status": jira.add_comment(issue_id, comment)["status"]}
+
+def bulk_update_issues(updates: list):
+    """Comment on several issues at once; `updates` is a list of {issue_id, comment}"""
+    return {"results": jira.add_comments(updates)}
+
+register_tools(server, list_issues, update_issue, bulk_update_issues)
 
 async def main():
     async with stdio_server() as streams:
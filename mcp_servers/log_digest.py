@@ -0,0 +1,243 @@
+import os
+import re
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from collections import deque
+
+LOG_SPILL_DIR = os.getenv("LOG_SPILL_DIR", "/tmp/swe-agent-logs")
+# Spilled raw logs older than this many seconds are deleted
+LOG_SPILL_TTL = float(os.getenv("LOG_SPILL_TTL", str(24 * 3600)))
+# Bounds on what a digest may hold
+MAX_FAILURES = 20
+MAX_FRAMES = 5
+MAX_MESSAGE_CHARS = 500
+TAIL_LINES = 40
+
+# Frames from these packages rarely point at the bug
+_NOISE_FRAMES = ("org.junit.", "junit.framework.", "org.opentest4j.", "org.apache.maven.", "java.base/",
+                 "jdk.internal.", "sun.reflect.", "java.lang.reflect.", "org.assertj.", "org.hamcrest.")
+
+
+def _clip(text, limit=MAX_MESSAGE_CHARS):
+    text = text.strip()
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+class MavenLogParser:
+    """Incrementally extracts test failures, compile errors and counts from Maven/Surefire output"""
+
+    # JUnit 4 style "name(Class)" and newer surefire "Class.name" failure headers
+    _failure = re.compile(
+        r"^(?:\[ERROR\]\s+)?(?:(?P<m1>[\w$]+)\((?P<c1>[\w.$]+)\)|(?P<c2>[\w.$]+)\.(?P<m2>[\w$]+))"
+        r"\s.*<<<\s*(?P<kind>FAILURE|ERROR)!"
+    )
+    _counts = re.compile(r"Tests run:\s*(\d+),\s*Failures:\s*(\d+),\s*Errors:\s*(\d+),\s*Skipped:\s*(\d+)")
+    _compile = re.compile(r"^\[ERROR\]\s+(?P<file>\S+\.java):\[(?P<line>\d+),(?P<col>\d+)\]\s+(?P<message>.*)")
+    _frame = re.compile(r"^\s+at\s+(?P<frame>\S+\((?P<file>[\w$]+\.java):(?P<line>\d+)\))")
+
+    def __init__(self):
+        self.failures = []
+        self.compile_errors = []
+        self.counts = None
+        self.build_failure = False
+        self.goal_errors = []
+        self.dropped = 0
+        self._current = None
+
+    def feed(self, line):
+        line = line.rstrip("\n")
+        match = self._failure.match(line)
+        if match:
+            self._current = None
+            if len(self.failures) >= MAX_FAILURES:
+                self.dropped += 1
+                return
+            self._current = {
+                "test_class": match.group("c1") or match.group("c2"),
+                "test_method": match.group("m1") or match.group("m2"),
+                "kind": match.group("kind").lower(),
+                "message": None,
+                "frames": [],
+            }
+            self.failures.append(self._current)
+            return
+        if self._current is not None:
+            frame = self._frame.match(line)
+            if frame:
+                if len(self._current["frames"]) < MAX_FRAMES and not frame.group("frame").startswith(_NOISE_FRAMES):
+                    self._current["frames"].append(frame.group("frame"))
+                return
+            if self._current["message"] is None and line.strip() and not line.startswith("["):
+                self._current["message"] = _clip(line)
+                return
+            if line.startswith("[") or not line.strip():
+                self._current = None
+        match = self._compile.match(line)
+        if match:
+            if len(self.compile_errors) < MAX_FAILURES:
+                self.compile_errors.append({"file": match.group("file"), "line": int(match.group("line")),
+                                            "message": _clip(match.group("message"))})
+            else:
+                self.dropped += 1
+            return
+        match = self._counts.search(line)
+        if match and "Time elapsed" not in line:
+            # Summary lines without a per-class timing are per-module totals
+            counts = dict(zip(("run", "failures", "errors", "skipped"), map(int, match.groups())))
+            if self.counts:
+                counts = {k: v + self.counts[k] for k, v in counts.items()}
+            self.counts = counts
+        if "BUILD FAILURE" in line:
+            self.build_failure = True
+        if line.startswith("[ERROR] Failed to execute goal") and len(self.goal_errors) < 3:
+            self.goal_errors.append(_clip(line[len("[ERROR] "):]))
+
+    def digest(self):
+        return {"counts": self.counts, "failures": self.failures, "compile_errors": self.compile_errors,
+                "build_failure": self.build_failure, "goal_errors": self.goal_errors, "dropped": self.dropped}
+
+
+class SonarLogParser:
+    """Extracts errors, warnings and the quality gate verdict from sonar-scanner output"""
+
+    _gate = re.compile(r"QUALITY GATE STATUS:\s*(\w+)")
+
+    def __init__(self):
+        self.errors = []
+        self.quality_gate = None
+        self.analysis_url = None
+        self.issues = []
+        self.dropped = 0
+
+    def feed(self, line):
+        line = line.rstrip("\n")
+        match = self._gate.search(line)
+        if match:
+            self.quality_gate = match.group(1)
+        if "ANALYSIS SUCCESSFUL" in line and "http" in line:
+            self.analysis_url = line[line.index("http"):].strip()
+        if line.startswith("ERROR") or "] ERROR" in line:
+            if len(self.errors) < MAX_FAILURES:
+                self.errors.append(_clip(line))
+            else:
+                self.dropped += 1
+
+    def add_issue(self, rule, file, line, message, severity=None):
+        if len(self.issues) < MAX_FAILURES:
+            self.issues.append({"rule": rule, "file": file, "line": line,
+                                "severity": severity, "message": _clip(message or "")})
+        else:
+            self.dropped += 1
+
+    def digest(self):
+        return {"quality_gate": self.quality_gate, "errors": self.errors, "issues": self.issues,
+                "analysis_url": self.analysis_url, "dropped": self.dropped}
+
+
+def render_digest(digest, tail=None):
+    """Compact human/LLM-readable text for a digest"""
+    lines = []
+    counts = digest.get("counts")
+    if counts:
+        lines.append(f"Tests run: {counts['run']}, Failures: {counts['failures']}, "
+                     f"Errors: {counts['errors']}, Skipped: {counts['skipped']}")
+    for f in digest.get("failures", []):
+        lines.append(f"{f['kind'].upper()} {f['test_class']}.{f['test_method']}: {f['message'] or ''}")
+        lines.extend(f"    at {frame}" for frame in f["frames"])
+    for e in digest.get("compile_errors", []):
+        lines.append(f"COMPILE {e['file']}:{e['line']}: {e['message']}")
+    lines.extend(digest.get("goal_errors", []))
+    if digest.get("quality_gate"):
+        lines.append(f"Quality gate: {digest['quality_gate']}")
+    for i in digest.get("issues", []):
+        lines.append(f"{i['rule']} {i['file']}:{i['line']}: {i['message']}")
+    lines.extend(digest.get("errors", []))
+    if digest.get("dropped"):
+        lines.append(f"... {digest['dropped']} more entries omitted")
+    if tail and not lines:
+        # Nothing recognised; fall back to the end of the raw output
+        lines.extend(tail)
+    return "\n".join(lines)
+
+
+def _prune_spill_dir(now):
+    try:
+        entries = os.scandir(LOG_SPILL_DIR)
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            try:
+                if entry.name.endswith(".log") and now - entry.stat().st_mtime > LOG_SPILL_TTL:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def kill_process_group(proc):
+    """Kill `proc` and everything it forked (it runs in its own session, see run_streaming())"""
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def run_streaming(cmd, cwd, parser, timeout=None, env=None, prefix="build", kill=kill_process_group, started=None):
+    """
+    Run `cmd` and stream its combined output line by line into `parser`,
+    spilling the raw log to LOG_SPILL_DIR instead of holding it in memory.
+    The command gets its own session, so on timeout `kill` takes down the
+    whole process tree (forked test JVMs included), not just the parent.
+    `started` is called with the Popen once the process exists.
+    Returns the exit code, the spill file and a bounded tail of the output.
+    """
+    os.makedirs(LOG_SPILL_DIR, exist_ok=True)
+    _prune_spill_dir(time.time())
+    log_path = os.path.join(LOG_SPILL_DIR, f"{prefix}-{uuid.uuid4().hex}.log")
+    tail = deque(maxlen=TAIL_LINES)
+    timed_out = threading.Event()
+
+    with open(log_path, "w") as log:
+        proc = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                text=True, errors="replace", bufsize=1, start_new_session=True)
+        if started:
+            started(proc)
+
+        def on_timeout():
+            timed_out.set()
+            kill(proc)
+
+        timer = threading.Timer(timeout, on_timeout) if timeout else None
+        if timer:
+            timer.start()
+        try:
+            for line in proc.stdout:
+                log.write(line)
+                parser.feed(line)
+                tail.append(line.rstrip("\n"))
+            returncode = proc.wait()
+        finally:
+            if timer:
+                timer.cancel()
+            proc.stdout.close()
+
+    if timed_out.is_set():
+        tail.append(f"Timed out after {timeout:g}s")
+        returncode = -1
+    return {"returncode": returncode, "log_path": log_path, "tail": list(tail), "timed_out": timed_out.is_set()}
+
+
+def read_log(log_path, offset=0, limit=65536):
+    """Ranged read of a spilled log; only files under LOG_SPILL_DIR are served"""
+    path = os.path.realpath(log_path)
+    if not path.startswith(os.path.realpath(LOG_SPILL_DIR) + os.sep):
+        raise ValueError(f"Not a spilled log: {log_path}")
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(limit)
+    return {"content": data.decode("utf-8", errors="replace"), "offset": offset,
+            "next_offset": offset + len(data), "size": size, "eof": offset + len(data) >= size}
@@ -0,0 +1,111 @@
+import logging
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from build_executor import get_executor
+from log_digest import MavenLogParser
+
+# auto | mvnd | subprocess; auto picks mvnd when it is on PATH
+MAVEN_BACKEND = os.getenv("MAVEN_BACKEND", "auto")
+# Shared local repository for every build, and whether to resolve offline from it
+MAVEN_LOCAL_REPO = os.getenv("MAVEN_LOCAL_REPO", os.path.expanduser("~/.m2/repository"))
+MAVEN_OFFLINE = os.getenv("MAVEN_OFFLINE", "false").lower() == "true"
+MAVEN_BUILD_TIMEOUT = float(os.getenv("MAVEN_BUILD_TIMEOUT", "1800"))
+# Share of the host build budget (see build_executor) each build is admitted with
+MAVEN_BUILD_CPUS = float(os.getenv("MAVEN_BUILD_CPUS", "2"))
+MAVEN_BUILD_MEMORY_MB = int(os.getenv("MAVEN_BUILD_MEMORY_MB", "2048"))
+# Daemons started up front by MvndBackend.prewarm()
+MAVEN_DAEMON_POOL = int(os.getenv("MAVEN_DAEMON_POOL", "2"))
+
+_PREWARM_POM = """<project xmlns="http://maven.apache.org/POM/4.0.0">
+  <modelVersion>4.0.0</modelVersion>
+  <groupId>swe.agent</groupId>
+  <artifactId>prewarm</artifactId>
+  <version>1</version>
+  <packaging>pom</packaging>
+</project>
+"""
+
+
+class SubprocessBackend:
+    """Cold `mvn` JVM per build; always available, used as the fallback"""
+
+    name = "subprocess"
+    executable = "mvn"
+
+    def __init__(self, local_repo=MAVEN_LOCAL_REPO, offline=MAVEN_OFFLINE, timeout=MAVEN_BUILD_TIMEOUT,
+                 cpus=MAVEN_BUILD_CPUS, memory_mb=MAVEN_BUILD_MEMORY_MB):
+        self.local_repo = local_repo
+        self.offline = offline
+        self.timeout = timeout
+        self.cpus = cpus
+        self.memory_mb = memory_mb
+
+    def command(self, goals, build_dir):
+        cmd = [self.executable, "-B", f"-Dmaven.repo.local={self.local_repo}",
+               f"-Djava.io.tmpdir={build_dir}"]
+        if self.offline:
+            cmd.append("-o")
+        return cmd + list(goals)
+
+    def run(self, goals, cwd, timeout=None):
+        """
+        Run Maven `goals` in `cwd`; every build gets its own temp dir, waits
+        for admission to the host CPU/memory budget, runs confined to its
+        share and is killed (process tree included) after `timeout`. Output
+        is streamed through a MavenLogParser and spilled to disk, so only a
+        bounded digest is kept in memory. `duration` excludes `queue_wait`.
+        """
+        parser = MavenLogParser()
+        with tempfile.TemporaryDirectory(prefix="mvn-build-") as build_dir:
+            result = get_executor().run(self.command(goals, build_dir), cwd, parser, self.cpus, self.memory_mb,
+                                        timeout=timeout or self.timeout, prefix="maven")
+        result.update(digest=parser.digest(), backend=self.name, duration=result["run_time"])
+        return result
+
+
+class MvndBackend(SubprocessBackend):
+    """
+    Builds run on warm mvnd daemons, which keep JVMs, loaded plugins and
+    JIT state between builds. mvnd reuses an idle daemon per build and
+    starts another when all are busy, so concurrent builds stay isolated
+    in their own daemon. Builds are still admitted against the host budget,
+    but the daemons run outside the build's sandbox.
+    """
+
+    name = "mvnd"
+    executable = "mvnd"
+
+    def command(self, goals, build_dir):
+        cmd = super().command(goals, build_dir)
+        return cmd[:1] + ["--raw-streams"] + cmd[1:]
+
+    def run(self, goals, cwd, timeout=None):
+        # Only a missing mvnd falls back; sandbox or build errors are reported as they are
+        if shutil.which(self.executable) is None:
+            logging.warning("mvnd unavailable (not on PATH), falling back to cold mvn subprocess")
+            return SubprocessBackend(self.local_repo, self.offline, self.timeout,
+                                     self.cpus, self.memory_mb).run(goals, cwd, timeout)
+        return super().run(goals, cwd, timeout)
+
+    def prewarm(self, count=MAVEN_DAEMON_POOL):
+        """Start `count` daemons by running that many trivial builds at once"""
+        with tempfile.TemporaryDirectory(prefix="mvnd-prewarm-") as root:
+            dirs = []
+            for i in range(count):
+                path = os.path.join(root, str(i))
+                os.makedirs(path)
+                with open(os.path.join(path, "pom.xml"), "w") as f:
+                    f.write(_PREWARM_POM)
+                dirs.append(path)
+            with ThreadPoolExecutor(max_workers=max(count, 1)) as executor:
+                return list(executor.map(lambda d: self.run(["validate"], d), dirs))
+
+
+def get_backend(kind=MAVEN_BACKEND):
+    if kind in ("auto", "mvnd") and shutil.which("mvnd"):
+        return MvndBackend()
+    if kind == "mvnd":
+        logging.warning("mvnd not found on PATH, falling back to cold mvn subprocesses")
+    return SubprocessBackend()
@@ -0,0 +1,137 @@
+import os
+import subprocess
+import xml.etree.ElementTree as ET
+
+SKIP_DIRS = {".git", "target", "node_modules", ".mvn"}
+TEST_SUFFIXES = ("Test", "Tests", "IT", "TestCase")
+MAIN_SRC = os.path.join("src", "main", "java")
+TEST_SRC = os.path.join("src", "test", "java")
+
+
+def changed_files(repo_path, base_ref="origin/main"):
+    """Files changed against the merge base with `base_ref`, including uncommitted and untracked ones"""
+    def git(*args):
+        result = subprocess.run(["git", *args], cwd=repo_path, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip())
+        return [line for line in result.stdout.splitlines() if line]
+
+    merge_base = git("merge-base", "HEAD", base_ref)[0]
+    return sorted(set(git("diff", "--name-only", merge_base)) | set(git("ls-files", "--others", "--exclude-standard")))
+
+
+def find_modules(repo_path):
+    """Relative directories of every Maven module (those holding a pom.xml)"""
+    modules = []
+    for root, dirs, files in os.walk(repo_path):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        if "pom.xml" in files:
+            modules.append(os.path.relpath(root, repo_path))
+    return modules
+
+
+def _pom_artifacts(repo_path, module):
+    """(artifactId, artifactIds the module depends on or inherits from) from its pom.xml"""
+    try:
+        root = ET.parse(os.path.join(repo_path, module, "pom.xml")).getroot()
+    except (OSError, ET.ParseError):
+        return None, set()
+    ns = root.tag[:root.tag.index("}") + 1] if root.tag.startswith("{") else ""
+    refs = {e.text.strip() for e in root.findall(f"{ns}dependencies/{ns}dependency/{ns}artifactId") if e.text}
+    parent = root.find(f"{ns}parent/{ns}artifactId")
+    if parent is not None and parent.text:
+        refs.add(parent.text.strip())
+    own = root.find(f"{ns}artifactId")
+    return (own.text.strip() if own is not None and own.text else None), refs
+
+
+def _has_dependents(repo_path, modules, affected):
+    """Whether another module depends on (or inherits from) any module in `affected`"""
+    poms = {m: _pom_artifacts(repo_path, m) for m in modules}
+    ids = {poms[m][0] for m in affected if poms[m][0]}
+    return any(refs & ids for m, (_, refs) in poms.items() if m not in affected)
+
+
+def _owning_module(path, modules):
+    candidates = [m for m in modules if m == "." or path == m or path.startswith(m + os.sep)]
+    return max(candidates, key=lambda m: 0 if m == "." else len(m), default=None)
+
+
+def _test_classes(repo_path, module):
+    test_root = os.path.join(repo_path, module, TEST_SRC)
+    names = set()
+    for root, _, files in os.walk(test_root):
+        names.update(f[:-5] for f in files if f.endswith(".java"))
+    return names
+
+
+def plan_tests(repo_path, base_ref="origin/main"):
+    """
+    Map the change set to the narrowest safe Maven invocation:
+
+    - "tests":   only main/test Java sources changed, every changed main
+                 class has a matching test class and no other module depends
+                 on the changed ones -> -pl <modules> -am -Dtest=...
+    - "modules": sources changed that can't be mapped to tests (resources,
+                 a module pom, classes without tests) or that other modules
+                 build on, whose tests exercise them too
+                 -> -pl <modules> -am -amd
+    - "full":    anything uncertain (root pom, files outside a module's
+                 sources, no detectable change, git errors) -> whole suite
+    """
+    full = {"strategy": "full", "modules": [], "tests": [], "changed_files": []}
+    try:
+        files = changed_files(repo_path, base_ref)
+    except (RuntimeError, IndexError):
+        return full
+    full["changed_files"] = files
+
+    modules = find_modules(repo_path)
+    affected, tests, mappable = set(), set(), True
+    for path in files:
+        module = _owning_module(path, modules)
+        if module is None or path == "pom.xml" or path.startswith(".mvn" + os.sep):
+            return full
+        inner = path if module == "." else os.path.relpath(path, module)
+        if inner == "pom.xml":
+            affected.add(module)
+            mappable = False
+            continue
+        if not inner.startswith("src" + os.sep):
+            # Not part of the module's build inputs; we can't tell what it affects
+            return full
+        affected.add(module)
+        name = os.path.basename(inner)[:-5] if inner.endswith(".java") else None
+        if name and inner.startswith(TEST_SRC + os.sep):
+            tests.add(name)
+        elif name and inner.startswith(MAIN_SRC + os.sep):
+            matches = {name + s for s in TEST_SUFFIXES} | {"Test" + name}
+            found = matches & _test_classes(repo_path, module)
+            if not found:
+                mappable = False
+            tests.update(found)
+        else:
+            mappable = False
+
+    if not affected:
+        return full
+    leaf = modules == ["."] or not _has_dependents(repo_path, modules, affected)
+    strategy = "tests" if mappable and tests and leaf else "modules"
+    return {"strategy": strategy, "modules": sorted(affected),
+            "tests": sorted(tests) if strategy == "tests" else [], "changed_files": files}
+
+
+def maven_args(plan):
+    """Extra `mvn test` arguments for a plan from plan_tests()"""
+    if plan["strategy"] == "full":
+        return []
+    args = []
+    if plan["modules"] != ["."]:
+        # -am builds the sibling modules they depend on, which may not be installed in the local repository
+        args += ["-pl", ",".join(plan["modules"]), "-am"]
+        if plan["strategy"] == "modules":
+            args.append("-amd")
+    if plan["strategy"] == "tests":
+        # With several modules (and those built by -am), some hold none of the selected tests
+        args += [f"-Dtest={','.join(plan['tests'])}", "-Dsurefire.failIfNoSpecifiedTests=false"]
+    return args
@@ -1,39 +1,81 @@
 from mcp.server import Server
 from mcp import stdio_server
-import subprocess
+from tool_dispatch import register_tools
+from maven_incremental import plan_tests, maven_args
+from maven_backends import get_backend
+from build_executor import get_executor
+from log_digest import render_digest, read_log
+from result_cache import memoized
 import asyncio
+import os
 
 server = Server("maven")
+backend = get_backend()
 
-@server.call_tool()
-def run_tests(repo_path: str):
-    result = subprocess.run(
-        ["mvn", "-B", "test"],
-        cwd=repo_path,
-        capture_output=True,
-        text=True
-    )
-    return {
-        "success": result.returncode == 0,
-        "stdout": result.stdout,
-        "stderr": result.stderr
-    }
+def run_tests(repo_path: str, incremental: bool = False, base_ref: str = "origin/main"):
+    """
+    Run the Maven test suite. With incremental=True only the modules and test
+    classes affected by changes against base_ref are run, falling back to
+    the full suite when the mapping is uncertain; "strategy" reports which.
+    A tree that was already tested with the same arguments and build
+    configuration returns the stored result, failures included
+    ("cached": true), without running Maven (see result_cache).
+    """
+    plan = plan_tests(repo_path, base_ref) if incremental else {"strategy": "full", "modules": [], "tests": []}
+    goals = ["test", *maven_args(plan)]
+
+    def test():
+        result = backend.run(goals, cwd=repo_path)
+        digest = result["digest"]
+        return {
+            "success": result["returncode"] == 0,
+            "digest": result["digest"],
+            "summary": render_digest(result["digest"], result["tail"]),
+            "log_path": result["log_path"],
+            "backend": result["backend"],
+            "duration": result["duration"],
+            "queue_wait": result["queue_wait"],
+            "strategy": plan["strategy"],
+            "modules": plan["modules"],
+            "tests": plan["tests"],
+            "timed_out": result["timed_out"],
+            "cancelled": result["cancelled"],
+            # Only a run that got as far as compiling or testing says something about the tree;
+            # dependency resolution errors, a killed JVM or a down network don't
+            "cacheable": result["returncode"] == 0 or bool(digest["counts"] or digest["compile_errors"])
+        }
+
+    # The pom files are part of the tree; this is the configuration outside it
+    config = {"goals": goals, "offline": backend.offline, "local_repo": backend.local_repo,
+              "java_home": os.getenv("JAVA_HOME"), "maven_opts": os.getenv("MAVEN_OPTS")}
+    return memoized("maven.run_tests", repo_path, config, test)
 
-@server.call_tool()
 def build_project(repo_path: str):
-    result = subprocess.run(
-        ["mvn", "-B", "clean", "install"],
-        cwd=repo_path,
-        capture_output=True,
-        text=True
-    )
+    result = backend.run(["clean", "install"], cwd=repo_path)
     return {
-        "success": result.returncode == 0,
-        "stdout": result.stdout,
-        "stderr": result.stderr
+        "success": result["returncode"] == 0,
+        "digest": result["digest"],
+        "summary": render_digest(result["digest"], result["tail"]),
+        "log_path": result["log_path"],
+        "backend": result["backend"],
+        "duration": result["duration"],
+        "queue_wait": result["queue_wait"]
     }
 
+def cancel(repo_path: str):
+    """Stop the builds running in repo_path; their results are not memoized"""
+    return {"cancelled": get_executor().cancel(repo_path)}
+
+def fetch_log(log_path: str, offset: int = 0, limit: int = 65536):
+    """Ranged read of a raw build log spilled by run_tests/build_project"""
+    return read_log(log_path, offset, limit)
+
+register_tools(server, run_tests, build_project, cancel, fetch_log)
+
 async def main():
+    if hasattr(backend, "prewarm"):
+        # Start daemons in the background so the first builds find warm JVMs
+        asyncio.get_running_loop().run_in_executor(None, backend.prewarm)
     async with stdio_server() as streams:
         await server.run(*streams, server.create_initialization_options())
 
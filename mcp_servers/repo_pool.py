@@ -0,0 +1,141 @@
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+
+REPO_POOL_DIR = os.getenv("REPO_POOL_DIR", "/tmp/swe-agent-repos")
+# Seconds before a mirror is fetched again when a new worktree is requested
+REPO_POOL_FETCH_INTERVAL = float(os.getenv("REPO_POOL_FETCH_INTERVAL", "30"))
+
+
+def _git(*args, cwd=None):
+    result = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)} failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+class RepoPool:
+    """
+    One bare mirror per remote, fetched incrementally, with a git worktree
+    per issue. Creating a worktree only needs local objects, so per-issue
+    setup no longer transfers the repository; releasing it removes the
+    working directory and its branch from the mirror.
+    """
+
+    def __init__(self, root=REPO_POOL_DIR, fetch_interval=REPO_POOL_FETCH_INTERVAL):
+        self.root = root
+        self.fetch_interval = fetch_interval
+        self._locks = {}
+        self._fetched = {}
+        self._worktrees = {}
+        self._lock = threading.Lock()
+
+    def mirror_path(self, url):
+        name = re.sub(r"[^A-Za-z0-9._-]+", "_", url.rstrip("/").removesuffix(".git"))
+        return os.path.join(self.root, "mirrors", f"{name}.git")
+
+    def _mirror_lock(self, mirror):
+        with self._lock:
+            return self._locks.setdefault(mirror, threading.Lock())
+
+    def _sync_mirror(self, url, mirror):
+        if not os.path.isdir(mirror):
+            os.makedirs(os.path.dirname(mirror), exist_ok=True)
+            _git("clone", "--bare", url, mirror)
+            # Track the remote under refs/remotes so issue branches in the mirror are never pruned
+            _git("config", "remote.origin.fetch", "+refs/heads/*:refs/remotes/origin/*", cwd=mirror)
+            self._fetched[mirror] = 0
+        if time.monotonic() - self._fetched.get(mirror, 0) >= self.fetch_interval:
+            _git("fetch", "--prune", "origin", cwd=mirror)
+            self._fetched[mirror] = time.monotonic()
+
+    def head(self, url, base="main"):
+        """Mirror path and commit of origin/<base>, fetching the mirror first if it is due"""
+        mirror = self.mirror_path(url)
+        with self._mirror_lock(mirror):
+            self._sync_mirror(url, mirror)
+            commit = _git("rev-parse", f"origin/{base}", cwd=mirror).strip()
+        return mirror, commit
+
+    def checkout(self, url, branch_name, target_dir, base="main"):
+        """Create a worktree at `target_dir` on a new branch started from origin/<base>"""
+        mirror = self.mirror_path(url)
+        with self._mirror_lock(mirror):
+            self._sync_mirror(url, mirror)
+            _git("worktree", "prune", cwd=mirror)
+            os.makedirs(os.path.dirname(os.path.abspath(target_dir)), exist_ok=True)
+            _git("worktree", "add", "-B", branch_name, target_dir, f"origin/{base}", cwd=mirror)
+        with self._lock:
+            self._worktrees[os.path.abspath(target_dir)] = (mirror, branch_name)
+        return {"mirror": mirror, "branch_name": branch_name, "target_dir": target_dir}
+
+    def fork(self, source_dir, target_dir):
+        """
+        Create a worktree at `target_dir` with the same contents as the
+        worktree at `source_dir`: its HEAD checked out detached, then its
+        uncommitted and untracked changes copied over. Release it like any
+        other worktree.
+        """
+        with self._lock:
+            entry = self._worktrees.get(os.path.abspath(source_dir))
+        entry = entry or self._locate(source_dir)
+        if entry is None:
+            raise RuntimeError(f"{source_dir} is not a pooled worktree")
+        mirror = entry[0]
+        head = _git("rev-parse", "HEAD", cwd=source_dir).strip()
+        with self._mirror_lock(mirror):
+            _git("worktree", "add", "--detach", target_dir, head, cwd=mirror)
+        with self._lock:
+            self._worktrees[os.path.abspath(target_dir)] = (mirror, None)
+
+        # Porcelain -z: "XY path\0", renames and copies followed by their source path
+        entries = iter(_git("status", "--porcelain", "-z", "--untracked-files=all", cwd=source_dir).split("\0"))
+        for entry in entries:
+            if not entry:
+                continue
+            status, path = entry[:2], entry[3:]
+            if "R" in status or "C" in status:
+                origin = next(entries)
+                if "R" in status and os.path.lexists(os.path.join(target_dir, origin)):
+                    os.remove(os.path.join(target_dir, origin))
+            src, dst = os.path.join(source_dir, path), os.path.join(target_dir, path)
+            if os.path.lexists(src):
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                shutil.copy2(src, dst, follow_symlinks=False)
+            elif os.path.lexists(dst):
+                os.remove(dst)
+        return {"mirror": mirror, "target_dir": target_dir}
+
+    def release(self, target_dir):
+        """Remove an issue's worktree and its local branch; safe to call twice"""
+        with self._lock:
+            entry = self._worktrees.pop(os.path.abspath(target_dir), None)
+        if entry is None:
+            entry = self._locate(target_dir)
+        if entry is None:
+            return False
+        mirror, branch_name = entry
+        with self._mirror_lock(mirror):
+            if os.path.isdir(target_dir):
+                _git("worktree", "remove", "--force", target_dir, cwd=mirror)
+            _git("worktree", "prune", cwd=mirror)
+            if branch_name:
+                subprocess.run(["git", "branch", "-D", branch_name], cwd=mirror, capture_output=True)
+        return True
+
+    def _locate(self, target_dir):
+        # Worktrees created by an earlier process: ask git which mirror owns them
+        if not os.path.isdir(target_dir):
+            return None
+        try:
+            common = _git("rev-parse", "--git-common-dir", cwd=target_dir).strip()
+            branch = _git("rev-parse", "--abbrev-ref", "HEAD", cwd=target_dir).strip()
+        except RuntimeError:
+            return None
+        mirror = os.path.abspath(os.path.join(target_dir, common))
+        if not mirror.startswith(os.path.abspath(self.root) + os.sep):
+            return None
+        return mirror, None if branch == "HEAD" else branch
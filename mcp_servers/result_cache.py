@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", "/tmp/swe-agent-results.sqlite")
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", str(7 * 24 * 3600)))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Build outputs, scanner state and VCS metadata are not inputs of a build
+SKIP_DIRS = {".git", "target", "node_modules", ".scannerwork", ".idea"}
+# Files modified this recently may change again within the same mtime tick,
+# so their hash is computed but not remembered (git's "racy clean" problem)
+RACY_WINDOW = 2.0
+
+
+def _file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    Tool results keyed on a content hash of the source tree plus the build
+    configuration, in a SQLite file shared by the MCP servers. Tree hashes
+    are incremental: per-file digests are remembered by (mtime, size, inode)
+    so only files that changed since the last hash are read again. Stored
+    results expire after `ttl` seconds and at most `max_bytes` are kept,
+    least recently used evicted first.
+    """
+
+    def __init__(self, path=RESULT_CACHE_PATH, ttl=RESULT_CACHE_TTL, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "files_hashed": 0}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY, tool TEXT NOT NULL, result TEXT NOT NULL, size INTEGER NOT NULL,
+                created REAL NOT NULL, accessed REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+            CREATE TABLE IF NOT EXISTS file_hashes (
+                root TEXT NOT NULL, path TEXT NOT NULL, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL,
+                inode INTEGER NOT NULL, digest TEXT NOT NULL, PRIMARY KEY (root, path));
+            CREATE TABLE IF NOT EXISTS roots (root TEXT PRIMARY KEY, used_at REAL NOT NULL);
+        """)
+        self._db.commit()
+
+    def tree_hash(self, root):
+        """Content hash of every file under `root` outside SKIP_DIRS (paths, contents and exec bits)"""
+        root = os.path.realpath(root)
+        with self._lock:
+            known = {path: (mtime_ns, size, inode, digest) for path, mtime_ns, size, inode, digest in
+                     self._db.execute("SELECT path, mtime_ns, size, inode, digest FROM file_hashes WHERE root = ?",
+                                      (root,))}
+        now = time.time()
+        entries, fresh, seen = [], [], set()
+        for dirpath, dirs, files in os.walk(root):
+            dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+            for name in files:
+                full = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue
+                rel = os.path.relpath(full, root)
+                seen.add(rel)
+                stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+                cached = known.get(rel)
+                if cached and cached[:3] == stamp:
+                    digest = cached[3]
+                else:
+                    try:
+                        digest = _file_digest(full)
+                    except OSError:
+                        continue
+                    self.stats["files_hashed"] += 1
+                    if now - st.st_mtime > RACY_WINDOW:
+                        fresh.append((root, rel, *stamp, digest))
+                entries.append(f"{rel}\0{digest}\0{'x' if st.st_mode & 0o111 else '-'}")
+        entries.sort()
+
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?, ?, ?)", fresh)
+            self._db.executemany("DELETE FROM file_hashes WHERE root = ? AND path = ?",
+                                 [(root, path) for path in known.keys() - seen])
+            self._db.execute("INSERT OR REPLACE INTO roots VALUES (?, ?)", (root, now))
+            # Hashes of worktrees that are gone (released issues) are dropped once they expire
+            for (stale,) in self._db.execute("SELECT root FROM roots WHERE used_at <= ?", (now - self.ttl,)).fetchall():
+                self._db.execute("DELETE FROM file_hashes WHERE root = ?", (stale,))
+                self._db.execute("DELETE FROM roots WHERE root = ?", (stale,))
+            self._db.commit()
+        return hashlib.sha256("\n".join(entries).encode()).hexdigest()
+
+    @staticmethod
+    def key(tool, tree, **config):
+        """Key for running `tool` on `tree` with `config` (arguments, environment, scope)"""
+        return hashlib.sha256(json.dumps([tool, tree, config], sort_keys=True, default=str).encode()).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT result FROM results WHERE key = ? AND created > ?",
+                                   (key, now - self.ttl)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self._db.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.stats["hits"] += 1
+        return json.loads(row[0])
+
+    def put(self, key, tool, result):
+        data = json.dumps(result)
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                             (key, tool, data, len(data), now, now))
+            self._evict(now)
+            self._db.commit()
+            self.stats["stores"] += 1
+
+    def _evict(self, now):
+        expired = self._db.execute("DELETE FROM results WHERE created <= ?", (now - self.ttl,)).rowcount
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        evicted = 0
+        if total > self.max_bytes:
+            for key, size in self._db.execute("SELECT key, size FROM results ORDER BY accessed").fetchall():
+                if total <= self.max_bytes:
+                    break
+                self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+                total -= size
+                evicted += 1
+        self.stats["evictions"] += expired + evicted
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Process-wide cache, created on first use; None when RESULT_CACHE_ENABLED=false"""
+    global _cache
+    if not RESULT_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
+
+
+def memoized(tool, repo_path, config, run):
+    """
+    Return the stored result of `tool` for this tree and `config`, or call
+    `run()` and store what it returns. Results marked "timed_out",
+    "cancelled" or "cacheable": false (the run did not complete, e.g. an
+    unreachable repository or Sonar server) are not stored; they say nothing
+    about the tree. Hits carry "cached": true and report no run or queue time.
+    """
+    cache = get_result_cache()
+    key = cache.key(tool, cache.tree_hash(repo_path), **config) if cache else None
+    stored = cache.get(key) if key else None
+    if stored is not None:
+        return {**stored, "cached": True, "duration": 0.0, "queue_wait": 0.0}
+    result = run()
+    if key and not (result.get("timed_out") or result.get("cancelled")) and result.get("cacheable", True):
+        cache.put(key, tool, result)
+    return {**result, "cached": False}
@@ -0,0 +1,68 @@
+import os
+import subprocess
+from maven_incremental import changed_files
+
+# Scanner home shared by every scan: plugin and JRE downloads are cached here
+# across rounds and issues instead of per worktree
+SONAR_USER_HOME = os.getenv("SONAR_USER_HOME", "/tmp/swe-agent-sonar")
+# inclusions: analyse only the changed files; pullrequest: Sonar PR analysis
+# (needs SonarCloud or Developer Edition), which also reuses the server-side
+# analysis cache of the base branch
+SONAR_INCREMENTAL_MODE = os.getenv("SONAR_INCREMENTAL_MODE", "inclusions")
+# Change sets larger than this are scanned in full
+SONAR_INCREMENTAL_MAX_FILES = int(os.getenv("SONAR_INCREMENTAL_MAX_FILES", "200"))
+# Changing any of these can change what every file's analysis reports
+_GLOBAL_INPUTS = ("sonar-project.properties", "pom.xml", ".mvn")
+
+
+def _git(repo_path, *args):
+    result = subprocess.run(["git", *args], cwd=repo_path, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip())
+    return result.stdout.strip()
+
+
+def scan_plan(repo_path, base_ref="origin/main", mode=SONAR_INCREMENTAL_MODE, branch=None):
+    """
+    Scanner properties for an incremental scan against `base_ref`:
+
+    - "pullrequest": PR analysis of `branch` (default: HEAD's branch) against
+                     base_ref; a detached HEAD with no `branch` (e.g. a fix
+                     candidate's fork) is scanned with inclusions instead
+    - "inclusions":  sonar.inclusions restricted to the changed files
+    - "full":        no restriction, when the change set is unknown, empty,
+                     too large, or touches build/scanner configuration
+    """
+    full = {"strategy": "full", "properties": {}, "files": []}
+    try:
+        files = changed_files(repo_path, base_ref)
+    except (RuntimeError, IndexError):
+        return full
+    if not files or len(files) > SONAR_INCREMENTAL_MAX_FILES:
+        return full
+    if any(os.path.basename(f) in _GLOBAL_INPUTS or f.startswith(".mvn/") for f in files):
+        return full
+
+    if mode == "pullrequest" and not branch:
+        try:
+            branch = _git(repo_path, "rev-parse", "--abbrev-ref", "HEAD")
+        except RuntimeError:
+            return full
+        if branch == "HEAD":
+            branch = None
+    if mode == "pullrequest" and branch:
+        return {"strategy": "pullrequest", "files": files, "properties": {
+            "sonar.pullrequest.key": branch, "sonar.pullrequest.branch": branch,
+            "sonar.pullrequest.base": base_ref.split("/", 1)[-1],
+        }}
+    # Deleted files can't be analysed; keep only what is on disk
+    present = [f for f in files if os.path.isfile(os.path.join(repo_path, f))]
+    if not present:
+        return full
+    return {"strategy": "inclusions", "files": present, "properties": {"sonar.inclusions": ",".join(present)}}
+
+
+def scanner_args(plan):
+    """sonar-scanner -D arguments for `plan`, plus the persistent scanner home"""
+    properties = {"sonar.userHome": SONAR_USER_HOME, "sonar.analysisCache.enabled": "true", **plan["properties"]}
+    return [f"-D{key}={value}" for key, value in properties.items()]
@@ -1,34 +1,137 @@
 from mcp.server import Server
 from mcp import stdio_server
-import subprocess
+from tool_dispatch import register_tools
+from log_digest import SonarLogParser, MAX_FAILURES, render_digest, read_log
+from build_executor import get_executor
+from sonar_incremental import scan_plan, scanner_args
+from result_cache import memoized
+import os
+import logging
+import threading
+import time
+import requests
 import asyncio
 
 server = Server("sonar")
+# Share of the host build budget (see build_executor) and wall-clock limit per scan
+SONAR_SCAN_CPUS = float(os.getenv("SONAR_SCAN_CPUS", "1"))
+SONAR_SCAN_MEMORY_MB = int(os.getenv("SONAR_SCAN_MEMORY_MB", "1024"))
+SONAR_SCAN_TIMEOUT = float(os.getenv("SONAR_SCAN_TIMEOUT", "900"))
 
-@server.call_tool()
-def scan_project(repo_path: str):
+_pr_locks = {}
+_pr_locks_lock = threading.Lock()
+
+
+def _pr_lock(key):
+    with _pr_locks_lock:
+        return _pr_locks.setdefault(key, threading.Lock())
+
+
+def _report_task(repo_path, since=0.0):
+    """The scanner's report-task.txt, if it was written at or after `since`"""
+    path = os.path.join(repo_path, ".scannerwork", "report-task.txt")
+    if not os.path.exists(path) or os.path.getmtime(path) < since:
+        return {}
+    with open(path) as f:
+        return dict(line.strip().split("=", 1) for line in f if "=" in line)
+
+
+def _collect_issues(repo_path, parser, plan, since=0.0):
     """
-    Run SonarQube analysis using local Sonar Scanner CLI.
-    Assumes sonar-project.properties exists in repo_path
+    Pull rule/file/line for open issues of the analysed project from the
+    Sonar API; incremental scans only report issues in the files they covered.
+    Returns whether the scan wrote its report task and the issues were fetched.
     """
+    task = _report_task(repo_path, since)
+    host = task.get("serverUrl") or os.getenv("SONAR_HOST_URL")
+    if not host or not task.get("projectKey"):
+        return False
+    params = {"componentKeys": task["projectKey"], "resolved": "false", "ps": MAX_FAILURES}
+    if plan["strategy"] == "pullrequest":
+        params["pullRequest"] = plan["properties"]["sonar.pullrequest.key"]
+    elif plan["strategy"] == "inclusions":
+        params["components"] = ",".join(f"{task['projectKey']}:{f}" for f in plan["files"])
     try:
-        result = subprocess.run(
-            ["sonar-scanner"],
-            cwd=repo_path,
-            capture_output=True,
-            text=True,
-            check=True
+        res = requests.get(
+            f"{host}/api/issues/search",
+            params=params,
+            auth=(os.getenv("SONAR_TOKEN", ""), ""),
+            timeout=30,
         )
-        success = True
-        logs = result.stdout
-    except subprocess.CalledProcessError as e:
-        success = False
-        logs = e.stdout + "\n" + e.stderr
-
-    return {
-        "pass": success,
-        "logs": logs
-    }
+        res.raise_for_status()
+    except requests.RequestException as e:
+        logging.warning(f"Could not fetch Sonar issues: {e}")
+        return False
+    for issue in res.json().get("issues", []):
+        component = issue.get("component", "")
+        parser.add_issue(issue.get("rule"), component.split(":", 1)[-1], issue.get("line"),
+                         issue.get("message"), issue.get("severity"))
+    return True
+
+
+def scan_project(repo_path: str, incremental: bool = False, base_ref: str = "origin/main", branch_name: str = None):
+    """
+    Run SonarQube analysis using local Sonar Scanner CLI.
+    Assumes sonar-project.properties exists in repo_path.
+    With incremental=True only the files changed against base_ref are
+    analysed (see sonar_incremental.scan_plan); "strategy" reports the scope.
+    branch_name is the issue's branch, used as the pull request key in
+    pullrequest mode (fix candidates are forked with a detached HEAD); scans
+    under one key run one at a time, so they don't overwrite each other's
+    results on the server.
+    A tree that was already scanned with the same scope returns the stored
+    result ("cached": true) without running the scanner (see result_cache).
+    Output is streamed through a parser; only a bounded digest is returned
+    and the raw log can be read with fetch_log. Scans share the host build
+    budget with Maven; `queue_wait` is the time spent waiting for admission.
+    """
+    plan = (scan_plan(repo_path, base_ref, branch=branch_name) if incremental
+            else {"strategy": "full", "properties": {}, "files": []})
+
+    def scan():
+        if plan["strategy"] == "pullrequest":
+            with _pr_lock(plan["properties"]["sonar.pullrequest.key"]):
+                return _scan()
+        return _scan()
+
+    def _scan():
+        parser = SonarLogParser()
+        # Whole seconds, in case the filesystem's mtimes are coarser
+        start = int(time.time())
+        result = get_executor().run(["sonar-scanner", *scanner_args(plan)], repo_path, parser, SONAR_SCAN_CPUS,
+                                    SONAR_SCAN_MEMORY_MB, timeout=SONAR_SCAN_TIMEOUT, prefix="sonar")
+        complete = _collect_issues(repo_path, parser, plan, since=start)
+        digest = parser.digest()
+        return {
+            "pass": result["returncode"] == 0,
+            "digest": digest,
+            "logs": render_digest(digest, result["tail"]),
+            "log_path": result["log_path"],
+            "strategy": plan["strategy"],
+            "files": plan["files"],
+            "duration": result["run_time"],
+            "queue_wait": result["queue_wait"],
+            "timed_out": result["timed_out"],
+            "cancelled": result["cancelled"],
+            # A scanner that never reached the server (or a failed issues fetch) says nothing about the tree
+            "cacheable": complete
+        }
+
+    config = {"args": scanner_args(plan), "host": os.getenv("SONAR_HOST_URL")}
+    return memoized("sonar.scan_project", repo_path, config, scan)
+
+
+def cancel(repo_path: str):
+    """Stop the scans running in repo_path; their results are not memoized"""
+    return {"cancelled": get_executor().cancel(repo_path)}
+
+
+def fetch_log(log_path: str, offset: int = 0, limit: int = 65536):
+    """Ranged read of a raw scanner log spilled by scan_project"""
+    return read_log(log_path, offset, limit)
+
+
+register_tools(server, scan_project, cancel, fetch_log)
 
 
 async def main():
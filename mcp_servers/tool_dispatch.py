@@ -0,0 +1,45 @@
+import inspect
+import json
+import anyio
+from mcp import types
+
+_JSON_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean", list: "array", dict: "object"}
+
+
+def _input_schema(fn):
+    properties, required = {}, []
+    for name, param in inspect.signature(fn).parameters.items():
+        annotation = param.annotation
+        if annotation is inspect.Parameter.empty and param.default is not inspect.Parameter.empty:
+            annotation = type(param.default)
+        properties[name] = {"type": _JSON_TYPES[annotation]} if annotation in _JSON_TYPES else {}
+        if param.default is inspect.Parameter.empty:
+            required.append(name)
+    return {"type": "object", "properties": properties, "required": required}
+
+
+def register_tools(server, *tools):
+    """
+    Expose plain functions as MCP tools on a low-level Server. The Server
+    keeps a single call_tool handler, so this installs one that dispatches
+    by name. Blocking tools run in worker threads, which lets one client
+    session multiplex concurrent calls. Results are returned as JSON text.
+    """
+    by_name = {fn.__name__: fn for fn in tools}
+
+    @server.list_tools()
+    async def list_tools():
+        return [
+            types.Tool(name=name, description=inspect.getdoc(fn) or name, inputSchema=_input_schema(fn))
+            for name, fn in by_name.items()
+        ]
+
+    @server.call_tool()
+    async def call_tool(name, arguments):
+        fn = by_name.get(name)
+        if fn is None:
+            raise ValueError(f"Unknown tool: {name}")
+        result = await anyio.to_thread.run_sync(lambda: fn(**(arguments or {})))
+        return [types.TextContent(type="text", text=json.dumps(result))]
+
+    return server
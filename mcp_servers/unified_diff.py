@@ -0,0 +1,117 @@
+import re
+
+# How far (in lines) a hunk may have drifted from the position its header names
+MAX_OFFSET = 200
+
+_HUNK = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+_NO_EOL = "\\ No newline at end of file"
+
+
+class PatchError(Exception):
+    """A patch that doesn't apply; `errors` lists every failing hunk"""
+
+    def __init__(self, errors):
+        super().__init__("; ".join(f"{e['file']} hunk {e['hunk']}: {e['reason']}" if e.get("hunk") else
+                                   f"{e['file']}: {e['reason']}" for e in errors))
+        self.errors = errors
+
+
+def _path(header):
+    path = header.split("\t", 1)[0].strip()
+    if path == "/dev/null":
+        return None
+    return path[2:] if path[:2] in ("a/", "b/") else path
+
+
+def parse(patch):
+    """
+    Files of a unified diff as {"old", "new", "hunks"} dicts; "old"/"new"
+    are None for created/deleted files. Text outside file sections (git
+    headers, prose, code fences) is ignored. Hunk bodies end at the next
+    header rather than at the header's line counts, and a bare empty line
+    is read as empty context, so hand-written and model-written diffs parse.
+    """
+    files, current, hunk = [], None, None
+    lines = patch.splitlines()
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            current = {"old": _path(line[4:]), "new": _path(lines[i + 1][4:]), "hunks": []}
+            files.append(current)
+            hunk = None
+            i += 2
+            continue
+        match = _HUNK.match(line)
+        if match and current is not None:
+            hunk = {"old_start": int(match.group(1)), "new_start": int(match.group(3)), "lines": [],
+                    "old_eol": True, "new_eol": True}
+            current["hunks"].append(hunk)
+        elif hunk is not None and line[:1] in (" ", "+", "-", ""):
+            hunk["lines"].append((line[:1] or " ", line[1:]))
+        elif hunk is not None and line.startswith(_NO_EOL) and hunk["lines"]:
+            op = hunk["lines"][-1][0]
+            if op in (" ", "-"):
+                hunk["old_eol"] = False
+            if op in (" ", "+"):
+                hunk["new_eol"] = False
+        else:
+            hunk = None
+        i += 1
+    for f in files:
+        for h in f["hunks"]:
+            # Trailing blank "context" is usually the blank line after the diff
+            while h["lines"] and h["lines"][-1] == (" ", ""):
+                h["lines"].pop()
+    return [f for f in files if f["hunks"] or f["new"] is None]
+
+
+def _find(lines, old, expected, floor):
+    """Index where `old` matches `lines` nearest to `expected` (not before `floor`), or None"""
+    def matches(at):
+        return all(lines[at + k].rstrip("\r\n").rstrip() == text.rstrip() for k, text in enumerate(old))
+
+    last = len(lines) - len(old)
+    for delta in range(MAX_OFFSET + 1):
+        for at in ((expected,) if delta == 0 else (expected - delta, expected + delta)):
+            if floor <= at <= last and matches(at):
+                return at
+    return None
+
+
+def apply(text, file_patch, name):
+    """
+    New content of `text` with the hunks of `file_patch` applied (None when
+    the patch deletes the file). Hunks may have drifted by up to MAX_OFFSET
+    lines and trailing whitespace is ignored when matching context. Raises
+    PatchError listing every hunk that doesn't apply.
+    """
+    lines = (text or "").splitlines(keepends=True)
+    eol = "\r\n" if lines and lines[0].endswith("\r\n") else "\n"
+    out, errors = [], []
+    pos = offset = 0
+    for number, hunk in enumerate(file_patch["hunks"], 1):
+        old = [t for op, t in hunk["lines"] if op in (" ", "-")]
+        new = [t for op, t in hunk["lines"] if op in (" ", "+")]
+        # A pure insertion's old_start names the line after which it goes
+        expected = hunk["old_start"] - (1 if old else 0) + offset
+        at = _find(lines, old, max(expected, 0), pos)
+        if at is None:
+            errors.append({"file": name, "hunk": number, "line": hunk["old_start"],
+                           "reason": "context does not match" if old else "position is past the end of the file",
+                           "expected": old[:3]})
+            continue
+        out.extend(lines[pos:at])
+        out.extend(t + eol for t in new)
+        if new and not hunk["new_eol"] and at + len(old) >= len(lines):
+            out[-1] = out[-1][:-len(eol)]
+        offset = at - (hunk["old_start"] - (1 if old else 0))
+        pos = at + len(old)
+    if errors:
+        raise PatchError(errors)
+    out.extend(lines[pos:])
+    if file_patch["new"] is None:
+        if "".join(out).strip():
+            raise PatchError([{"file": name, "reason": "deleted file still has content after the patch"}])
+        return None
+    return "".join(out)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Auto-fix benchmark: sequential rounds vs. speculative parallel candidates
+Runs the real auto_fix agent against stubbed model, build, scan and git
+sessions with fixed latencies. Each generated fix passes with probability
+--pass-rate, and the n-th attempt for an issue passes or fails the same
+way in both modes. Reports time-to-green, time to a verdict (green or
+out of rounds/budget) and test+scan runs per issue. With --maven-slots
+below issues x candidates, candidates queue for builds and speculation
+stops paying off.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+os.environ.setdefault("STATE_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="auto-fix-bench-"), "state.sqlite"))
+
+import orchestrator.agents.auto_fix  # noqa: F401  (the package re-exports the function under the same name)
+import orchestrator.agents.reviewer  # noqa: F401
+from orchestrator.scheduler import configure_limits
+
+auto_fix_module = sys.modules["orchestrator.agents.auto_fix"]
+reviewer_module = sys.modules["orchestrator.agents.reviewer"]
+
+
+class Stubs:
+    """Model, Maven, Sonar, filesystem and git sessions with fixed latencies"""
+
+    def __init__(self, args):
+        self.args = args
+        self.attempts = {}
+        self.files = {}
+        self.builds = {}
+        self.memo = {}
+
+    def passes(self, code):
+        digest = hashlib.sha256(f"{self.args.seed}:{code}".encode()).digest()
+        return int.from_bytes(digest[:4], "big") / 2 ** 32 < self.args.pass_rate
+
+    # Model
+    async def agenerate_text(self, prompt, max_output_tokens=512, use_cache=True):
+        issue = prompt.split("Plan:\n", 1)[1].split("\n", 1)[0]
+        n = self.attempts[issue] = self.attempts.get(issue, 0) + 1
+        await asyncio.sleep(self.args.llm)
+        return f"{issue}#{n}"
+
+    # Filesystem
+    async def write_file(self, path, content):
+        self.files[os.path.dirname(path)] = content
+        return {"status": "written"}
+
+    async def read_files(self, files):
+        return {"files": [{"path": path, "content": self.files.get(os.path.dirname(path)) or ""} for path in files]}
+
+    # Git
+    async def fork_repo(self, source_dir, target_dir):
+        await asyncio.sleep(self.args.git)
+        self.files[target_dir] = self.files.get(source_dir)
+        return {"status": "forked"}
+
+    async def search_code(self, query, limit=5):
+        return {"results": []}
+
+    async def release_repo(self, target_dir):
+        return {"status": "released"}
+
+    async def create_pr(self, branch_name, title, body):
+        return {"pr_url": f"https://example.invalid/{branch_name}"}
+
+    async def update_issue(self, issue_id, comment):
+        return {"status": "updated"}
+
+    # Maven and Sonar; results are memoized on the tree like result_cache does
+    async def _build(self, kind, repo_path, latency):
+        code = self.files.get(repo_path)
+        if (kind, code) in self.memo:
+            return self.memo[kind, code]
+        issue = (code or repo_path).split("#")[0]
+        self.builds[issue] = self.builds.get(issue, 0) + 1
+        await asyncio.sleep(latency)
+        ok = code is not None and "#" in code and self.passes(code)
+        self.memo[kind, code] = ok
+        return ok
+
+    async def run_tests(self, repo_path, incremental=False):
+        ok = await self._build("test", repo_path, self.args.build)
+        return {"success": ok, "summary": "ok" if ok else "1 test failed", "log_path": None}
+
+    async def scan_project(self, repo_path, incremental=False, branch_name=None, **_):
+        await self._build("scan", repo_path, self.args.scan)
+        return {"pass": True, "logs": "", "log_path": None}
+
+    async def cancel(self, repo_path):
+        return {"cancelled": 0}
+
+
+def install(stubs, candidates, budget):
+    for module in (auto_fix_module, reviewer_module):
+        for name in ("filesystem_session", "github_session", "maven_session", "sonar_session", "jira_session"):
+            if hasattr(module, name):
+                setattr(module, name, stubs)
+    auto_fix_module.agenerate_text = stubs.agenerate_text
+    auto_fix_module.AUTO_FIX_CANDIDATES = candidates
+    auto_fix_module.AUTO_FIX_BUILD_BUDGET = budget or candidates * auto_fix_module.MAX_FIX_ROUNDS
+
+
+async def run_mode(args, candidates):
+    stubs = Stubs(args)
+    install(stubs, candidates, args.budget)
+
+    async def one(i):
+        issue = f"BENCH-{i}"
+        target_dir = f"/tmp/bench/{issue}"
+        stubs.files[target_dir] = issue
+        task = {"issue_id": issue, "branch_name": f"feature/{issue}", "target_dir": target_dir, "plan": issue,
+                "test_result": {"success": False, "summary": "1 test failed"}}
+        start = time.monotonic()
+        result = await auto_fix_module.auto_fix_async(task)
+        return result["workflow_status"] == "success", time.monotonic() - start, stubs.builds.get(issue, 0)
+
+    return await asyncio.gather(*(one(i) for i in range(args.issues)))
+
+
+def report(name, results):
+    green = sorted(t for ok, t, _ in results if ok)
+    times = sorted(t for _, t, _ in results)
+    p90 = green[int(len(green) * 0.9) - 1] if green else float("nan")
+    print(f"{name:<14} green {len(green):>3}/{len(results):<3} "
+          f"time-to-green p50 {statistics.median(green) if green else float('nan'):6.2f}s p90 {p90:6.2f}s  "
+          f"time-to-verdict mean {statistics.mean(times):6.2f}s  runs/issue {statistics.mean(b for *_, b in results):4.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--issues", type=int, default=30)
+    parser.add_argument("--candidates", type=int, default=3)
+    parser.add_argument("--budget", type=int, default=0, help="candidate builds per issue (0: candidates x rounds)")
+    parser.add_argument("--pass-rate", type=float, default=0.35, help="chance that one generated fix passes")
+    parser.add_argument("--llm", type=float, default=0.4, help="seconds per model call")
+    parser.add_argument("--build", type=float, default=0.6, help="seconds per test build")
+    parser.add_argument("--scan", type=float, default=0.2, help="seconds per Sonar scan")
+    parser.add_argument("--git", type=float, default=0.02, help="seconds per worktree fork")
+    parser.add_argument("--maven-slots", type=int, default=128, help="MAVEN/SONAR_CONCURRENCY for the run")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    configure_limits(llm=64, git=16, maven=args.maven_slots, sonar=args.maven_slots)
+    print(f"{args.issues} issues, pass rate {args.pass_rate:.0%}, llm {args.llm}s, build {args.build}s, "
+          f"scan {args.scan}s, {args.maven_slots} build slots")
+    report("sequential", asyncio.run(run_mode(args, 1)))
+    report(f"speculative x{args.candidates}", asyncio.run(run_mode(args, args.candidates)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Code index benchmark: full build, incremental update and query latency
+Indexes a git repository with the code_index module the GitHub MCP server
+uses. With --repo, an existing checkout (e.g. a clone of a large Java
+project) is indexed at --from and then updated to HEAD; without it, a
+synthetic Java repository of --files classes is generated, indexed, and
+updated after --changed files are edited in one commit.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp_servers"))
+
+from code_index import CodeIndex, snippet_text
+
+WORDS = ("order invoice customer payment account ledger shipment refund discount tax currency price cart "
+         "inventory warehouse stock supplier report export import schedule retry timeout cache session token "
+         "user role permission audit event queue message batch parser validator mapper repository service").split()
+QUERIES = ("NullPointerException when refund is applied to a cancelled order",
+           "Add currency conversion to invoice export",
+           "Payment retry should back off after timeout",
+           "Customer discount is not applied in cart total",
+           "Audit event missing for role permission changes",
+           "Warehouse stock report shows negative inventory")
+
+
+def vocabulary(rng, size=4000):
+    """
+    `size` made-up words plus WORDS, with Zipf weights so term frequencies
+    look like real code; the domain words the queries use are spread over
+    ranks 10-500 rather than being the most frequent terms
+    """
+    syllables = ["ba", "co", "de", "fi", "gu", "ha", "jo", "ki", "lu", "me", "no", "pa", "ri", "so", "tu", "vy"]
+    made_up = {"".join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(size)}
+    words = sorted(made_up - set(WORDS))
+    rng.shuffle(words)
+    for word in WORDS:
+        words.insert(rng.randint(10, 500), word)
+    return words, [1 / (rank + 1) for rank in range(len(words))]
+
+
+def git(repo, *args):
+    subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+
+
+def java_class(rng, package, name, others, vocab):
+    imports = "".join(f"import {other};\n" for other in rng.sample(others, min(3, len(others))))
+    methods = []
+    for _ in range(rng.randint(4, 12)):
+        a, b = rng.choices(*vocab, k=2)
+        methods.append(f"""
+    public {rng.choice(('void', 'int', 'String', 'boolean'))} {a}{b.capitalize()}(String {a}Id, int {b}Count) {{
+        if ({a}Id == null) {{
+            throw new IllegalArgumentException("{a} {b} is required");
+        }}
+        for (int i = 0; i < {b}Count; i++) {{
+            log("{a} {b} " + i);
+        }}
+        {'return;' if rng.random() < 0.3 else '// ' + ' '.join(rng.choices(*vocab, k=5))}
+    }}
+""")
+    return f"package {package};\n\n{imports}\npublic class {name} {{\n{''.join(methods)}}}\n"
+
+
+def generate(root, count, rng):
+    vocab = vocabulary(rng)
+    classes = []
+    for i in range(count):
+        package = f"com.acme.{rng.choice(WORDS)}.{rng.choice(WORDS)}"
+        name = f"{rng.choice(WORDS).capitalize()}{rng.choice(WORDS).capitalize()}{i}"
+        classes.append((package, name))
+    fqns = [f"{p}.{n}" for p, n in classes]
+    for package, name in classes:
+        path = os.path.join(root, "src/main/java", *package.split("."), f"{name}.java")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(java_class(rng, package, name, rng.sample(fqns, 20), vocab))
+    return classes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repo", help="existing git checkout to index (default: generate a synthetic repo)")
+    parser.add_argument("--from", dest="base", default="HEAD~50", help="with --repo: commit to build the index at")
+    parser.add_argument("--files", type=int, default=5000, help="synthetic repo: Java classes")
+    parser.add_argument("--changed", type=int, default=20, help="synthetic repo: files edited before the update")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    work = tempfile.mkdtemp(prefix="code-index-bench-")
+    index = CodeIndex(os.path.join(work, "index.sqlite"))
+
+    if args.repo:
+        repo = os.path.abspath(args.repo)
+        base = subprocess.run(["git", "rev-parse", args.base], cwd=repo, check=True, capture_output=True,
+                              text=True).stdout.strip()
+    else:
+        repo = os.path.join(work, "repo")
+        os.makedirs(repo)
+        git(repo, "init", "-q")
+        start = time.monotonic()
+        classes = generate(repo, args.files, rng)
+        git(repo, "add", "-A")
+        git(repo, "-c", "user.name=bench", "-c", "user.email=bench@invalid", "commit", "-qm", "base")
+        print(f"generated {args.files} classes in {time.monotonic() - start:.1f}s")
+        base = subprocess.run(["git", "rev-parse", "HEAD"], cwd=repo, check=True, capture_output=True,
+                              text=True).stdout.strip()
+        for package, name in rng.sample(classes, args.changed):
+            path = os.path.join(repo, "src/main/java", *package.split("."), f"{name}.java")
+            with open(path, "a") as f:
+                f.write(f"// touched: {' '.join(rng.sample(WORDS, 4))}\n")
+        git(repo, "-c", "user.name=bench", "-c", "user.email=bench@invalid", "commit", "-qam", "change")
+    head = subprocess.run(["git", "rev-parse", "HEAD"], cwd=repo, check=True, capture_output=True,
+                          text=True).stdout.strip()
+
+    build = index.update(repo, repo, base)
+    status = index.status(repo)
+    size = os.path.getsize(os.path.join(work, "index.sqlite")) + sum(
+        os.path.getsize(os.path.join(work, f)) for f in os.listdir(work) if f.startswith("index.sqlite-"))
+    print(f"build   {build['duration']:7.2f}s  {status['files']} files, {status['chunks']} chunks, "
+          f"index {size / 2 ** 20:.1f} MiB")
+    update = index.update(repo, repo, head)
+    print(f"update  {update['duration']:7.3f}s  {update['indexed']} files re-indexed, {update['removed']} removed")
+    noop = index.update(repo, repo, head)
+    print(f"no-op   {noop['duration']:7.3f}s")
+
+    timings, with_text = [], []
+    for i in range(args.queries):
+        query = QUERIES[i % len(QUERIES)]
+        start = time.perf_counter()
+        hits = index.search(repo, query, limit=5)
+        timings.append(time.perf_counter() - start)
+        if i < len(QUERIES):
+            start = time.perf_counter()
+            snippet_text(repo, hits)
+            with_text.append(time.perf_counter() - start)
+    timings.sort()
+    print(f"query   p50 {statistics.median(timings) * 1000:6.1f}ms  p95 {timings[int(len(timings) * 0.95)] * 1000:6.1f}ms"
+          f"  (+{statistics.mean(with_text) * 1000:.1f}ms to read snippet text)")
+    top = index.search(repo, QUERIES[0], limit=3)
+    for hit in top:
+        print(f"  {hit['score']:6.2f}  {hit['path']}:{hit['start_line']}-{hit['end_line']}  {hit['symbol']}")
+    if top:
+        related = index.related(repo, top[0]["path"])
+        print(f"related {top[0]['path']}: {len(related['imports'])} imports, "
+              f"{len(related['imported_by'])} importers")
+
+
+if __name__ == "__main__":
+    main()
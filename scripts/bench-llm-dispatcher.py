@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+LLM dispatcher benchmark against a fake model that enforces its own quota
+Compares firing prompts straight at the model (the old generate_text path)
+with the rate-limited dispatcher: failed generations and sustained throughput.
+"""
+
+import argparse
+import collections
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from orchestrator.llm_dispatcher import LLMDispatcher
+
+
+class ResourceExhausted(Exception):
+    code = 429
+
+
+class FakeQuotaModel:
+    """Accepts at most `limit` requests per sliding `window` seconds, like a per-minute quota"""
+
+    def __init__(self, limit, window, latency):
+        self.limit = limit
+        self.window = window
+        self.latency = latency
+        self.calls = collections.deque()
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def predict(self, prompt, max_output_tokens=512):
+        with self._lock:
+            now = time.monotonic()
+            while self.calls and now - self.calls[0] > self.window:
+                self.calls.popleft()
+            if len(self.calls) >= self.limit:
+                self.rejected += 1
+                raise ResourceExhausted("429 Quota exceeded for generate_content requests per minute")
+            self.calls.append(now)
+        time.sleep(self.latency)
+        return type("Response", (), {"text": f"plan for {prompt}"})()
+
+
+def run_direct(model, prompts, workers):
+    def call(prompt):
+        try:
+            return model.predict(prompt).text
+        except Exception as e:
+            return f"[ERROR] Failed to generate text: {e}"
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(call, prompts))
+
+
+def run_dispatched(model, prompts, workers, limit, window):
+    dispatcher = LLMDispatcher(model, requests_per_minute=limit * 60 / window, tokens_per_minute=10 ** 9,
+                               concurrency=workers, backoff_base=window / 10, backoff_max=window,
+                               request_burst=limit)
+    futures = [dispatcher.submit(p) for p in prompts]
+    peak_depth = dispatcher.queue_depth()
+    results = [f.result() for f in futures]
+    return results, dispatcher.snapshot(), peak_depth
+
+
+def report(name, results, elapsed, model):
+    failed = sum(r.startswith("[ERROR]") for r in results)
+    ok = len(results) - failed
+    print(f"   {name:<11} {ok:4d} ok  {failed:4d} failed  {model.rejected:4d} rejected by quota  "
+          f"{elapsed:6.2f}s  {ok / elapsed:6.1f} ok/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--prompts", type=int, default=120)
+    parser.add_argument("--limit", type=int, default=20, help="requests allowed per window")
+    parser.add_argument("--window", type=float, default=1.0, help="quota window in seconds")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    prompts = [f"ISSUE-{i}" for i in range(args.prompts)]
+    print(f"📊 {args.prompts} prompts, quota {args.limit} requests / {args.window:g}s")
+
+    model = FakeQuotaModel(args.limit, args.window, args.latency)
+    start = time.perf_counter()
+    results = run_direct(model, prompts, args.workers)
+    report("direct", results, time.perf_counter() - start, model)
+
+    model = FakeQuotaModel(args.limit, args.window, args.latency)
+    start = time.perf_counter()
+    results, stats, depth = run_dispatched(model, prompts, args.workers, args.limit, args.window)
+    report("dispatcher", results, time.perf_counter() - start, model)
+    print(f"   dispatcher queue depth at submit: {depth}, retries: {stats['retries']}, "
+          f"avg wait: {stats['avg_wait']:.2f}s, max wait: {stats['max_wait']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
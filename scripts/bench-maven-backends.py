@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Maven backend benchmark: cold `mvn` per build vs. warm mvnd daemons
+Generates a small sample project (one class, one JUnit test) and times
+repeated `test` builds on each available backend. Requires mvn (and mvnd
+for the warm numbers); run once online first to populate ~/.m2.
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp_servers"))
+
+from maven_backends import MvndBackend, SubprocessBackend
+
+POM = """<project xmlns="http://maven.apache.org/POM/4.0.0">
+  <modelVersion>4.0.0</modelVersion>
+  <groupId>swe.agent</groupId>
+  <artifactId>bench-sample</artifactId>
+  <version>1.0</version>
+  <properties>
+    <maven.compiler.release>17</maven.compiler.release>
+    <project.build.sourceEncoding>UTF-8</project.build.sourceEncoding>
+  </properties>
+  <dependencies>
+    <dependency>
+      <groupId>junit</groupId>
+      <artifactId>junit</artifactId>
+      <version>4.13.2</version>
+      <scope>test</scope>
+    </dependency>
+  </dependencies>
+</project>
+"""
+
+MAIN = """package sample;
+public class Example {
+    public static int add(int a, int b) { return a + b; }
+}
+"""
+
+TEST = """package sample;
+import static org.junit.Assert.assertEquals;
+import org.junit.Test;
+public class ExampleTest {
+    @Test public void adds() { assertEquals(3, Example.add(1, 2)); }
+}
+"""
+
+
+def write_sample(root):
+    files = {"pom.xml": POM, "src/main/java/sample/Example.java": MAIN,
+             "src/test/java/sample/ExampleTest.java": TEST}
+    for rel, content in files.items():
+        path = os.path.join(root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+
+
+def bench(backend, project, runs):
+    durations = []
+    for _ in range(runs):
+        result = backend.run(["test"], cwd=project)
+        if result["returncode"] != 0:
+            tail = "\n".join(result["tail"])
+            print(f"❌ {backend.name} build failed (full log: {result['log_path']}):\n{tail}")
+            return None
+        durations.append(result["duration"])
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--offline", action="store_true", help="resolve only from the local repository")
+    args = parser.parse_args()
+
+    if not shutil.which("mvn"):
+        print("❌ mvn not found on PATH")
+        return 1
+
+    backends = [SubprocessBackend(offline=args.offline)]
+    if shutil.which("mvnd"):
+        backends.append(MvndBackend(offline=args.offline))
+    else:
+        print("⚠️ mvnd not found on PATH, only measuring cold builds")
+
+    with tempfile.TemporaryDirectory(prefix="maven-bench-") as project:
+        write_sample(project)
+        print(f"📊 {args.runs} x `test` on a one-class sample project")
+        for backend in backends:
+            durations = bench(backend, project, args.runs)
+            if durations:
+                steady = durations[1:] or durations
+                print(f"   {backend.name:<11} first {durations[0]:6.2f}s  "
+                      f"median after {statistics.median(steady):6.2f}s  min {min(durations):6.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Orchestrator load simulation: the real run_multi_issue_workflow against
+local stand-ins for every MCP server and for the Gemini model (see
+scripts/load_standins.py). Tool and model latencies, failure rates and
+payload sizes come from a profile (--profile JSON, --set overrides) and
+are scaled by --scale into wall-clock time; draws are seeded, so a run
+with the same arguments makes the same draws. Reports throughput,
+per-stage latency percentiles, issue outcomes, peak memory and thread
+count as JSON (--output), and with --compare flags regressions against
+an earlier result, e.g. one produced at another commit. --tracemalloc
+adds the Python heap per issue: peak while the batch runs and what stays
+retained once it has finished (the stand-ins' own allocations excluded).
+"""
+
+import argparse
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+import load_standins
+from load_standins import merge_profile, stand_ins
+
+
+def percentiles(values, scale):
+    values = sorted(v / scale for v in values)
+    if not values:
+        return {"count": 0}
+
+    def at(q):
+        return round(values[min(int(len(values) * q), len(values) - 1)], 3)
+    return {"count": len(values), "p50": at(0.5), "p95": at(0.95), "p99": at(0.99), "max": round(values[-1], 3)}
+
+
+class Sampler:
+    """Peak resident memory and thread count of this process, sampled every `interval` seconds"""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak_rss = self.peak_threads = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="bench-sampler", daemon=True)
+
+    @staticmethod
+    def rss():
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except OSError:
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_rss = max(self.peak_rss, self.rss())
+            # The sampler's own thread is not counted
+            self.peak_threads = max(self.peak_threads, threading.active_count() - 1)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def traced_bytes(exclude):
+    """Python heap currently traced, without allocations made in the file `exclude`"""
+    gc.collect()
+    snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, exclude)])
+    return sum(trace.size for trace in snapshot.traces)
+
+
+def disk_usage(root):
+    files = size = 0
+    for path, _, names in os.walk(root):
+        for name in names:
+            files += 1
+            size += os.path.getsize(os.path.join(path, name))
+    return files, size
+
+
+def timed(name, fn, timings, issues):
+    """Wrap an agent coroutine to record its latency and each issue's first start and last finish"""
+    async def run(task, *args, **kwargs):
+        issue_id = task.get("issue_id", task.get("id"))
+        start = time.perf_counter()
+        issues.setdefault(issue_id, [start, None])
+        try:
+            return await fn(task, *args, **kwargs)
+        finally:
+            end = time.perf_counter()
+            timings.setdefault(name, []).append(end - start)
+            issues[issue_id][1] = end
+    return run
+
+
+def parse_overrides(profile_path, settings):
+    overrides = {}
+    if profile_path:
+        with open(profile_path) as f:
+            overrides = json.load(f)
+    for setting in settings:
+        # maven.run_tests.median=30 -> {"maven.run_tests": {"median": 30}}
+        key, value = setting.split("=", 1)
+        entry, param = key.rsplit(".", 1)
+        overrides.setdefault(entry, {})[param] = json.loads(value)
+    return overrides
+
+
+def compare(result, baseline, tolerance):
+    """Relative changes beyond `tolerance` that make `result` worse than `baseline`"""
+    regressions = []
+
+    def check(label, new, old, higher_is_better=False):
+        if not old or new is None:
+            return
+        change = (new - old) / old
+        if (change < -tolerance) if higher_is_better else (change > tolerance):
+            regressions.append(f"{label}: {old:g} -> {new:g} ({change:+.1%})")
+
+    check("throughput issues/hour", result["throughput"]["issues_per_hour"],
+          baseline["throughput"]["issues_per_hour"], higher_is_better=True)
+    for stage, stats in result["stages"].items():
+        check(f"{stage} p95", stats.get("p95"), baseline["stages"].get(stage, {}).get("p95"))
+    check("peak RSS", result["memory"]["peak_rss_mb"], baseline["memory"]["peak_rss_mb"])
+    check("peak threads", result["threads"]["peak"], baseline["threads"]["peak"])
+    for key in ("peak_kb_per_issue", "retained_kb_per_issue"):
+        check(key, result["memory"].get(key), baseline["memory"].get(key))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--issues", type=int, default=200)
+    parser.add_argument("--scale", type=float, default=0.002, help="wall-clock seconds per modelled second")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--profile", help="JSON file of profile entries to override, e.g. {\"maven.run_tests\": {\"median\": 30}}")
+    parser.add_argument("--set", action="append", default=[], metavar="ENTRY.PARAM=VALUE",
+                        help="override one profile value, e.g. --set gemini.error_rate=0.1")
+    parser.add_argument("--limits", default="", help="resource limits, e.g. llm=8,maven=4")
+    parser.add_argument("--output", help="write the JSON result here (default: stdout)")
+    parser.add_argument("--compare", help="earlier JSON result to check for regressions")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="also measure the Python heap per issue (slows the run down)")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="with --compare: relative change allowed")
+    args = parser.parse_args()
+    profile = merge_profile(parse_overrides(args.profile, args.set))
+
+    # Everything the run writes stays in a scratch directory; the model quota is
+    # scaled like the latencies so rate limiting costs the same modelled time
+    work = tempfile.mkdtemp(prefix="bench-orchestrator-")
+    os.environ.update({
+        "STATE_DB_PATH": os.path.join(work, "state.sqlite"),
+        "LLM_CACHE_PATH": os.path.join(work, "llm-cache.sqlite"),
+        "BLOB_STORE": "file",
+        "BLOB_STORE_DIR": os.path.join(work, "blobs"),
+        "GEMINI_RPM": str(float(os.getenv("GEMINI_RPM", "60")) / args.scale),
+        "GEMINI_TPM": str(float(os.getenv("GEMINI_TPM", "250000")) / args.scale),
+        "GEMINI_BACKOFF_BASE": str(float(os.getenv("GEMINI_BACKOFF_BASE", "1.0")) * args.scale),
+        "GEMINI_BACKOFF_MAX": str(float(os.getenv("GEMINI_BACKOFF_MAX", "60")) * args.scale),
+        "PRIORITY_AGING_HOURS": str(float(os.getenv("PRIORITY_AGING_HOURS", "72")) * args.scale),
+    })
+    from orchestrator import gemini_client, mcp_client, workflow
+    from orchestrator.logger import metrics
+    from orchestrator.scheduler import RESOURCE_LIMITS, configure_limits
+    import orchestrator.agents.auto_fix  # noqa: F401  (the package re-exports the function under the same name)
+    auto_fix_module = sys.modules["orchestrator.agents.auto_fix"]
+
+    if args.limits:
+        configure_limits(**{k: int(v) for k, v in (item.split("=") for item in args.limits.split(","))})
+    calls = {}
+    servers, model = stand_ins(args.issues, profile, args.seed, args.scale, calls)
+    for name, server in servers.items():
+        getattr(mcp_client, f"{name}_session").attach(server)
+    gemini_client.gemini_model = model
+    gemini_client._dispatcher = None
+
+    timings, issues = {}, {}
+    for name in ("planner_async", "coder_async", "auto_fix_async"):
+        setattr(workflow, name, timed(name[:-6], getattr(workflow, name), timings, issues))
+    auto_fix_module.reviewer_async = timed("reviewer", auto_fix_module.reviewer_async, timings, {})
+
+    baseline_rss = Sampler.rss()
+    baseline_threads = threading.active_count()
+    if args.tracemalloc:
+        tracemalloc.start()
+        traced_before = traced_bytes(load_standins.__file__)
+        tracemalloc.reset_peak()
+    with Sampler() as sampler:
+        start = time.perf_counter()
+        results = workflow.run_multi_issue_workflow()
+        wall = time.perf_counter() - start
+    heap = {}
+    if args.tracemalloc:
+        peak = tracemalloc.get_traced_memory()[1]
+        retained = traced_bytes(load_standins.__file__)
+        tracemalloc.stop()
+        heap = {"peak_kb_per_issue": round((peak - traced_before) / args.issues / 1024, 2),
+                "retained_kb_per_issue": round((retained - traced_before) / args.issues / 1024, 2)}
+    blobs, blob_bytes = disk_usage(os.path.join(work, "blobs"))
+
+    statuses = {}
+    for r in results:
+        statuses[r.get("workflow_status") or "unknown"] = statuses.get(r.get("workflow_status") or "unknown", 0) + 1
+    waits = {labels["resource"]: round(h[1] / h[2] / args.scale, 3)
+             for (name, labels_items), h in metrics.histograms.items()
+             for labels in [dict(labels_items)] if name == "swe_agent_resource_wait_seconds" and h[2]}
+    modelled = wall / args.scale
+    commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent, capture_output=True,
+                            text=True).stdout.strip() or None
+    result = {
+        "commit": commit,
+        "config": {"issues": args.issues, "scale": args.scale, "seed": args.seed, "limits": dict(RESOURCE_LIMITS),
+                   "auto_fix_candidates": auto_fix_module.AUTO_FIX_CANDIDATES,
+                   "max_fix_rounds": auto_fix_module.MAX_FIX_ROUNDS, "profile": profile},
+        "throughput": {"wall_seconds": round(wall, 3), "modelled_seconds": round(modelled, 1),
+                       "issues_per_hour": round(len(results) / modelled * 3600, 2),
+                       "prs_per_hour": round(statuses.get("success", 0) / modelled * 3600, 2)},
+        "outcomes": statuses,
+        "stages": {name: percentiles(values, args.scale) for name, values in sorted(timings.items())},
+        "issue_latency": percentiles([end - begin for begin, end in issues.values() if end], args.scale),
+        "resource_wait_mean": waits,
+        "llm": dict(gemini_client.get_dispatcher().stats),
+        "calls": dict(sorted(calls.items())),
+        "memory": {"baseline_rss_mb": round(baseline_rss / 2 ** 20, 1),
+                   "peak_rss_mb": round(sampler.peak_rss / 2 ** 20, 1),
+                   "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1), **heap},
+        "blob_store": {"blobs": blobs, "mb": round(blob_bytes / 2 ** 20, 2)},
+        "threads": {"baseline": baseline_threads, "peak": sampler.peak_threads},
+    }
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    print(f"📊 {len(results)} issues in {wall:.1f}s ({modelled:.0f} modelled s): "
+          f"{result['throughput']['issues_per_hour']:.1f} issues/h, outcomes {statuses}, "
+          f"peak RSS {result['memory']['peak_rss_mb']} MiB, peak threads {sampler.peak_threads}", file=sys.stderr)
+    if heap:
+        print(f"   heap per issue: peak {heap['peak_kb_per_issue']} KiB, retained {heap['retained_kb_per_issue']} KiB",
+              file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"❌ {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"✅ No regressions beyond {args.tolerance:.0%} against {args.compare}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Local mock of the GitHub pulls API. It tracks a primary rate-limit quota
+(X-RateLimit-* headers on every response) and a secondary limit that
+rejects bursts of PR creation with 403 + Retry-After. GETs honour
+If-None-Match, and the mock counts requests and TCP connections.
+Point GH_API_URL at it to run the GitHub MCP server offline, or pass
+--selftest to exercise mcp_servers/github_client.py against it.
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp_servers"))
+
+
+class GitHubStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port, quota, burst, window):
+        super().__init__(("127.0.0.1", port), StubHandler)
+        self.lock = threading.Lock()
+        self.quota, self.remaining, self.reset_at = quota, quota, time.time() + 3600
+        self.burst, self.window = burst, window
+        self.writes = []
+        self.pulls = []
+        self.requests = self.connections = self.secondary_hits = self.in_flight = self.peak_in_flight = 0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body=None, headers=None, charge=True):
+        srv = self.server
+        with srv.lock:
+            if charge:
+                srv.remaining = max(0, srv.remaining - 1)
+            limits = {"X-RateLimit-Limit": srv.quota, "X-RateLimit-Remaining": srv.remaining,
+                      "X-RateLimit-Reset": int(srv.reset_at)}
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        for key, value in {**limits, **(headers or {})}.items():
+            self.send_header(key, str(value))
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        with self.server.lock:
+            self.server.requests += 1
+            pulls = list(self.server.pulls)
+        if not re.fullmatch(r"/repos/[^/]+/[^/]+/pulls", url.path):
+            return self._reply(404, {"message": "Not Found"})
+        head = parse_qs(url.query).get("head", [None])[0]
+        body = [p for p in pulls if head is None or f"{p['owner']}:{p['head']['ref']}" == head]
+        etag = '"' + hashlib.sha1(json.dumps(body, sort_keys=True).encode()).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            # Conditional hits don't count against the quota
+            return self._reply(304, headers={"ETag": etag}, charge=False)
+        self._reply(200, body, headers={"ETag": etag})
+
+    def do_POST(self):
+        srv = self.server
+        match = re.fullmatch(r"/repos/([^/]+)/([^/]+)/pulls", urlparse(self.path).path)
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        now = time.time()
+        with srv.lock:
+            srv.requests += 1
+            srv.writes = [t for t in srv.writes if now - t < srv.window]
+            if len(srv.writes) >= srv.burst:
+                srv.secondary_hits += 1
+                secondary = True
+            else:
+                srv.writes.append(now)
+                secondary = False
+                srv.in_flight += 1
+                srv.peak_in_flight = max(srv.peak_in_flight, srv.in_flight)
+        if secondary:
+            return self._reply(403, {"message": "You have exceeded a secondary rate limit."},
+                               headers={"Retry-After": 1})
+        if not match:
+            return self._reply(404, {"message": "Not Found"})
+        time.sleep(0.05)  # server-side work, so concurrent creations overlap
+        with srv.lock:
+            srv.in_flight -= 1
+            if any(p["head"]["ref"] == payload["head"] for p in srv.pulls):
+                exists = True
+            else:
+                exists = False
+                number = len(srv.pulls) + 1
+                pr = {"number": number, "owner": match.group(1), "head": {"ref": payload["head"]},
+                      "title": payload["title"],
+                      "html_url": f"https://github.com/{match.group(1)}/{match.group(2)}/pull/{number}"}
+                srv.pulls.append(pr)
+        if exists:
+            return self._reply(422, {"message": "Validation Failed",
+                                     "errors": [{"message": "A pull request already exists for this head."}]})
+        self._reply(201, pr)
+
+
+def selftest(stub, port, count, concurrency):
+    from github_client import GitHubClient, RateLimiter
+
+    client = GitHubClient(token="stub", api_url=f"http://127.0.0.1:{port}", pool_size=concurrency,
+                          pr_concurrency=concurrency, limiter=RateLimiter(write_interval=0.05))
+    repo = "octo/sample"
+    checks = []
+
+    start = time.time()
+    prs = client.create_prs(repo, [{"head": f"feature/ISSUE-{i}", "title": f"Auto PR {i}", "body": "Plan"}
+                                   for i in range(count)])
+    elapsed = time.time() - start
+    checks.append((f"all {count} PRs created despite the secondary limit", len({p["number"] for p in prs}) == count))
+    checks.append((f"at most {concurrency} creations in flight", stub.peak_in_flight <= concurrency))
+    print(f"   {count} PRs in {elapsed:.2f}s: {client.stats['requests']} requests, "
+          f"{stub.secondary_hits} secondary-limit rejections, {stub.connections} connection(s)")
+
+    again = client.create_pr(repo, "feature/ISSUE-0", "Auto PR 0", "Plan")
+    checks.append(("re-creating an existing PR returns it", again["number"] == prs[0]["number"]))
+    remaining = stub.remaining
+    client.get(f"/repos/{repo}/pulls")
+    client.get(f"/repos/{repo}/pulls")
+    checks.append(("conditional GET is served from the ETag cache", client.stats["not_modified"] >= 1))
+    checks.append(("304s don't use quota", stub.remaining == remaining - 1))
+    checks.append(("requests reuse pooled connections", stub.connections <= concurrency))
+
+    for name, ok in checks:
+        print(f"{'✅' if ok else '❌'} {name}")
+    return 0 if all(ok for _, ok in checks) else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--quota", type=int, default=5000)
+    parser.add_argument("--burst", type=int, default=5, help="PR creations allowed per --window seconds")
+    parser.add_argument("--window", type=float, default=1.0)
+    parser.add_argument("--prs", type=int, default=20, help="PRs created by --selftest")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--selftest", action="store_true")
+    args = parser.parse_args()
+
+    stub = GitHubStub(args.port, args.quota, args.burst, args.window)
+    if not args.selftest:
+        print(f"🧪 GitHub mock on http://127.0.0.1:{args.port}")
+        stub.serve_forever()
+        return 0
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    return selftest(stub, args.port, args.prs, args.concurrency)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
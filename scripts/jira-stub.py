@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Local stub of the Jira search and comment APIs. Serves a generated project
+with startAt/maxResults paging, `fields` projection and the `updated >=`
+clause used by delta sync, and counts requests and TCP connections.
+Point JIRA_URL at it to run the Jira MCP server offline, or pass
+--selftest to exercise mcp_servers/jira_client.py against it.
+"""
+
+import argparse
+import json
+import re
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp_servers"))
+
+MAX_RESULTS = 100  # Jira caps maxResults server-side too
+
+
+def jira_time(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}+0000"
+
+
+class JiraStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port, issues):
+        super().__init__(("127.0.0.1", port), StubHandler)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.comments = []
+        # Called with the request count before each search is answered, e.g. to update issues between pages
+        self.before_search = None
+        base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.issues = [{
+            "id": str(10000 + i), "key": f"PROJ-{i}",
+            "fields": {"summary": f"Issue {i}", "status": {"name": "To Do"}, "updated": jira_time(base + timedelta(seconds=i)),
+                       "description": "Long description " * 50, "assignee": {"displayName": "AI-Agent"}},
+        } for i in range(issues)]
+
+    def touch(self, count, first=0):
+        """Mark `count` issues, from the `first`, as updated now"""
+        now = datetime.now(timezone.utc)
+        with self.lock:
+            for issue in self.issues[first:first + count]:
+                issue["fields"]["updated"] = jira_time(now)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/rest/api/3/search":
+            return self._reply(404, {"errorMessages": ["Not found"]})
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        with self.server.lock:
+            self.server.requests += 1
+            count = self.server.requests
+        if self.server.before_search:
+            self.server.before_search(count)
+        with self.server.lock:
+            issues = [{**i, "fields": dict(i["fields"])} for i in self.server.issues]
+        since = re.search(r'updated >= "(\d{4}/\d{2}/\d{2} \d{2}:\d{2})"', params.get("jql", ""))
+        if since:
+            cutoff = datetime.strptime(since.group(1), "%Y/%m/%d %H:%M").replace(tzinfo=timezone.utc)
+            issues = [i for i in issues if datetime.strptime(i["fields"]["updated"], "%Y-%m-%dT%H:%M:%S.%f%z") >= cutoff]
+        if "ORDER BY updated" in params.get("jql", ""):
+            issues.sort(key=lambda i: i["fields"]["updated"])
+        start = int(params.get("startAt", 0))
+        size = min(int(params.get("maxResults", 50)), MAX_RESULTS)
+        fields = params.get("fields", "*all")
+        page = issues[start:start + size]
+        if fields != "*all":
+            wanted = fields.split(",")
+            page = [{**i, "fields": {k: v for k, v in i["fields"].items() if k in wanted}} for i in page]
+        self._reply(200, {"startAt": start, "maxResults": size, "total": len(issues), "issues": page})
+
+    def do_POST(self):
+        match = re.fullmatch(r"/rest/api/3/issue/([^/]+)/comment", urlparse(self.path).path)
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with self.server.lock:
+            self.server.requests += 1
+            if match:
+                self.server.comments.append((match.group(1), body.get("body")))
+        self._reply(201 if match else 404, {"id": str(len(self.server.comments))})
+
+
+def selftest(stub, port, issues):
+    from jira_client import JiraClient, WatermarkStore
+
+    watermarks = WatermarkStore(tempfile.mktemp(suffix=".json"))
+    client = JiraClient(f"http://127.0.0.1:{port}", token="stub", watermarks=watermarks)
+    jql = "assignee=AI-Agent AND status='To Do'"
+    checks = []
+
+    start = time.time()
+    first = client.search(jql, delta=True)
+    checks.append((f"full sync returns all {issues} issues across pages", len(first) == issues))
+    checks.append(("only projected fields are fetched", all("description" not in i["fields"] for i in first)))
+    print(f"   full sync: {len(first)} issues, {stub.requests} requests, "
+          f"{stub.connections} connection(s), {time.time() - start:.2f}s")
+
+    checks.append(("delta sync with no changes returns nothing", client.search(jql, delta=True) == []))
+    stub.touch(5)
+    changed = client.search(jql, delta=True)
+    checks.append(("delta sync returns only the 5 updated issues", len(changed) == 5))
+    checks.append(("repeated delta sync returns nothing", client.search(jql, delta=True) == []))
+
+    results = client.add_comments([{"issue_id": i["id"], "comment": "PR created"} for i in changed])
+    checks.append(("bulk update comments every issue", [r["status"] for r in results] == [201] * 5
+                   and len(stub.comments) == 5))
+    checks.append(("every request shares a small connection pool", stub.connections <= client.pool_size))
+
+    # An issue from the first page updated before the second: with offset paging it moves to the end
+    # and the issue at the page boundary is skipped for good
+    watermarks = WatermarkStore(tempfile.mktemp(suffix=".json"))
+    client = JiraClient(f"http://127.0.0.1:{port}", token="stub", watermarks=watermarks)
+    first_request = stub.requests + 1
+    stub.before_search = lambda n: stub.touch(1, first=5) if n == first_request + 1 else None
+    moved = client.search(jql, delta=True)
+    stub.before_search = None
+    checks.append(("issue updated between pages shifts none out of a full sync",
+                   sorted(i["id"] for i in moved) == sorted(i["id"] for i in stub.issues) and len(moved) == issues))
+    checks.append(("the updated issue is returned as last seen",
+                   next(i for i in moved if i["id"] == stub.issues[5]["id"])["fields"]["updated"]
+                   == stub.issues[5]["fields"]["updated"]))
+    checks.append(("delta sync after it returns nothing", client.search(jql, delta=True) == []))
+    print(f"   total: {stub.requests} requests over {stub.connections} connection(s)")
+
+    for name, ok in checks:
+        print(f"{'✅' if ok else '❌'} {name}")
+    return 0 if all(ok for _, ok in checks) else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--issues", type=int, default=1234)
+    parser.add_argument("--selftest", action="store_true")
+    args = parser.parse_args()
+
+    stub = JiraStub(args.port, args.issues)
+    if not args.selftest:
+        print(f"🧪 Jira stub with {args.issues} issues on http://127.0.0.1:{args.port}")
+        stub.serve_forever()
+        return 0
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    return selftest(stub, args.port, args.issues)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
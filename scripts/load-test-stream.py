@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Dashboard load test: 3-second polling of /api/issues vs. /api/issues/stream
+Seeds a state store with a backlog, starts the Flask app in a subprocess,
+connects N clients in each mode while a writer drives FSM transitions, and
+reports backend CPU time and bytes sent to the clients.
+"""
+
+import argparse
+import http.client
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from orchestrator.state_store import SQLiteStateStore
+
+STATES = ["planned", "coded", "reviewed", "pr_created", "completed"]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def seed(store, n):
+    for i in range(n):
+        store.record_transition(f"LOAD-{i}", "planned")
+        store.update_issue(f"LOAD-{i}", plan="Plan " * 40, branch_name=f"fix/LOAD-{i}", workflow_status="planned")
+
+
+def start_server(db_path, port):
+    env = dict(os.environ, STATE_STORE="sqlite", STATE_DB_PATH=db_path, STREAM_POLL_INTERVAL="0.5")
+    code = f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"
+    proc = subprocess.Popen([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("Flask app did not start")
+
+
+def poll_client(port, interval, stop, totals):
+    while not stop.is_set():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        conn.request("GET", "/api/issues?limit=500")
+        body = conn.getresponse().read()
+        conn.close()
+        totals.append(len(body))
+        stop.wait(interval)
+
+
+def stream_client(port, stop, totals):
+    # Raw socket so the read can time out and re-check `stop` without
+    # confusing http.client's chunked decoder
+    sock = socket.create_connection(("127.0.0.1", port))
+    sock.sendall(b"GET /api/issues/stream HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n\r\n")
+    sock.settimeout(0.5)
+    received = 0
+    while not stop.is_set():
+        try:
+            chunk = sock.recv(65536)
+        except socket.timeout:
+            continue
+        if not chunk:
+            break
+        received += len(chunk)
+    sock.close()
+    totals.append(received)
+
+
+def writer(db_path, issues, rate, stop, seed_value):
+    store = SQLiteStateStore(db_path)
+    rng = random.Random(seed_value)
+    while not stop.wait(1.0 / rate):
+        issue_id = f"LOAD-{rng.randrange(issues)}"
+        store.record_transition(issue_id, rng.choice(STATES))
+
+
+def run_mode(mode, args, db_path):
+    port = free_port()
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    server = start_server(db_path, port)
+    stop, totals = threading.Event(), []
+    if mode == "poll":
+        clients = [threading.Thread(target=poll_client, args=(port, args.poll_interval, stop, totals))
+                   for _ in range(args.clients)]
+    else:
+        clients = [threading.Thread(target=stream_client, args=(port, stop, totals)) for _ in range(args.clients)]
+    for c in clients:
+        c.start()
+    write = threading.Thread(target=writer, args=(db_path, args.issues, args.write_rate, stop, args.seed))
+    write.start()
+    time.sleep(args.duration)
+    stop.set()
+    for c in clients + [write]:
+        c.join()
+    server.terminate()
+    server.wait()
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    return cpu, sum(totals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--issues", type=int, default=300, help="backlog size")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per mode")
+    parser.add_argument("--write-rate", type=float, default=2.0, help="FSM transitions per second")
+    parser.add_argument("--poll-interval", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"📊 {args.clients} clients, {args.issues} issues, {args.write_rate:g} transitions/s, "
+          f"{args.duration:g}s per mode")
+    results = {}
+    for mode in ("poll", "stream"):
+        with tempfile.TemporaryDirectory(prefix="stream-load-") as tmp:
+            db_path = os.path.join(tmp, "state.sqlite")
+            seed(SQLiteStateStore(db_path), args.issues)
+            results[mode] = run_mode(mode, args, db_path)
+        cpu, sent = results[mode]
+        print(f"   {mode:<7} backend CPU {cpu:7.2f}s   sent {sent / 1024:10.1f} KiB")
+
+    (poll_cpu, poll_sent), (stream_cpu, stream_sent) = results["poll"], results["stream"]
+    print(f"✅ stream vs poll: CPU {poll_cpu / max(stream_cpu, 1e-9):.1f}x less, "
+          f"bytes {poll_sent / max(stream_sent, 1):.1f}x less")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
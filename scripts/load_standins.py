@@ -0,0 +1,300 @@
+"""
+Local stand-ins for the Jira, GitHub, filesystem, Maven and Sonar MCP
+servers and for the Gemini model, used by scripts/bench-orchestrator.py.
+Each tool call sleeps for a latency drawn from its profile entry, fails
+with the entry's error_rate, and returns results shaped like the real
+server's, sized by the entry's payload settings. Draws are seeded by
+(seed, tool, issue, n-th call for that issue), so a run makes the same
+draws whatever order concurrent calls happen in. Worktrees and file
+operations are real (mcp_servers/file_ops on /tmp), so the orchestrator's
+memory is measured without the stand-ins holding issue data.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import shutil
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp_servers"))
+
+from file_ops import apply_unified_diff, commit, read_many
+from unified_diff import PatchError
+
+# Latencies are in modelled seconds (scaled by the bench's --scale): a lognormal
+# around `median` with shape `sigma` (0 = fixed). error_rate makes the tool call fail;
+# pass rates decide build and scan verdicts; the remaining keys size payloads.
+PROFILE = {
+    "gemini": {"median": 4.0, "sigma": 0.5, "error_rate": 0.02, "output_bytes": 1500, "diff_ratio": 0.5},
+    "jira.list_issues": {"median": 1.0, "sigma": 0.3, "description_bytes": 2000},
+    "jira.update_issue": {"median": 0.3, "sigma": 0.3},
+    "github.clone_repo": {"median": 3.0, "sigma": 0.5},
+    "github.fork_repo": {"median": 0.5, "sigma": 0.3},
+    "github.release_repo": {"median": 0.05, "sigma": 0.2},
+    "github.create_pr": {"median": 1.0, "sigma": 0.3, "error_rate": 0.01},
+    "github.search_code": {"median": 0.05, "sigma": 0.3, "results": 5, "snippet_bytes": 600},
+    "filesystem.*": {"median": 0.005, "sigma": 0.2},
+    "maven.run_tests": {"median": 60.0, "sigma": 0.6, "pass_rate": 0.5, "fix_pass_rate": 0.6, "failures": 20,
+                        "frames": 8, "summary_bytes": 4000},
+    "maven.cancel": {"median": 0.01, "sigma": 0},
+    "sonar.scan_project": {"median": 30.0, "sigma": 0.4, "pass_rate": 0.9, "issues": 10, "log_bytes": 2000},
+    "sonar.cancel": {"median": 0.01, "sigma": 0},
+}
+DEFAULT_SPEC = {"median": 0.01, "sigma": 0}
+PRIORITIES = (("Highest", 0.05), ("High", 0.15), ("Medium", 0.5), ("Low", 0.3))
+PROJECTS = ("CORE", "BILLING", "DOCS")
+
+# Worktrees are /tmp/feature/<issue>-<random suffix>[-fix<round>.<candidate>]; draws are keyed without the suffix
+_WORKTREE = re.compile(r"feature/(.+?)-[0-9a-f]{6}(?=$|[-/])")
+
+
+def merge_profile(overrides):
+    """PROFILE with `overrides` ({"maven.run_tests": {"median": 30}, ...}) merged per entry"""
+    profile = {key: dict(spec) for key, spec in PROFILE.items()}
+    for key, spec in overrides.items():
+        profile.setdefault(key, {}).update(spec)
+    return profile
+
+
+def latency(spec, rng):
+    median = spec.get("median", 0.0)
+    sigma = spec.get("sigma", 0.0)
+    return median * math.exp(rng.gauss(0, sigma)) if median and sigma else median
+
+
+def filler(rng, size, words=("order", "invoice", "retry", "cache", "null", "timeout", "mapper", "audit")):
+    """About `size` bytes of word salad"""
+    text = " ".join(rng.choice(words) for _ in range(max(size // 6, 1)))
+    return text[:size]
+
+
+class Draws:
+    """Seeded random streams keyed by (tool, issue, n-th call), safe across threads"""
+
+    def __init__(self, seed):
+        self.seed = seed
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def rng(self, tool, key):
+        # Keys can be whole prompts; only a digest is kept, so the stand-ins don't hold them
+        key = hashlib.sha1(_WORKTREE.sub(lambda m: f"feature/{m.group(1)}", key or "").encode()).hexdigest()
+        with self._lock:
+            n = self._counts[tool, key] = self._counts.get((tool, key), 0) + 1
+        return random.Random(f"{self.seed}:{tool}:{key}:{n}"), n
+
+
+class StandInServer:
+    """
+    One MCP server answered in-process: call_tool() behaves like an MCP
+    ClientSession's, so MCPSession.attach() can route a session to it.
+    Tools are methods named like the real tools, taking (rng, spec, n, **arguments).
+    """
+    name = None
+
+    def __init__(self, profile, draws, scale, stats):
+        self.profile = profile
+        self.draws = draws
+        self.scale = scale
+        self.stats = stats
+
+    def spec(self, tool):
+        return self.profile.get(f"{self.name}.{tool}") or self.profile.get(f"{self.name}.*") or DEFAULT_SPEC
+
+    async def call_tool(self, tool, arguments):
+        arguments = arguments or {}
+        spec = self.spec(tool)
+        key = next((str(arguments[k]) for k in ("repo_path", "target_dir", "path", "issue_id", "branch_name", "query")
+                    if k in arguments), "")
+        rng, n = self.draws.rng(f"{self.name}.{tool}", key)
+        fn = getattr(self, tool, None)
+        await asyncio.sleep(latency(spec, rng) * self.scale)
+        stat = self.stats.setdefault(f"{self.name}.{tool}", {"calls": 0, "errors": 0, "bytes": 0})
+        stat["calls"] += 1
+        try:
+            if fn is None:
+                raise ValueError(f"Unknown tool: {tool}")
+            if rng.random() < spec.get("error_rate", 0.0):
+                raise RuntimeError(f"injected {self.name}.{tool} failure")
+            text = json.dumps(fn(rng, spec, n, **arguments))
+            error = False
+        except Exception as e:
+            stat["errors"] += 1
+            text, error = f"{type(e).__name__}: {e}", True
+        stat["bytes"] += len(text)
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=text)], isError=error)
+
+
+class JiraStandIn(StandInServer):
+    name = "jira"
+
+    def __init__(self, profile, draws, scale, stats, issues):
+        super().__init__(profile, draws, scale, stats)
+        self.issues = issues
+
+    def list_issues(self, rng, spec, n, assignee, status="To Do", delta=False, limit=0):
+        now = datetime.now(timezone.utc)
+        issues = []
+        for i in range(limit or self.issues):
+            r = random.Random(f"{self.draws.seed}:issue:{i}")
+            created = now - timedelta(hours=r.uniform(0, 240))
+            issues.append({"id": f"SIM-{i}", "key": f"SIM-{i}", "fields": {
+                "summary": f"Issue {i}: {filler(r, 60)}",
+                "description": filler(r, spec.get("description_bytes", 2000)),
+                "status": {"name": status},
+                "priority": {"name": r.choices([p for p, _ in PRIORITIES], [w for _, w in PRIORITIES])[0]},
+                "project": {"key": r.choice(PROJECTS)},
+                "assignee": {"displayName": assignee},
+                "created": created.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "+0000",
+                "updated": now.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "+0000",
+            }})
+        return issues
+
+    def update_issue(self, rng, spec, n, issue_id, comment):
+        return {"status": "ok"}
+
+
+class GitHubStandIn(StandInServer):
+    name = "github"
+
+    def clone_repo(self, rng, spec, n, branch_name, target_dir, base="main"):
+        os.makedirs(target_dir, exist_ok=True)
+        return {"status": "cloned"}
+
+    def fork_repo(self, rng, spec, n, source_dir, target_dir):
+        shutil.copytree(source_dir, target_dir, dirs_exist_ok=True)
+        return {"status": "forked"}
+
+    def release_repo(self, rng, spec, n, target_dir):
+        shutil.rmtree(target_dir, ignore_errors=True)
+        return {"status": "released"}
+
+    def create_pr(self, rng, spec, n, branch_name, title, body):
+        issue = _WORKTREE.sub(lambda m: m.group(1), branch_name)
+        return {"pr_url": f"https://github.invalid/sim/pull/{zlib.crc32(issue.encode()) % 100000}"}
+
+    def search_code(self, rng, spec, n, query, limit=5, base="main"):
+        return {"commit": "0" * 40, "results": [
+            {"path": f"src/main/java/com/acme/Sim{rng.randrange(1000)}.java", "start_line": 1 + 40 * k,
+             "end_line": 40 * (k + 1), "symbol": f"method{k}", "score": 10.0 - k,
+             "text": filler(rng, spec.get("snippet_bytes", 600))}
+            for k in range(min(limit, spec.get("results", 5)))]}
+
+
+class FilesystemStandIn(StandInServer):
+    """The real file operations of the filesystem server, plus latency"""
+    name = "filesystem"
+
+    def write_file(self, rng, spec, n, path, content):
+        commit({path: content})
+        return {"status": "ok"}
+
+    def read_files(self, rng, spec, n, files):
+        return {"files": read_many(files)}
+
+    def apply_patch(self, rng, spec, n, patch_content, repo_path, check=False):
+        try:
+            return {"status": "checked" if check else "applied",
+                    "files": apply_unified_diff(repo_path, patch_content, check=check)}
+        except PatchError as e:
+            return {"status": "rejected", "errors": e.errors}
+
+
+class MavenStandIn(StandInServer):
+    name = "maven"
+
+    def run_tests(self, rng, spec, n, repo_path, incremental=False, base_ref="origin/main"):
+        first = n == 1 and "-fix" not in repo_path
+        success = rng.random() < spec.get("pass_rate" if first else "fix_pass_rate", 0.5)
+        failures = [] if success else [
+            {"test_class": f"com.acme.Sim{k % 7}Test", "test_method": f"test{k}", "kind": rng.choice(("failure", "error")),
+             "message": f"expected <{rng.randrange(100)}> but was <{rng.randrange(100)}>",
+             "frames": [f"com.acme.Sim{k % 7}.method{f}(Sim{k % 7}.java:{rng.randrange(1, 400)})"
+                        for f in range(spec.get("frames", 8))]}
+            for k in range(rng.randint(1, max(spec.get("failures", 20), 1)))]
+        run = rng.randint(50, 500)
+        digest = {"counts": {"run": run, "failures": sum(f["kind"] == "failure" for f in failures),
+                             "errors": sum(f["kind"] == "error" for f in failures), "skipped": 0},
+                  "failures": failures, "compile_errors": [], "build_failure": not success, "goal_errors": [],
+                  "dropped": 0}
+        return {"success": success, "digest": digest, "summary": filler(rng, spec.get("summary_bytes", 4000)),
+                "log_path": None, "backend": "standin", "duration": 0.0, "queue_wait": 0.0,
+                "strategy": "incremental" if incremental else "full", "modules": [], "tests": [],
+                "timed_out": False, "cancelled": False}
+
+    def cancel(self, rng, spec, n, repo_path):
+        return {"cancelled": 0}
+
+
+class SonarStandIn(StandInServer):
+    name = "sonar"
+
+    def scan_project(self, rng, spec, n, repo_path, incremental=False, base_ref="origin/main", branch_name=None):
+        passed = rng.random() < spec.get("pass_rate", 0.9)
+        issues = [] if passed else [
+            {"rule": f"java:S{rng.randrange(100, 5000)}", "file": f"src/main/java/com/acme/Sim{k}.java",
+             "line": rng.randrange(1, 400), "message": filler(rng, 80), "severity": "MAJOR"}
+            for k in range(rng.randint(1, max(spec.get("issues", 10), 1)))]
+        return {"pass": passed, "digest": {"issues": issues, "quality_gate": "OK" if passed else "ERROR", "errors": []},
+                "logs": filler(rng, spec.get("log_bytes", 2000)), "log_path": None,
+                "strategy": "incremental" if incremental else "full", "files": [], "duration": 0.0,
+                "queue_wait": 0.0, "timed_out": False, "cancelled": False}
+
+    def cancel(self, rng, spec, n, repo_path):
+        return {"cancelled": 0}
+
+
+class StandInModel:
+    """
+    Stands in for the Vertex AI model behind orchestrator.llm_dispatcher:
+    predict() blocks for the profile latency in the dispatcher's worker
+    thread, raises a 429 quota error at error_rate (which the dispatcher
+    retries), and answers fix prompts with a unified diff (diff_ratio) or
+    a whole file.
+    """
+
+    def __init__(self, profile, draws, scale, stats):
+        self.spec = profile.get("gemini", DEFAULT_SPEC)
+        self.draws = draws
+        self.scale = scale
+        self.stats = stats.setdefault("gemini.predict", {"calls": 0, "errors": 0, "bytes": 0})
+        self._lock = threading.Lock()
+
+    def predict(self, prompt, max_output_tokens=512):
+        rng, n = self.draws.rng("gemini", _WORKTREE.sub(lambda m: f"feature/{m.group(1)}", prompt))
+        time.sleep(latency(self.spec, rng) * self.scale)
+        with self._lock:
+            self.stats["calls"] += 1
+        if rng.random() < self.spec.get("error_rate", 0.0):
+            with self._lock:
+                self.stats["errors"] += 1
+            raise RuntimeError("429 Resource exhausted: quota exceeded (stand-in)")
+        size = self.spec.get("output_bytes", 1500)
+        if "Suggest fixes" in prompt and rng.random() < self.spec.get("diff_ratio", 0.5):
+            text = f"--- a/Example.java\n+++ b/Example.java\n@@ -0,0 +1,1 @@\n+// {filler(rng, 60)} #{n}\n"
+        elif "Suggest fixes" in prompt:
+            text = f"// fixed #{n}\n" + filler(rng, size)
+        else:
+            text = filler(rng, size)
+        with self._lock:
+            self.stats["bytes"] += len(text)
+        return SimpleNamespace(text=text)
+
+
+def stand_ins(issues, profile, seed, scale, stats):
+    """{session name: stand-in server} for every MCP session, and the model stand-in"""
+    draws = Draws(seed)
+    servers = {"jira": JiraStandIn(profile, draws, scale, stats, issues)}
+    for cls in (GitHubStandIn, FilesystemStandIn, MavenStandIn, SonarStandIn):
+        servers[cls.name] = cls(profile, draws, scale, stats)
+    return servers, StandInModel(profile, draws, scale, stats)
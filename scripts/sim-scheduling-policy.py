@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Scheduling policy simulation: time-to-PR by Jira priority, FIFO vs. policy
+Replays per-issue stage durations through the real arun_pipeline() and
+aresource() slots, once with SCHEDULING_POLICY=fifo and once with the
+priority policy, and reports p50/p95 time-to-PR per priority and project.
+Durations come from the FSM transitions recorded in a state store
+(--state-db) or, without one, from a synthetic profile with long auto-fix
+tails. Issues arrive over --window seconds with a skewed priority and
+project mix, so a backlog builds up. Times are reported in recorded
+seconds; --scale maps them to wall-clock time.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+PRIORITIES = (("Highest", 0.05), ("High", 0.15), ("Medium", 0.5), ("Low", 0.3))
+PROJECTS = (("CORE", 0.6), ("BILLING", 0.3), ("DOCS", 0.1))
+
+
+def recorded_profiles(path, planner_seconds):
+    """
+    Per-issue {"planner", "coder", "rounds"} durations from the FSM
+    transitions in the SQLite state store at `path`: planned->coded is the
+    coder stage, each auto_fix->reviewed/pr_created span one auto-fix round.
+    Planning has no start transition, so it takes `planner_seconds`.
+    """
+    from orchestrator.state_store import SQLiteStateStore
+    store = SQLiteStateStore(path)
+    profiles, cursor = [], None
+    while True:
+        issues, cursor = store.list_issues(limit=500, cursor=cursor)
+        for issue in issues:
+            history = store.history(issue["issue_id"])
+            at = {h["state"]: h["at"] for h in history}
+            if "planned" not in at or "coded" not in at:
+                continue
+            rounds = []
+            for entry, following in zip(history, history[1:]):
+                if entry["state"] == "auto_fix" and following["state"] in ("reviewed", "pr_created", "failed"):
+                    rounds.append(following["at"] - entry["at"])
+            profiles.append({"planner": planner_seconds, "coder": at["coded"] - at["planned"], "rounds": rounds})
+        if not cursor:
+            return profiles
+
+
+def synthetic_profiles(rng, count):
+    """Lognormal stage durations (means ~30s planning, ~120s coding, ~200s per round); half the issues need auto-fix"""
+    profiles = []
+    for _ in range(count):
+        rounds = 0
+        while rounds < 3 and rng.random() < (0.5 if rounds == 0 else 0.6):
+            rounds += 1
+        profiles.append({"planner": rng.lognormvariate(3.3, 0.4), "coder": rng.lognormvariate(4.7, 0.5),
+                         "rounds": [rng.lognormvariate(5.2, 0.6) for _ in range(rounds)]})
+    return profiles
+
+
+def make_workload(profiles, count, window, rng):
+    def pick(choices):
+        return rng.choices([c for c, _ in choices], [w for _, w in choices])[0]
+
+    return [{"id": f"SIM-{i}", "arrival": rng.uniform(0, window), "priority": pick(PRIORITIES),
+             "project": pick(PROJECTS), **rng.choice(profiles)} for i in range(count)]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)] if values else None
+
+
+async def simulate(issues, scale):
+    from orchestrator import policy
+    from orchestrator.fsm import IssueFSM
+    from orchestrator.scheduler import aresource, arun_pipeline
+
+    start = time.time()
+    done = {}
+
+    def created(issue):
+        return datetime.fromtimestamp(start + issue["arrival"] * scale, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f%z")
+
+    def ticket(item):
+        issue, fsm = item
+        return policy.Ticket(issue["id"], issue["fields"], fsm, enqueued=start + issue["sim"]["arrival"] * scale)
+
+    async def plan(item):
+        issue, fsm = item
+        await asyncio.sleep(issue["sim"]["arrival"] * scale)
+        async with aresource("llm"):
+            await asyncio.sleep(issue["sim"]["planner"] * scale)
+        fsm.transition("planned")
+        return item
+
+    async def code(item):
+        issue, fsm = item
+        async with aresource("git"):
+            await asyncio.sleep(issue["sim"]["coder"] * 0.1 * scale)
+        async with aresource("maven"):
+            await asyncio.sleep(issue["sim"]["coder"] * 0.9 * scale)
+        fsm.transition("coded")
+        fsm.transition("reviewed")
+        return item
+
+    async def auto_fix(item):
+        issue, fsm = item
+        for seconds in issue["sim"]["rounds"]:
+            fsm.transition("auto_fix")
+            async with aresource("llm"):
+                await asyncio.sleep(seconds * 0.2 * scale)
+            async with aresource("maven"):
+                await asyncio.sleep(seconds * 0.8 * scale)
+            fsm.transition("reviewed")
+        fsm.transition("pr_created")
+        done[issue["id"]] = (time.time() - start) / scale - issue["sim"]["arrival"]
+        return item
+
+    items = [({"id": i["id"], "sim": i, "fields": {"priority": {"name": i["priority"]}, "created": created(i),
+                                                   "project": {"key": i["project"]}}}, IssueFSM(i["id"]))
+             for i in issues]
+    await arun_pipeline(items, [plan, code, auto_fix], ticket=ticket)
+    return done, (time.time() - start) / scale
+
+
+def report(issues, done, makespan):
+    result = {"makespan": round(makespan, 1), "priorities": {}, "projects": {}}
+    for key, names in (("priorities", [p for p, _ in PRIORITIES]), ("projects", [p for p, _ in PROJECTS])):
+        field = "priority" if key == "priorities" else "project"
+        for name in names:
+            times = [done[i["id"]] for i in issues if i[field] == name]
+            if times:
+                result[key][name] = {"issues": len(times), "p50": round(statistics.median(times), 1),
+                                     "p95": round(percentile(times, 0.95), 1)}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--state-db", help="SQLite state store to take recorded stage durations from")
+    parser.add_argument("--planner-seconds", type=float, default=30.0,
+                        help="with --state-db: planning time (not recorded in transitions)")
+    parser.add_argument("--issues", type=int, default=200)
+    parser.add_argument("--window", type=float, default=3600.0, help="recorded seconds over which issues arrive")
+    parser.add_argument("--scale", type=float, default=0.0005, help="wall-clock seconds per recorded second")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    # Nothing may reach the real state store; aging runs on simulated hours
+    work = tempfile.mkdtemp(prefix="sim-scheduling-")
+    os.environ["STATE_DB_PATH"] = os.path.join(work, "state.sqlite")
+    os.environ["PRIORITY_AGING_HOURS"] = str(float(os.getenv("PRIORITY_AGING_HOURS", "72")) * args.scale)
+    from orchestrator import policy
+    from orchestrator.logger import metrics
+    from orchestrator.scheduler import configure_limits, RESOURCE_LIMITS
+
+    rng = random.Random(args.seed)
+    if args.state_db:
+        profiles = recorded_profiles(args.state_db, args.planner_seconds)
+        if not profiles:
+            sys.exit(f"No issue in {args.state_db} has recorded planned and coded transitions")
+    else:
+        profiles = synthetic_profiles(rng, 1000)
+    issues = make_workload(profiles, args.issues, args.window, rng)
+
+    # The policy's expected stage costs come from span histograms, as they would in production
+    for p in profiles:
+        metrics.observe("swe_agent_span_seconds", p["planner"] * args.scale, span="agent.planner", stage="planner")
+        metrics.observe("swe_agent_span_seconds", p["coder"] * args.scale, span="agent.coder", stage="coder")
+        metrics.observe("swe_agent_span_seconds", sum(p["rounds"]) * args.scale, span="agent.auto_fix",
+                        stage="auto_fix")
+
+    configure_limits(llm=4, git=2, maven=2, sonar=2)
+    results = {"issues": args.issues, "profiles": "recorded" if args.state_db else "synthetic",
+               "limits": dict(RESOURCE_LIMITS)}
+    for name in ("fifo", "priority"):
+        policy.SCHEDULING_POLICY = name
+        done, makespan = asyncio.run(simulate(issues, args.scale))
+        results[name] = report(issues, done, makespan)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"📊 {args.issues} issues ({results['profiles']} durations) over {args.window:g}s, limits {RESOURCE_LIMITS}")
+    for key in ("priorities", "projects"):
+        print(f"   {'time-to-PR':<10} {'issues':>6} {'fifo p50':>9} {'p95':>8} {'policy p50':>11} {'p95':>8}")
+        for name, fifo in results["fifo"][key].items():
+            prio = results["priority"][key][name]
+            print(f"   {name:<10} {fifo['issues']:>6} {fifo['p50']:>8.0f}s {fifo['p95']:>7.0f}s "
+                  f"{prio['p50']:>10.0f}s {prio['p95']:>7.0f}s")
+    print(f"   makespan: fifo {results['fifo']['makespan']:.0f}s, policy {results['priority']['makespan']:.0f}s")
+    high = [p for p, _ in PRIORITIES[:2]]
+    fifo_p95 = max(results["fifo"]["priorities"][p]["p95"] for p in high if p in results["fifo"]["priorities"])
+    prio_p95 = max(results["priority"]["priorities"][p]["p95"] for p in high if p in results["priority"]["priorities"])
+    print(f"✅ High-priority p95 time-to-PR: {fifo_p95:.0f}s -> {prio_p95:.0f}s ({fifo_p95 / prio_p95:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Queue worker harness: runs stubbed planner/coder/auto_fix stages through
+orchestrator.worker, either as worker event loops sharing the in-process
+queue (default) or as separate worker processes against Redis (--redis).
+One extra worker claims a job and dies without finishing it, to exercise
+the visibility timeout. Checks that every issue still finishes, coded once,
+and that the cluster-wide resource limits held. A second, in-process case
+loses each worktree after coding (as if the coder ran on another host) and
+checks that the next stage re-creates it.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+os.environ.setdefault("STATE_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="queue-test-"), "state.sqlite"))
+
+from orchestrator.job_queue import MemoryJobQueue, RedisJobQueue, job_id
+from orchestrator.scheduler import aresource, configure_limits
+from orchestrator.worker import WORKTREE_STAGE, run_worker
+
+STAGE_RESOURCES = ["llm", "git", "maven"]
+
+
+class LocalProbe:
+    """Tracks how many stubs hold each resource at once, within this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.current = dict.fromkeys(STAGE_RESOURCES, 0)
+        self.peak = dict.fromkeys(STAGE_RESOURCES, 0)
+
+    def enter(self, name):
+        with self._lock:
+            self.current[name] += 1
+            self.peak[name] = max(self.peak[name], self.current[name])
+
+    def exit(self, name):
+        with self._lock:
+            self.current[name] -= 1
+
+
+class RedisProbe:
+    """Same, across processes: counters live in Redis and peaks are kept there too"""
+
+    def __init__(self, url):
+        import redis
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+
+    def enter(self, name):
+        count = self._redis.incr(f"queue-test:current:{name}")
+        self._redis.zadd("queue-test:peak", {name: count}, gt=True)
+
+    def exit(self, name):
+        self._redis.decr(f"queue-test:current:{name}")
+
+    @property
+    def peak(self):
+        return {name: int(score) for name, score in self._redis.zrange("queue-test:peak", 0, -1, withscores=True)}
+
+
+def make_stages(probe, scale, seed, workdir, lose_worktree=False):
+    rng = random.Random(seed)
+
+    def stub(index, name):
+        async def run(item):
+            task = {"issue_id": item[0]["id"]} if index == 0 else dict(item)
+            task.pop("fsm", None)
+            async with aresource(name):
+                probe.enter(name)
+                try:
+                    await asyncio.sleep(rng.uniform(0.5, 1.5) * scale)
+                finally:
+                    probe.exit(name)
+            task[f"stage{index}"] = task.get(f"stage{index}", 0) + 1
+            if index == WORKTREE_STAGE:
+                # Like the coder, leave a worktree for the later stages
+                task["target_dir"] = tempfile.mkdtemp(prefix=f"{task['issue_id']}-", dir=workdir)
+                if lose_worktree and task[f"stage{index}"] == 1:
+                    os.rmdir(task["target_dir"])
+            return task
+        return run
+
+    return [stub(i, name) for i, name in enumerate(STAGE_RESOURCES)]
+
+
+def enqueue(queue, run_id, issues):
+    for i in range(issues):
+        issue_id = f"QUEUE-{i}"
+        queue.enqueue(job_id(run_id, issue_id, 0), issue_id, 0, {"run": run_id, "issue": {"id": issue_id}})
+
+
+async def wait_drained(queue, timeout):
+    deadline = time.time() + timeout
+    while queue.pending() and time.time() < deadline:
+        await asyncio.sleep(0.2)
+    return not queue.pending()
+
+
+def process_worker(url, args, index):
+    configure_limits(**args.limits)
+    queue = RedisJobQueue(url, prefix=args.prefix)
+    stages = make_stages(RedisProbe(url), args.scale, args.seed + index, args.workdir)
+
+    async def main():
+        stop = asyncio.Event()
+        worker = asyncio.create_task(run_worker(queue, stages, args.concurrency, stop, args.visibility_timeout))
+        await wait_drained(queue, args.timeout)
+        stop.set()
+        await worker
+
+    asyncio.run(main())
+
+
+def crashing_worker(url, prefix):
+    # Claims the first job it can and dies holding it
+    queue = RedisJobQueue(url, prefix=prefix)
+    while queue.claim(1.0) is None:
+        time.sleep(0.05)
+    os._exit(1)
+
+
+def summarize(queue, run_id, args, peak, elapsed, coded=1):
+    final = [queue.get(job_id(run_id, f"QUEUE-{i}", len(STAGE_RESOURCES) - 1)) for i in range(args.issues)]
+    finished = [job for job in final if job and job["state"] == "done"]
+    stage = f"stage{WORKTREE_STAGE}"
+    redelivered = [queue.get(job_id(run_id, f"QUEUE-{i}", s))["attempts"] > 1
+                   for i in range(args.issues) for s in range(len(STAGE_RESOURCES))]
+    print(f"📊 {args.issues} issues x {len(STAGE_RESOURCES)} stages in {elapsed:.1f}s, {sum(redelivered)} redelivered")
+    ok = len(finished) == args.issues
+    for name in STAGE_RESOURCES:
+        within = peak.get(name, 0) <= args.limits[name]
+        ok &= within
+        print(f"   {name:<6} peak {peak.get(name, 0)} / limit {args.limits[name]} {'✅' if within else '❌'}")
+    print(f"{'✅' if ok else '❌'} {len(finished)}/{args.issues} issues finished")
+    coded_as_expected = [job["result"].get(stage) == coded for job in finished]
+    ok &= all(coded_as_expected)
+    print(f"{'✅' if all(coded_as_expected) else '❌'} {sum(coded_as_expected)}/{len(finished)} finished issues "
+          f"coded {coded}x")
+    return 0 if ok else 1
+
+
+def run_memory(args, lose_worktree=False):
+    configure_limits(**args.limits)
+    queue = MemoryJobQueue()
+    probe = LocalProbe()
+    run_id = "test"
+    enqueue(queue, run_id, args.issues)
+    queue.claim(args.visibility_timeout)  # the "crashed" worker's job
+
+    async def main():
+        stop = asyncio.Event()
+        workers = [asyncio.create_task(run_worker(queue, make_stages(probe, args.scale, args.seed + i, args.workdir,
+                                                                     lose_worktree),
+                                                  args.concurrency, stop, args.visibility_timeout))
+                   for i in range(args.workers)]
+        drained = await wait_drained(queue, args.timeout)
+        stop.set()
+        await asyncio.gather(*workers)
+        return drained
+
+    start = time.time()
+    asyncio.run(main())
+    return summarize(queue, run_id, args, probe.peak, time.time() - start, coded=2 if lose_worktree else 1)
+
+
+def run_redis(args):
+    import redis
+    client = redis.Redis.from_url(args.redis)
+    for key in client.scan_iter(f"{args.prefix}:*"):
+        client.delete(key)
+    client.delete("queue-test:peak", *[f"queue-test:current:{n}" for n in STAGE_RESOURCES])
+
+    queue = RedisJobQueue(args.redis, prefix=args.prefix)
+    run_id = "test"
+    enqueue(queue, run_id, args.issues)
+    start = time.time()
+    crasher = multiprocessing.Process(target=crashing_worker, args=(args.redis, args.prefix))
+    crasher.start()
+    crasher.join()
+    workers = [multiprocessing.Process(target=process_worker, args=(args.redis, args, i)) for i in range(args.workers)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return summarize(queue, run_id, args, RedisProbe(args.redis).peak, time.time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--redis", metavar="URL", help="run worker processes against this Redis instead")
+    parser.add_argument("--prefix", default="queue-test")
+    parser.add_argument("--issues", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=4, help="jobs per worker")
+    parser.add_argument("--scale", type=float, default=0.2, help="stub stage latency in seconds")
+    parser.add_argument("--visibility-timeout", type=float, default=2.0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    # Cluster-wide limits deliberately below workers x concurrency
+    args.limits = {"llm": 3, "git": 2, "maven": 2}
+    args.workdir = tempfile.mkdtemp(prefix="queue-test-worktrees-")
+    failed = run_redis(args) if args.redis else run_memory(args)
+    print("🔁 worktrees lost after coding")
+    return failed | run_memory(args, lose_worktree=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())